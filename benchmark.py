@@ -0,0 +1,183 @@
+"""Benchmark match loading against the local Riot API stand-in."""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+from lolstats.benchmark import (
+    run_benchmarks,
+    save_results,
+    load_results,
+    compare_results,
+)
+from lolstats.errors import MyError
+
+# Benchmark parameters printed with the results
+PARAMS = ("size", "concurrency", "latency", "storeSize", "format", "batched", "count")
+
+
+def parse_args():
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Load synthetic matches from a local Riot API stand-in with different"
+            " settings and save loading speed, CPU time and memory use to a JSON file."
+        )
+    )
+
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        help="Numbers of matches to load, for example: 100 1000 10000",
+        default=[100, 1000],
+    )
+
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        nargs="+",
+        help="Numbers of matches loaded in parallel",
+        default=[1, 8],
+    )
+
+    parser.add_argument(
+        "--latency",
+        type=float,
+        nargs="+",
+        help="Seconds the server adds to each response",
+        default=[0.02],
+    )
+
+    parser.add_argument(
+        "--store-sizes",
+        type=int,
+        nargs="+",
+        help="Numbers of matches saved before loading",
+        default=[0],
+    )
+
+    parser.add_argument(
+        "--micro-size",
+        type=int,
+        help=(
+            "Number of saved matches in the unsaved_matches micro-benchmark,"
+            " ten times fewer matches and players are saved by the other micro-benchmarks"
+        ),
+        default=10000,
+    )
+
+    parser.add_argument(
+        "--no-micro",
+        action="store_true",
+        help="Skip the micro-benchmarks",
+    )
+
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        help="Path to the JSON file with the results",
+        default=os.path.join(
+            "benchmarks", f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        ),
+    )
+
+    parser.add_argument(
+        "--compare",
+        type=str,
+        help="Path to the results of a previous run to compare with",
+        default=None,
+    )
+
+    return parser.parse_args()
+
+
+def format_result(result):
+    """Return one line description of the benchmark result."""
+
+    params = ", ".join(
+        f"{name}={value}" for name, value in result.items() if name in PARAMS
+    )
+
+    if result["benchmark"] == "ingest":
+        peak = result["peakRssBytes"]
+
+        measures = (
+            f"{result['matchesPerSecond']:.1f} matches/s,"
+            f" {result['requestsPerSecond']:.1f} requests/s,"
+            f" {result['rateLimitWaitSeconds']:.2f} s rate limit wait,"
+            f" {result['cpuSecondsPerMatch'] * 1000:.2f} ms CPU/match,"
+            f" {'unknown' if peak is None else f'{peak / 2**20:.0f} MB'} peak RSS,"
+            f" {result['bytesWritten'] / 2**20:.1f} MB written"
+        )
+    elif result["benchmark"] == "unsaved_matches":
+        measures = (
+            f"{result['scanSeconds'] * 1000:.1f} ms scan,"
+            f" {result['manifestSeconds'] * 1000:.1f} ms manifest,"
+            f" {result['warmSeconds'] * 1000:.2f} ms warm"
+        )
+    elif result["benchmark"] == "save_match":
+        measures = (
+            f"{result['matchesPerSecond']:.0f} matches/s,"
+            f" {result['bytesPerMatch'] / 1024:.1f} KB/match"
+        )
+    else:
+        measures = f"{result['playersPerSecond']:.0f} players/s"
+
+    return f"{result['benchmark']} ({params}): {measures}"
+
+
+def format_changes(changes):
+    """Return description of the changes of the metrics between two runs."""
+
+    lines = []
+
+    for change in changes:
+        params = ", ".join(
+            f"{name}={value}" for name, value in change["benchmark"].items()
+        )
+
+        verdict = "better" if change["better"] else "worse"
+
+        lines.append(
+            f"{params}: {change['metric']} {change['old']:.4g} -> {change['new']:.4g}"
+            f" ({change['change']:.2f}x, {verdict})"
+        )
+
+    return "\n".join(lines)
+
+
+def main():
+    """Parse command line arguments and run the benchmarks."""
+
+    try:
+        args = parse_args()
+        previous = None if args.compare is None else load_results(args.compare)
+
+        results = run_benchmarks(
+            sizes=args.sizes,
+            concurrency=args.concurrency,
+            latency=args.latency,
+            store_sizes=args.store_sizes,
+            micro=not args.no_micro,
+            micro_size=args.micro_size,
+            progress=lambda result: print(format_result(result)),
+        )
+
+        save_results(args.output, results)
+        print(f"\n\nSaved benchmark results to '{args.output}'.")
+
+        if previous is not None:
+            print(f"\nChanges since '{args.compare}':\n")
+            print(format_changes(compare_results(previous, results)))
+    except MyError as e:
+        print("\n\nError:\n")
+        print(e)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import os
+import json
+from unittest.mock import patch
+from tempfile import TemporaryDirectory
+from benchmark import main
+
+
+def test_main():
+    with TemporaryDirectory() as tmpdir:
+        output = os.path.join(tmpdir, "results.json")
+
+        def run(*args):
+            with patch("builtins.print") as mock_print, patch(
+                "sys.argv",
+                [
+                    "prog",
+                    "--sizes",
+                    "10",
+                    "--concurrency",
+                    "2",
+                    "--latency",
+                    "0",
+                    "--micro-size",
+                    "20",
+                    "--output",
+                    output,
+                    *args,
+                ],
+            ):
+                main()
+
+            return "\n".join(str(c.args[0]) for c in mock_print.call_args_list)
+
+        printed = run()
+        assert "ingest (size=10, concurrency=2, latency=0.0, storeSize=0" in printed
+        assert "save_match (format=gzip, count=2)" in printed
+
+        with open(output, "r", encoding="utf-8") as file:
+            results = json.load(file)
+
+        assert [result["benchmark"] for result in results["results"]][:2] == [
+            "ingest",
+            "unsaved_matches",
+        ]
+
+        previous = os.path.join(tmpdir, "previous.json")
+        os.replace(output, previous)
+        printed = run("--compare", previous, "--no-micro")
+
+        assert f"Changes since '{previous}'" in printed
+        assert "matchesPerSecond" in printed
@@ -0,0 +1,193 @@
+"""Load League of Legends matches of players discovered from saved matches."""
+
+import argparse
+import sys
+from lolstats.crawl import crawl
+from lolstats.roster import read_roster
+from lolstats.lol_http import configure_sessions
+from lolstats.matches import resolve_puuids
+from lolstats.disk import FORMATS
+from lolstats.stores import STORAGES
+from lolstats.errors import MyError
+
+
+def parse_args():
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Load matches of the seed players, then of the players they played with,"
+            " breadth first. Progress is saved to crawl.json in the output directory,"
+            " run again to continue the crawl."
+        )
+    )
+
+    parser.add_argument(
+        "-n", "--name", type=str, help=("Seed player name portion in Name#Tag")
+    )
+
+    parser.add_argument(
+        "-t", "--tag", type=str, help=("Seed player tag portion in Name#Tag")
+    )
+
+    parser.add_argument(
+        "--roster",
+        type=str,
+        help="Path to a file with seed players, one Name#Tag or PUUID per line",
+    )
+
+    parser.add_argument(
+        "-r",
+        "--region",
+        type=str,
+        help="Region: 'americas', 'asia', 'europe' or 'sea', see load.py",
+        required=True,
+    )
+
+    parser.add_argument("-k", "--key", type=str, help=("Riot API key"), required=True)
+
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        help="Path to directory where matches are stored",
+        default="data",
+    )
+
+    parser.add_argument(
+        "-m",
+        "--max",
+        type=int,
+        help="Maximum number of recent matches loaded for each player",
+        default=20,
+    )
+
+    parser.add_argument(
+        "-d",
+        "--depth",
+        type=int,
+        help="Maximum distance from the seed players, 0 to load the seed players only",
+        default=1,
+    )
+
+    parser.add_argument(
+        "--max-players",
+        type=int,
+        help="Maximum total number of crawled players",
+        default=100,
+    )
+
+    parser.add_argument(
+        "--max-matches",
+        type=int,
+        help="Stop after this many matches are saved by the crawl",
+        default=1000,
+    )
+
+    parser.add_argument(
+        "-q",
+        "--queue",
+        type=int,
+        help="Game queue type. Example: 420 for Ranked solo queue: https://static.developer.riotgames.com/docs/lol/queues.json",
+        default=None,
+    )
+
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        help="Maximum number of matches loaded in parallel",
+        default=1,
+    )
+
+    parser.add_argument(
+        "-s",
+        "--storage",
+        choices=STORAGES,
+        help="Storage backend of the matches",
+        default="files",
+    )
+
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=list(FORMATS),
+        help="Storage format of match files, see load.py",
+        default="json",
+    )
+
+    parser.add_argument(
+        "--raw",
+        action="store_true",
+        help="Save match JSON as received from Riot API, see load.py",
+    )
+
+    args = parser.parse_args()
+
+    if (args.name is None) != (args.tag is None):
+        parser.error("Use --name together with --tag")
+
+    return args
+
+
+def seed_puuids(args):
+    """Return PUUIDs of the seed players from command line arguments."""
+
+    players = []
+
+    if args.name is not None:
+        players.append({"name": args.name, "tag": args.tag})
+
+    if args.roster is not None:
+        players += read_roster(args.roster)
+
+    return resolve_puuids(
+        directory=args.output,
+        players=players,
+        route=args.region,
+        api_key=args.key,
+        concurrency=args.concurrency,
+    )
+
+
+def main():
+    """Parse command line arguments and crawl matches."""
+
+    try:
+        args = parse_args()
+        configure_sessions(pool_size=max(10, args.concurrency))
+
+        result = crawl(
+            directory=args.output,
+            seeds=seed_puuids(args),
+            route=args.region,
+            api_key=args.key,
+            max_depth=args.depth,
+            max_players=args.max_players,
+            max_matches=args.max_matches,
+            matches_per_player=args.max,
+            queue=args.queue,
+            concurrency=args.concurrency,
+            format=args.format,
+            storage=args.storage,
+            raw=args.raw,
+        )
+
+        print(
+            (
+                f"\n\nCrawled {result['players']} players and saved {result['matches']}"
+                f" matches into '{args.output}' directory.\n"
+                f"{result['frontier']} discovered players are waiting to be crawled."
+            )
+        )
+
+        if result["failed"]:
+            print(f"{result['failed']} matches failed to load.")
+    except MyError as e:
+        print("\n\nError:\n")
+        print(e)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
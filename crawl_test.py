@@ -0,0 +1,55 @@
+import os
+import json
+from unittest.mock import patch, call
+from tempfile import TemporaryDirectory
+from crawl import main
+
+
+def test_main():
+    with TemporaryDirectory() as tmpdir:
+        roster_path = os.path.join(tmpdir, "roster.txt")
+
+        with open(roster_path, "w", encoding="utf-8") as file:
+            file.write("puuid2\n")
+
+        with patch(
+            "crawl.crawl",
+            return_value={"players": 5, "matches": 40, "frontier": 12, "failed": 0},
+        ) as mock_crawl, patch(
+            "lolstats.matches.get_account_puuid", return_value="puuid1"
+        ), patch(
+            "builtins.print"
+        ) as mock_print, patch(
+            "sys.argv",
+            [
+                "prog",
+                "--name",
+                "Faker",
+                "--tag",
+                "t1",
+                "--roster",
+                roster_path,
+                "--region",
+                "asia",
+                "--key",
+                "testkey",
+                "--output",
+                tmpdir,
+                "--depth",
+                "2",
+            ],
+        ):
+            main()
+
+            assert mock_crawl.call_args.kwargs["seeds"] == ["puuid1", "puuid2"]
+            assert mock_crawl.call_args.kwargs["max_depth"] == 2
+
+            assert mock_print.call_args_list == [
+                call(
+                    f"\n\nCrawled 5 players and saved 40 matches into '{tmpdir}' directory.\n"
+                    "12 discovered players are waiting to be crawled."
+                )
+            ]
+
+        with open(os.path.join(tmpdir, "player_names.json"), "r") as file:
+            assert json.load(file) == {"puuid1": [{"name": "Faker", "tag": "t1"}]}
@@ -0,0 +1,70 @@
+"""Export saved League of Legends matches into columnar tables for analysis."""
+
+import argparse
+import os
+import sys
+from lolstats.columnar import EXPORT_FORMATS, export_matches
+from lolstats.stores import STORAGES
+from lolstats.errors import MyError
+
+
+def parse_args():
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Export saved matches into participants, teams and matches tables."
+            " Only matches that were not exported before are added."
+        )
+    )
+
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        help="Path to directory where matches are stored",
+        default="data",
+    )
+
+    parser.add_argument(
+        "-s",
+        "--storage",
+        choices=STORAGES,
+        help="Storage backend of the matches",
+        default="files",
+    )
+
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=EXPORT_FORMATS,
+        help="Format of the exported tables, Parquet by default if pyarrow is installed",
+        default=None,
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    """Parse command line arguments and export the matches."""
+
+    try:
+        args = parse_args()
+        export_dir = os.path.join(args.output, "export")
+
+        exported = export_matches(
+            directory=args.output,
+            output=export_dir,
+            storage=args.storage,
+            format=args.format,
+        )
+
+        print(f"\n\nExported {exported} new matches to '{export_dir}' directory.")
+    except MyError as e:
+        print("\n\nError:\n")
+        print(e)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import os
+from unittest.mock import patch, call
+from tempfile import TemporaryDirectory
+from lolstats.disk import save_match
+from lolstats.columnar import load_table
+from export import main
+
+
+def test_main():
+    with TemporaryDirectory() as tmpdir:
+        matches_dir = os.path.join(tmpdir, "matches")
+        save_match(matches_dir, "NA1_1", {"metadata": {"matchId": "NA1_1"}})
+
+        with patch("builtins.print") as mock_print, patch(
+            "sys.argv",
+            ["prog", "--output", tmpdir, "--format", "npz"],
+        ):
+            main()
+
+            export_dir = os.path.join(tmpdir, "export")
+
+            assert mock_print.call_args_list == [
+                call(f"\n\nExported 1 new matches to '{export_dir}' directory.")
+            ]
+
+        assert load_table(export_dir, "matches")["matchId"].tolist() == ["NA1_1"]
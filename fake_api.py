@@ -0,0 +1,108 @@
+"""Run a local stand-in for Riot API with synthetic matches."""
+
+import argparse
+from lolstats.fake_api import FakeRiotApi, DEFAULT_APP_LIMITS
+
+
+def parse_args():
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Serve the account-v1 and match-v5 endpoints used by load.py with"
+            " synthetic matches and Riot API rate limits, for testing without an API key."
+            " Point load.py at the server with LOLSTATS_API_URL environment variable."
+        )
+    )
+
+    parser.add_argument(
+        "--host", type=str, help="Address to listen on", default="127.0.0.1"
+    )
+
+    parser.add_argument(
+        "-p", "--port", type=int, help="Port to listen on", default=8080
+    )
+
+    parser.add_argument(
+        "--app-limits",
+        type=str,
+        help="Application rate limits of each API key, for example '20:1,100:120'",
+        default=DEFAULT_APP_LIMITS,
+    )
+
+    parser.add_argument(
+        "--latency",
+        type=float,
+        help="Seconds added to each response",
+        default=0,
+    )
+
+    parser.add_argument(
+        "--latency-jitter",
+        type=float,
+        help="Maximum random number of seconds added to the latency",
+        default=0,
+    )
+
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        help="Fraction of requests that fail with 500 or 503 error",
+        default=0,
+    )
+
+    parser.add_argument(
+        "--throttle-rate",
+        type=float,
+        help="Fraction of requests that fail with 429 error without Retry-After header",
+        default=0,
+    )
+
+    parser.add_argument(
+        "--players", type=int, help="Number of synthetic players", default=1000
+    )
+
+    parser.add_argument(
+        "--matches", type=int, help="Number of synthetic matches", default=10000
+    )
+
+    parser.add_argument(
+        "--seed", type=int, help="Seed of the synthetic data", default=0
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    """Parse command line arguments and run the server until interrupted."""
+
+    args = parse_args()
+
+    api = FakeRiotApi(
+        host=args.host,
+        port=args.port,
+        app_limits=args.app_limits,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        players=args.players,
+        matches=args.matches,
+        seed=args.seed,
+    )
+
+    print(
+        f"Serving Riot API stand-in at {api.url}\n"
+        f"Run load.py with LOLSTATS_API_URL={api.url} and any API key."
+    )
+
+    try:
+        api.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+from unittest.mock import patch
+from lolstats.fake_api import FakeRiotApi
+from fake_api import main
+
+
+def test_main():
+    with patch.object(
+        FakeRiotApi, "serve_forever", side_effect=KeyboardInterrupt
+    ), patch("builtins.print") as mock_print, patch(
+        "sys.argv",
+        [
+            "prog",
+            "--port",
+            "0",
+            "--players",
+            "20",
+            "--matches",
+            "100",
+            "--latency",
+            "0.1",
+        ],
+    ):
+        main()
+
+        assert "Serving Riot API stand-in at http://127.0.0.1:" in (
+            mock_print.call_args.args[0]
+        )
@@ -1,8 +1,13 @@
-"""Load League of Legends match data for the player from Riot API and store it into disk."""
+"""Load League of Legends match data for the players from Riot API and store it into disk."""
 
 import argparse
 import sys
 from lolstats.matches import load_matches
+from lolstats.roster import read_roster, load_roster_matches
+from lolstats.lol_http import configure_sessions, configure_retries
+from lolstats.disk import LAYOUTS, FORMATS
+from lolstats.stores import STORAGES
+from lolstats.metrics import get_metrics, format_summary, save_metrics
 from lolstats.errors import MyError
 
 
@@ -18,14 +23,22 @@ def parse_args():
         "--name",
         type=str,
         help=("Player name portion in Name#Tag"),
-        required=True,
     )
     parser.add_argument(
         "-t",
         "--tag",
         type=str,
         help=("Player tag portion in Name#Tag"),
-        required=True,
+    )
+
+    parser.add_argument(
+        "--roster",
+        type=str,
+        help=(
+            "Path to a file with one player per line, as Name#Tag or PUUID,"
+            " used instead of --name and --tag. Matches shared by the players"
+            " are loaded once"
+        ),
     )
 
     parser.add_argument(
@@ -64,7 +77,176 @@ def parse_args():
         default=None,
     )
 
-    return parser.parse_args()
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help=(
+            "List all --max recent matches, including the ones older than the matches"
+            " saved by previous runs. Use for backfills"
+        ),
+    )
+
+    parser.add_argument(
+        "-s",
+        "--storage",
+        choices=STORAGES,
+        help=(
+            "Storage backend: 'files' saves each match to a file in matches directory,"
+            " 'sqlite' saves matches into matches.sqlite database"
+        ),
+        default="files",
+    )
+
+    parser.add_argument(
+        "--layout",
+        choices=LAYOUTS,
+        help=(
+            "Layout of the matches directory: 'flat' stores all matches in one directory,"
+            " 'sharded' stores them in subdirectories by platform and hash bucket."
+            " Defaults to the current layout. Use reshard.py to change the layout"
+            " of saved matches"
+        ),
+        default=None,
+    )
+
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=list(FORMATS),
+        help=(
+            "Storage format of match files: 'json' (indented), 'compact' (minified JSON),"
+            " 'gzip' or 'zstd' (compressed compact JSON)"
+        ),
+        default="json",
+    )
+
+    parser.add_argument(
+        "--raw",
+        action="store_true",
+        help=(
+            "Save match JSON as received from Riot API, without parsing and"
+            " re-serializing it. Uses less CPU. The 'json' format is saved minified"
+        ),
+    )
+
+    parser.add_argument(
+        "--timelines",
+        action="store_true",
+        help=(
+            "Also load the timeline of each new match, with participants' gold,"
+            " experience and positions every minute and all events"
+        ),
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "Continue the download interrupted in the previous run from its checkpoint"
+            " instead of listing matches from the most recent one"
+        ),
+    )
+
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        help="Maximum number of matches loaded in parallel",
+        default=1,
+    )
+
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        help="Maximum number of HTTP connections kept open to each Riot API host",
+        default=10,
+    )
+
+    parser.add_argument(
+        "--no-keep-alive",
+        action="store_true",
+        help="Close HTTP connections after each request instead of reusing them",
+    )
+
+    parser.add_argument(
+        "--retry-budget",
+        type=float,
+        help=(
+            "Maximum total number of seconds the run waits before retrying requests"
+            " that failed with server errors (500, 502, 503, 504), timeouts or"
+            " connection errors. No limit by default"
+        ),
+        default=None,
+    )
+
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help=(
+            "Print request latencies, status codes, retries, rate limit waits"
+            " and disk write times after loading"
+        ),
+    )
+
+    parser.add_argument(
+        "--metrics-json",
+        type=str,
+        help="Path to a JSON file where the request and disk write metrics are saved",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--metrics-prometheus",
+        type=str,
+        help=(
+            "Path to a file where the request and disk write metrics are saved"
+            " in Prometheus text format"
+        ),
+        default=None,
+    )
+
+    args = parser.parse_args()
+
+    if args.roster is None and (args.name is None or args.tag is None):
+        parser.error("Use --name and --tag, or --roster")
+
+    if args.roster is not None and args.resume:
+        parser.error("--resume can not be used with --roster")
+
+    return args
+
+
+def print_roster_result(result, directory):
+    """Print the number of loaded matches for each player and in total."""
+
+    lines = [f"\n\nSuccessfully loaded match data into '{directory}' directory."]
+
+    for player, counts in result["players"].items():
+        lines.append(f"{player}: {counts['total']} total matches, {counts['new']} new.")
+
+    lines.append(f"All players: {result['total']} unique matches, {result['new']} new.")
+
+    if result["failed"]:
+        lines.append(
+            f"{result['failed']} matches failed to load, run again to retry them."
+        )
+
+    print("\n".join(lines))
+
+
+def report_metrics(args):
+    """Print and save the metrics of the run as requested by the command line arguments."""
+
+    metrics = get_metrics()
+
+    if args.metrics:
+        print(f"\nMetrics:\n{format_summary(metrics.summary())}")
+
+    if args.metrics_json is not None:
+        save_metrics(args.metrics_json, metrics, format="json")
+
+    if args.metrics_prometheus is not None:
+        save_metrics(args.metrics_prometheus, metrics, format="prometheus")
 
 
 def main():
@@ -72,15 +254,38 @@ def main():
 
     try:
         args = parse_args()
+        configure_sessions(
+            pool_size=max(args.pool_size, args.concurrency),
+            keep_alive=not args.no_keep_alive,
+        )
 
-        result = load_matches(
+        configure_retries(run_budget=args.retry_budget)
+        get_metrics().reset()
+
+        options = dict(
             directory=args.output,
             total_matches=args.max,
             route=args.region,
-            name=args.name,
-            tag=args.tag,
             queue=args.queue,
             api_key=args.key,
+            concurrency=args.concurrency,
+            incremental=not args.full,
+            stop_at_saved=not args.full,
+            layout=args.layout,
+            format=args.format,
+            storage=args.storage,
+            raw=args.raw,
+            timelines=args.timelines,
+        )
+
+        if args.roster is not None:
+            result = load_roster_matches(players=read_roster(args.roster), **options)
+            print_roster_result(result, directory=args.output)
+            report_metrics(args)
+            return
+
+        result = load_matches(
+            name=args.name, tag=args.tag, resume=args.resume, **options
         )
 
         print(
@@ -89,6 +294,13 @@ def main():
                 f"{result['total']} total matches, {result['new']} new."
             )
         )
+
+        if result["failed"]:
+            print(
+                f"{result['failed']} matches failed to load, run again to retry them."
+            )
+
+        report_metrics(args)
     except MyError as e:
         print("\n\nError:\n")
         print(e)
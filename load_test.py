@@ -18,7 +18,7 @@ def test_main():
             with open(os.path.join(matches_dir, f"{match_id}.json"), "w") as f:
                 f.write("dummy data")
 
-        with patch("requests.get") as mock_get, patch(
+        with patch("requests.Session.get") as mock_get, patch(
             "builtins.print"
         ) as mock_print, patch(
             "sys.argv",
@@ -42,13 +42,16 @@ def test_main():
         ):
             mock_get.side_effect = [
                 Mock(
-                    status_code=200, json=lambda: {"puuid": "test-puuid"}
+                    status_code=200, headers={}, json=lambda: {"puuid": "test-puuid"}
                 ),  # get_account_puuid response
                 Mock(
-                    status_code=200, json=lambda: ["id1", "id2", "id3", "id4"]
+                    status_code=200,
+                    headers={},
+                    json=lambda: ["id1", "id2", "id3", "id4"],
                 ),  # get_list_of_match_ids response
                 Mock(
                     status_code=200,
+                    headers={},
                     json=lambda: {
                         "metadata": {"matchId": "id3"},
                         "data": {"player": "Player1", "result": "win"},
@@ -56,6 +59,7 @@ def test_main():
                 ),  # get_match 1 response
                 Mock(
                     status_code=200,
+                    headers={},
                     json=lambda: {
                         "metadata": {"matchId": "id4"},
                         "data": {"player": "Player2", "result": "loss"},
@@ -119,7 +123,7 @@ def test_main():
                     timeout=10,
                 ),
                 call(
-                    "https://asia.api.riotgames.com/lol/match/v5/matches/by-puuid/test-puuid/ids?api_key=testkey&start=0&count=2&endTime=&queue=123",
+                    "https://asia.api.riotgames.com/lol/match/v5/matches/by-puuid/test-puuid/ids?api_key=testkey&start=0&count=2&startTime=&endTime=&queue=123",
                     timeout=10,
                 ),
                 call(
@@ -131,3 +135,114 @@ def test_main():
                     timeout=10,
                 ),
             ]
+
+
+def test_main_roster():
+    with TemporaryDirectory() as tmpdir:
+        roster_path = os.path.join(tmpdir, "roster.txt")
+
+        with open(roster_path, "w", encoding="utf-8") as file:
+            file.write("Faker#t1\nsome-puuid\n")
+
+        result = {
+            "players": {
+                "Faker#t1": {"total": 3, "new": 2},
+                "some-puuid": {"total": 2, "new": 2},
+            },
+            "total": 4,
+            "new": 3,
+            "failed": 1,
+        }
+
+        with patch("load.load_roster_matches", return_value=result) as mock_load, patch(
+            "builtins.print"
+        ) as mock_print, patch(
+            "sys.argv",
+            [
+                "prog",
+                "--roster",
+                roster_path,
+                "--region",
+                "asia",
+                "--key",
+                "testkey",
+                "--output",
+                tmpdir,
+            ],
+        ):
+            main()
+
+            assert mock_load.call_args.kwargs["players"] == [
+                {"name": "Faker", "tag": "t1"},
+                {"puuid": "some-puuid"},
+            ]
+
+            assert mock_print.call_args_list == [
+                call(
+                    f"\n\nSuccessfully loaded match data into '{tmpdir}' directory.\n"
+                    "Faker#t1: 3 total matches, 2 new.\n"
+                    "some-puuid: 2 total matches, 2 new.\n"
+                    "All players: 4 unique matches, 3 new.\n"
+                    "1 matches failed to load, run again to retry them."
+                )
+            ]
+
+
+def test_main_metrics():
+    with TemporaryDirectory() as tmpdir:
+        json_path = os.path.join(tmpdir, "metrics.json")
+        prometheus_path = os.path.join(tmpdir, "metrics.prom")
+
+        with patch("requests.Session.get") as mock_get, patch(
+            "builtins.print"
+        ) as mock_print, patch(
+            "sys.argv",
+            [
+                "prog",
+                "--name",
+                "Faker",
+                "--tag",
+                "t1",
+                "--region",
+                "asia",
+                "--key",
+                "testkey",
+                "--output",
+                tmpdir,
+                "--max",
+                "1",
+                "--metrics",
+                "--metrics-json",
+                json_path,
+                "--metrics-prometheus",
+                prometheus_path,
+            ],
+        ):
+            mock_get.side_effect = [
+                Mock(status_code=200, headers={}, json=lambda: {"puuid": "test-puuid"}),
+                Mock(status_code=200, headers={}, json=lambda: ["id1"]),
+                Mock(
+                    status_code=200,
+                    headers={"Content-Length": "100"},
+                    json=lambda: {"metadata": {"matchId": "id1"}},
+                ),
+            ]
+
+            main()
+
+            assert "match-v5.getMatch: 1 requests (200: 1)" in (
+                mock_print.call_args.args[0]
+            )
+
+            with open(json_path, "r", encoding="utf-8") as file:
+                metrics = json.load(file)
+
+            assert metrics["requests"] == 3
+            assert metrics["bytes"] == 100
+            assert metrics["writes"]["matches"]["items"] == 1
+
+            with open(prometheus_path, "r", encoding="utf-8") as file:
+                assert (
+                    'lolstats_requests_total{endpoint="match-v5.getMatch",status="200"} 1'
+                    in file.read().splitlines()
+                )
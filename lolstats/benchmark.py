@@ -0,0 +1,543 @@
+"""Benchmarks of match loading against the local Riot API stand-in."""
+
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from tempfile import TemporaryDirectory
+from lolstats.disk import (
+    FORMATS,
+    save_match,
+    unsaved_matches,
+    save_match_index,
+    forget_match_index,
+    zstandard,
+)
+from lolstats.errors import MyError
+from lolstats.fake_api import FakeRiotApi, TEMPLATE_PATH
+from lolstats.lol_http import (
+    configure_api_url,
+    configure_sessions,
+    connection_stats,
+    rate_limit_wait_time,
+)
+from lolstats.matches import load_matches
+from lolstats.players import PlayerRegistry
+from lolstats.stores import open_match_store
+
+# Application rate limits of the stand-in server that do not slow down the benchmarks
+UNLIMITED = "1000000:1"
+
+# Seconds between memory samples, see `PeakMemory`
+MEMORY_SAMPLE_INTERVAL = 0.01
+
+
+def current_rss():
+    """Return resident memory of the process in bytes, None if it is not known."""
+
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as file:
+            pages = int(file.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class PeakMemory:
+    """
+    Context manager that samples resident memory of the process in a background
+    thread and records the peak in `peak`, None if memory can not be measured.
+    """
+
+    def __init__(self, interval=MEMORY_SAMPLE_INTERVAL):
+        self.peak = None
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        rss = current_rss()
+
+        if rss is not None:
+            self.peak = max(self.peak or 0, rss)
+
+    def _run(self):
+        while not self._stopped.wait(self._interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stopped.set()
+        self._thread.join()
+        self._sample()
+
+
+def directory_size(path):
+    """Return total size of the files in the directory in bytes."""
+
+    total = 0
+
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+
+    return total
+
+
+def serve_fake_api(connection, options):
+    """Run the stand-in server, sending its URL through the connection."""
+
+    api = FakeRiotApi(**options)
+    connection.send(api.url)
+    api.serve_forever()
+
+
+@contextmanager
+def fake_api_process(**options):
+    """
+    Run `lolstats.fake_api.FakeRiotApi` in a separate process, so the CPU
+    time and memory of the server are not counted in the benchmark.
+
+    Parameters
+    ----------
+    **options
+        Passed to FakeRiotApi.
+
+    Yields
+    ------
+    str
+        Base URL of the server.
+    """
+
+    # Forking a process with running threads can deadlock the child
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+
+    process = context.Process(
+        target=serve_fake_api, args=(sender, options), daemon=True
+    )
+
+    process.start()
+
+    try:
+        if not receiver.poll(60):
+            raise MyError("Riot API stand-in server did not start.")
+
+        yield receiver.recv()
+    finally:
+        process.terminate()
+        process.join()
+
+
+def fill_store(directory, count, storage="files", format="json"):
+    """Save `count` small matches that are not served by the stand-in server."""
+
+    with open_match_store(directory=directory, storage=storage, format=format) as store:
+        for start in range(0, count, 1000):
+            store.save(
+                [
+                    {"metadata": {"matchId": f"KR_{id}"}, "info": {}}
+                    for id in range(start, min(start + 1000, count))
+                ]
+            )
+
+
+def benchmark_ingest(
+    size,
+    concurrency=1,
+    latency=0.0,
+    store_size=0,
+    app_limits=UNLIMITED,
+    format="json",
+    storage="files",
+):
+    """
+    Load `size` matches of one player from the stand-in server with `load_matches`.
+
+    Parameters
+    ----------
+    size : int
+        Number of matches to load.
+
+    concurrency : int, optional
+        See `load_matches`.
+
+    latency : float, optional
+        Seconds the server adds to each response.
+
+    store_size : int, optional
+        Number of matches saved before the benchmark.
+
+    app_limits : str, optional
+        Application rate limits of the server, see FakeRiotApi.
+
+    format, storage : str, optional
+        See `load_matches`.
+
+    Returns
+    -------
+    dict
+        Benchmark parameters and results:
+            * `seconds`: wall time of `load_matches`.
+            * `matchesPerSecond`, `requestsPerSecond`: loaded matches
+              and sent requests per second of wall time.
+            * `rateLimitWaitSeconds`: total time requests waited for the rate limits.
+            * `cpuSecondsPerMatch`: CPU time of the process per loaded match.
+            * `peakRssBytes`: peak resident memory, None if it is not known.
+            * `bytesWritten`: size of the saved files.
+    """
+
+    params = {
+        "benchmark": "ingest",
+        "size": size,
+        "concurrency": concurrency,
+        "latency": latency,
+        "storeSize": store_size,
+        "appLimits": app_limits,
+        "format": format,
+        "storage": storage,
+    }
+
+    # Each of the 10 players plays in every match
+    server = fake_api_process(
+        players=10, matches=size, latency=latency, app_limits=app_limits
+    )
+
+    with server as url, TemporaryDirectory() as directory:
+        configure_api_url(url)
+        configure_sessions(pool_size=max(10, concurrency))
+
+        try:
+            fill_store(directory, store_size, storage=storage, format=format)
+            size_before = directory_size(directory)
+            waited_before = rate_limit_wait_time()
+            cpu_before = time.process_time()
+            start = time.perf_counter()
+
+            with PeakMemory() as memory:
+                result = load_matches(
+                    directory=directory,
+                    total_matches=size,
+                    route="americas",
+                    name="Benchmark",
+                    tag="1",
+                    api_key="benchmark",
+                    concurrency=concurrency,
+                    format=format,
+                    storage=storage,
+                )
+
+            seconds = time.perf_counter() - start
+            cpu = time.process_time() - cpu_before
+            waited = rate_limit_wait_time() - waited_before
+            requests_sent = sum(
+                item["requests"] for item in connection_stats().values()
+            )
+        finally:
+            configure_api_url(None)
+            configure_sessions()
+
+        bytes_written = directory_size(directory) - size_before
+
+    loaded = result["new"]
+
+    return dict(
+        params,
+        matches=loaded,
+        requests=requests_sent,
+        seconds=seconds,
+        matchesPerSecond=loaded / seconds,
+        requestsPerSecond=requests_sent / seconds,
+        rateLimitWaitSeconds=waited,
+        cpuSecondsPerMatch=cpu / loaded if loaded else None,
+        peakRssBytes=memory.peak,
+        bytesWritten=bytes_written,
+    )
+
+
+def benchmark_unsaved_matches(store_size, lookups=1000):
+    """
+    Measure `unsaved_matches` in a directory with `store_size` saved matches:
+    the first call that lists the directory, the first call that reads
+    the manifest file and a call with the IDs loaded in memory.
+    """
+
+    with TemporaryDirectory() as directory:
+        matches_dir = os.path.join(directory, "matches")
+        fill_store(directory, store_size)
+        ids = [f"KR_{id}" for id in range(0, 2 * lookups, 2)]
+        timings = {}
+
+        for name in ("scanSeconds", "manifestSeconds", "warmSeconds"):
+            if name == "scanSeconds":
+                os.remove(os.path.join(directory, "matches.index"))
+                forget_match_index(matches_dir)
+            elif name == "manifestSeconds":
+                save_match_index(matches_dir)
+                forget_match_index(matches_dir)
+
+            start = time.perf_counter()
+            unsaved_matches(matches_dir, ids)
+            timings[name] = time.perf_counter() - start
+
+        forget_match_index(matches_dir)
+
+    return dict(
+        {"benchmark": "unsaved_matches", "storeSize": store_size, "lookups": lookups},
+        **timings,
+    )
+
+
+def benchmark_save_match(count, format="json"):
+    """Measure saving `count` copies of `docs/match.json` with `save_match`."""
+
+    with open(TEMPLATE_PATH, "r", encoding="utf-8") as file:
+        match = json.load(file)
+
+    with TemporaryDirectory() as directory:
+        cpu_before = time.process_time()
+        start = time.perf_counter()
+
+        for number in range(count):
+            save_match(directory, f"NA1_{number}", match, format=format)
+
+        seconds = time.perf_counter() - start
+        cpu = time.process_time() - cpu_before
+        size = directory_size(directory)
+        forget_match_index(directory)
+
+    return {
+        "benchmark": "save_match",
+        "format": format,
+        "count": count,
+        "seconds": seconds,
+        "matchesPerSecond": count / seconds,
+        "cpuSecondsPerMatch": cpu / count,
+        "bytesPerMatch": size / count,
+    }
+
+
+def benchmark_player_names(count, batched=True):
+    """
+    Measure adding `count` players to `player_names.json`, in batches
+    or writing the file after each player like `save_player`.
+    """
+
+    with TemporaryDirectory() as directory:
+        registry = PlayerRegistry(directory, batch_size=100 if batched else 1)
+        start = time.perf_counter()
+
+        for number in range(count):
+            registry.add(name=f"Player{number}", tag="1", puuid=f"puuid{number}")
+
+        registry.flush()
+        seconds = time.perf_counter() - start
+
+    return {
+        "benchmark": "player_names",
+        "batched": batched,
+        "count": count,
+        "seconds": seconds,
+        "playersPerSecond": count / seconds,
+    }
+
+
+def save_formats():
+    """Return storage formats available for `benchmark_save_match`."""
+
+    formats = []
+
+    for format in FORMATS:
+        if format == "zstd":
+            try:
+                zstandard()
+            except MyError:
+                continue
+
+        formats.append(format)
+
+    return formats
+
+
+def run_benchmarks(
+    sizes=(100, 1000),
+    concurrency=(1, 8),
+    latency=(0.02,),
+    store_sizes=(0,),
+    micro=True,
+    micro_size=10000,
+    progress=None,
+):
+    """
+    Run the ingest benchmark for each combination of the parameters,
+    then the micro-benchmarks.
+
+    Parameters
+    ----------
+    sizes, concurrency, latency, store_sizes : sequence
+        Parameters of `benchmark_ingest`.
+
+    micro : bool, optional
+        When True, run `benchmark_unsaved_matches`, `benchmark_save_match`
+        and `benchmark_player_names`.
+
+    micro_size : int, optional
+        Number of saved matches for `benchmark_unsaved_matches`, ten times fewer
+        matches are saved by `benchmark_save_match`.
+
+    progress : callable, optional
+        Called with each result as soon as it is ready.
+
+    Returns
+    -------
+    dict
+        Results in the format saved by `save_results`.
+    """
+
+    results = []
+
+    def add(result):
+        results.append(result)
+
+        if progress is not None:
+            progress(result)
+
+    for size in sizes:
+        for workers in concurrency:
+            for delay in latency:
+                for store_size in store_sizes:
+                    add(
+                        benchmark_ingest(
+                            size=size,
+                            concurrency=workers,
+                            latency=delay,
+                            store_size=store_size,
+                        )
+                    )
+
+    if micro:
+        add(benchmark_unsaved_matches(micro_size))
+
+        for format in save_formats():
+            add(benchmark_save_match(max(1, micro_size // 10), format=format))
+
+        add(benchmark_player_names(max(1, micro_size // 10), batched=False))
+        add(benchmark_player_names(max(1, micro_size // 10), batched=True))
+
+    return {
+        "createdAt": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+
+
+def save_results(path, results):
+    """Save benchmark results to a JSON file."""
+
+    directory = os.path.dirname(path)
+
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=4)
+
+
+def load_results(path):
+    """Load benchmark results saved by `save_results`."""
+
+    if not os.path.exists(path):
+        raise MyError(f"Benchmark results '{path}' not found.")
+
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+# Metrics compared between runs, for each of them a higher value is better
+METRICS = {
+    "matchesPerSecond": True,
+    "requestsPerSecond": True,
+    "playersPerSecond": True,
+    "seconds": False,
+    "scanSeconds": False,
+    "manifestSeconds": False,
+    "warmSeconds": False,
+    "cpuSecondsPerMatch": False,
+    "peakRssBytes": False,
+    "bytesPerMatch": False,
+}
+
+# Result fields that are measurements, the other fields are benchmark parameters
+MEASUREMENTS = set(METRICS) | {
+    "matches",
+    "requests",
+    "rateLimitWaitSeconds",
+    "bytesWritten",
+}
+
+
+def result_key(result):
+    """Return the benchmark name and parameters of the result."""
+    return tuple(
+        sorted(
+            (name, value) for name, value in result.items() if name not in MEASUREMENTS
+        )
+    )
+
+
+def compare_results(old, new):
+    """
+    Compare metrics of the benchmarks present in both runs.
+
+    Parameters
+    ----------
+    old, new : dict
+        Results of two runs, see `run_benchmarks`.
+
+    Returns
+    -------
+    list of dict
+        For each benchmark and metric: `benchmark` parameters, `metric` name,
+        `old` and `new` values, `change` as the ratio of the new and old values,
+        and `better` that is True when the new value is better.
+    """
+
+    old_results = {result_key(result): result for result in old["results"]}
+    changes = []
+
+    for result in new["results"]:
+        previous = old_results.get(result_key(result))
+
+        if previous is None:
+            continue
+
+        for metric, higher_is_better in METRICS.items():
+            before, after = previous.get(metric), result.get(metric)
+
+            if not before or after is None:
+                continue
+
+            changes.append(
+                {
+                    "benchmark": dict(result_key(result)),
+                    "metric": metric,
+                    "old": before,
+                    "new": after,
+                    "change": after / before,
+                    "better": (after > before) == higher_is_better,
+                }
+            )
+
+    return changes
@@ -0,0 +1,109 @@
+import os
+from tempfile import TemporaryDirectory
+
+from lolstats.benchmark import (
+    PeakMemory,
+    directory_size,
+    benchmark_ingest,
+    benchmark_unsaved_matches,
+    benchmark_save_match,
+    benchmark_player_names,
+    save_results,
+    load_results,
+    compare_results,
+)
+
+
+def test_directory_size():
+    with TemporaryDirectory() as tmpdir:
+        os.makedirs(os.path.join(tmpdir, "a"))
+
+        with open(os.path.join(tmpdir, "a", "file"), "wb") as file:
+            file.write(b"x" * 100)
+
+        with open(os.path.join(tmpdir, "file"), "wb") as file:
+            file.write(b"x" * 20)
+
+        assert directory_size(tmpdir) == 120
+
+
+def test_peak_memory():
+    with PeakMemory() as memory:
+        data = bytearray(50 * 2**20)
+
+    if memory.peak is not None:
+        assert memory.peak > len(data)
+
+
+def test_benchmark_ingest():
+    result = benchmark_ingest(size=30, concurrency=4, store_size=50)
+
+    assert result["benchmark"] == "ingest"
+    assert result["matches"] == 30
+
+    # Account, one page of match IDs and the matches
+    assert result["requests"] == 32
+    assert result["matchesPerSecond"] > 0
+    assert result["rateLimitWaitSeconds"] == 0
+    assert result["cpuSecondsPerMatch"] > 0
+    assert result["bytesWritten"] > 30 * 10000
+
+
+def test_benchmark_ingest_rate_limits():
+    result = benchmark_ingest(size=5, app_limits="4:1")
+
+    assert result["matches"] == 5
+    assert result["rateLimitWaitSeconds"] > 0
+
+
+def test_micro_benchmarks():
+    result = benchmark_unsaved_matches(store_size=100, lookups=10)
+    assert result["scanSeconds"] > 0
+    assert result["warmSeconds"] > 0
+
+    result = benchmark_save_match(count=3, format="gzip")
+    assert result["count"] == 3
+    assert 0 < result["bytesPerMatch"] < 50_000
+
+    result = benchmark_player_names(count=20, batched=False)
+    assert result["playersPerSecond"] > 0
+
+
+def test_compare_results():
+    old = {
+        "results": [
+            {"benchmark": "ingest", "size": 100, "matchesPerSecond": 50, "seconds": 2},
+            {"benchmark": "ingest", "size": 1000, "matchesPerSecond": 40},
+        ]
+    }
+
+    new = {
+        "results": [
+            {"benchmark": "ingest", "size": 100, "matchesPerSecond": 100, "seconds": 1},
+            {"benchmark": "save_match", "count": 10, "seconds": 1},
+        ]
+    }
+
+    with TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "results", "old.json")
+        save_results(path, old)
+        old = load_results(path)
+
+    assert compare_results(old, new) == [
+        {
+            "benchmark": {"benchmark": "ingest", "size": 100},
+            "metric": "matchesPerSecond",
+            "old": 50,
+            "new": 100,
+            "change": 2,
+            "better": True,
+        },
+        {
+            "benchmark": {"benchmark": "ingest", "size": 100},
+            "metric": "seconds",
+            "old": 2,
+            "new": 1,
+            "change": 0.5,
+            "better": True,
+        },
+    ]
@@ -0,0 +1,457 @@
+"""Export saved matches into columnar tables for analysis.
+
+Matches are flattened into three tables:
+  * `participants`: one row per participant in a match, with `challenges`
+    and `perks` flattened into columns, for example `challenges_kda`
+    and `perks_primaryStyle`.
+  * `teams`: one row per team in a match.
+  * `matches`: one row per match.
+
+Tables are written as Parquet files (requires `pyarrow` library) or NumPy
+`.npz` files, one file per table for each export run.
+"""
+
+import os
+import numpy as np
+from lolstats.errors import MyError
+from lolstats.stores import open_match_store
+
+TABLES = ("participants", "teams", "matches")
+EXPORT_FORMATS = ("parquet", "npz")
+
+# Number of matches flattened and written per file
+EXPORT_BATCH_SIZE = 5000
+
+
+def pyarrow_modules():
+    """
+    Return `pyarrow` and `pyarrow.parquet` modules, None if `pyarrow` is not installed.
+    """
+
+    try:
+        import pyarrow  # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+
+    return pyarrow, pyarrow.parquet
+
+
+def flatten(data, prefix=""):
+    """
+    Flatten nested dictionaries into one dictionary with keys joined by `_`,
+    for example {"challenges": {"kda": 3}} into {"challenges_kda": 3}.
+    Lists are skipped.
+    """
+
+    row = {}
+
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+
+        if isinstance(value, dict):
+            row.update(flatten(value, prefix=f"{name}_"))
+        elif not isinstance(value, list):
+            row[name] = value
+
+    return row
+
+
+def flatten_perks(perks):
+    """
+    Flatten participant's runes into columns: stat perks, primary and secondary
+    rune paths (`perks_primaryStyle`, `perks_subStyle`) and selected runes
+    (`perks_primaryStyle_0` to `perks_primaryStyle_3`, `perks_subStyle_0`, `perks_subStyle_1`).
+    """
+
+    row = flatten(perks.get("statPerks", {}), prefix="perks_statPerks_")
+
+    for style in perks.get("styles", []):
+        name = f"perks_{style.get('description')}"
+        row[name] = style.get("style")
+
+        for i, selection in enumerate(style.get("selections", [])):
+            row[f"{name}_{i}"] = selection.get("perk")
+
+    return row
+
+
+def match_rows(match):
+    """
+    Flatten match data into table rows.
+
+    Parameters
+    ----------
+    match : dict
+      Match data.
+
+    Returns
+    -------
+    dict
+      Maps table name (see TABLES) to the list of rows (dict) for the match.
+    """
+
+    id = match["metadata"]["matchId"]
+    info = match.get("info", {})
+    participants = []
+    teams = []
+
+    for participant in info.get("participants", []):
+        row = {"matchId": id}
+        row.update(flatten(participant))
+
+        for key in [key for key in row if key.startswith("perks_")]:
+            del row[key]
+
+        row.update(flatten_perks(participant.get("perks", {})))
+        participants.append(row)
+
+    for team in info.get("teams", []):
+        row = {"matchId": id}
+        row.update(flatten(team))
+
+        for i, ban in enumerate(team.get("bans", [])):
+            row[f"ban_{i}"] = ban.get("championId")
+
+        teams.append(row)
+
+    row = {"matchId": id, "dataVersion": match["metadata"].get("dataVersion")}
+    row.update(flatten(info))
+
+    return {"participants": participants, "teams": teams, "matches": [row]}
+
+
+def column_kind(values):
+    """
+    Return type of the column values: `bool`, `int`, `float` or `str`.
+    None values are ignored.
+    """
+
+    kinds = set(map(type, values))
+    kinds.discard(type(None))
+
+    if kinds == {bool}:
+        return "bool"
+
+    if kinds == {int}:
+        return "int"
+
+    if kinds and kinds <= {int, float}:
+        return "float"
+
+    return "str"
+
+
+def to_array(values):
+    """
+    Convert column values to a NumPy array. Columns with missing
+    numbers or booleans are converted to floats with NaN values.
+    """
+
+    kind = column_kind(values)
+    missing = None in values
+
+    if kind == "str":
+        return np.array(["" if value is None else str(value) for value in values])
+
+    if missing:
+        values = [np.nan if value is None else value for value in values]
+        return np.array(values, dtype=np.float64)
+
+    return np.array(values, dtype={"bool": bool, "int": np.int64}.get(kind, np.float64))
+
+
+def rows_to_columns(rows):
+    """
+    Convert table rows into columns.
+
+    Parameters
+    ----------
+    rows : list of dict
+      Table rows.
+
+    Returns
+    -------
+    dict
+      Maps column name to NumPy array of values.
+    """
+
+    columns = {}
+
+    for i, row in enumerate(rows):
+        for name, value in row.items():
+            column = columns.get(name)
+
+            if column is None:
+                column = columns[name] = [None] * len(rows)
+
+            column[i] = value
+
+    return {name: to_array(values) for name, values in columns.items()}
+
+
+def fill_value(array):
+    """Return the value used for rows of a column missing in some files."""
+    return "" if array.dtype.kind == "U" else np.nan
+
+
+def concat_columns(parts):
+    """
+    Join columns from several files into one table. Columns missing
+    in some files are filled with NaN or empty strings.
+
+    Parameters
+    ----------
+    parts : list of dict
+      Columns of each file, see `rows_to_columns`.
+
+    Returns
+    -------
+    dict
+      Maps column name to NumPy array of values.
+    """
+
+    names = {}
+
+    for part in parts:
+        for name, array in part.items():
+            names.setdefault(name, array)
+
+    result = {}
+
+    for name, example in names.items():
+        arrays = []
+
+        for part in parts:
+            rows = len(next(iter(part.values()))) if part else 0
+
+            if name in part:
+                arrays.append(part[name])
+            else:
+                arrays.append(np.full(rows, fill_value(example)))
+
+        if any(array.dtype.kind != example.dtype.kind for array in arrays):
+            if example.dtype.kind == "U":
+                arrays = [array.astype(str) for array in arrays]
+            else:
+                arrays = [array.astype(np.float64) for array in arrays]
+
+        result[name] = np.concatenate(arrays)
+
+    return result
+
+
+def write_table(path, columns, format):
+    """
+    Write table columns to a Parquet or `.npz` file.
+
+    Parameters
+    ----------
+    path : str
+      Path to the file without extension.
+
+    columns : dict
+      Maps column name to NumPy array of values.
+
+    format : str
+      `parquet` or `npz`.
+
+    Returns
+    -------
+    str
+      Path to the written file.
+    """
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    final_path = f"{path}.{format}"
+    temp_path = f"{path}.tmp.{format}"
+
+    if format == "parquet":
+        pyarrow, parquet = pyarrow_modules()
+        table = pyarrow.table({name: array for name, array in columns.items()})
+        parquet.write_table(table, temp_path)
+    else:
+        np.savez(temp_path, **columns)
+
+    os.replace(temp_path, final_path)
+    return final_path
+
+
+def read_table_file(path, columns=None):
+    """
+    Read table columns from a Parquet or `.npz` file.
+
+    Parameters
+    ----------
+    path : str
+      Path to the file.
+
+    columns : list of str, optional
+      Names of the columns to read, None to read all columns.
+      Columns missing in the file are skipped.
+
+    Returns
+    -------
+    dict
+      Maps column name to NumPy array of values.
+    """
+
+    if path.endswith(".parquet"):
+        modules = pyarrow_modules()
+
+        if modules is None:
+            raise MyError(f"Reading '{path}' requires pyarrow library.")
+
+        names = modules[1].read_schema(path).names
+
+        if columns is not None:
+            names = [name for name in columns if name in names]
+
+        table = modules[1].read_table(path, columns=names)
+        result = {}
+
+        for name in names:
+            array = table.column(name).to_numpy()
+
+            if array.dtype == object:
+                array = array.astype(str)
+
+            result[name] = array
+
+        return result
+
+    with np.load(path) as data:
+        names = data.files
+
+        if columns is not None:
+            names = [name for name in columns if name in names]
+
+        return {name: data[name] for name in names}
+
+
+def table_files(output, table):
+    """Return paths to the files of the table in export order."""
+
+    directory = os.path.join(output, table)
+
+    if not os.path.exists(directory):
+        return []
+
+    return [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.startswith("part-") and ".tmp." not in name
+    ]
+
+
+def load_table(output, table, columns=None):
+    """
+    Load the exported table. Only the requested columns are read from disk.
+
+    Parameters
+    ----------
+    output : str
+      Path to the export directory, for example `data/export`.
+
+    table : str
+      Table name, see TABLES.
+
+    columns : list of str, optional
+      Names of the columns to load, for example ["championName", "win"].
+      None to load all columns.
+
+    Returns
+    -------
+    dict
+      Maps column name to NumPy array of values.
+    """
+
+    return concat_columns(
+        [read_table_file(path, columns=columns) for path in table_files(output, table)]
+    )
+
+
+def exported_ids(output):
+    """Return IDs of the matches that were already exported."""
+
+    path = os.path.join(output, "exported_ids.txt")
+
+    if not os.path.exists(path):
+        return set()
+
+    with open(path, "r", encoding="utf-8") as file:
+        return {line.strip() for line in file if line.strip()}
+
+
+def export_matches(directory, output=None, storage="files", format=None, exclude=()):
+    """
+    Export saved matches that were not exported before into columnar tables.
+    Each run adds a new file to each table.
+
+    Parameters
+    ----------
+    directory : str
+        Path to the data directory.
+
+    output : str, optional
+        Path to the export directory. Default: `{directory}/export`.
+
+    storage : str, optional
+        Storage backend of the matches, see `lolstats.stores.STORAGES`.
+
+    format : str, optional
+        `parquet` or `npz`. By default, Parquet is used when `pyarrow`
+        library is installed.
+
+    exclude : collection of str, optional
+        IDs of the matches not to export, for example the ones already
+        exported to another directory.
+
+    Returns
+    -------
+    int
+        Number of exported matches.
+    """
+
+    output = output or os.path.join(directory, "export")
+
+    if format is None:
+        format = "parquet" if pyarrow_modules() is not None else "npz"
+
+    if format not in EXPORT_FORMATS:
+        raise MyError(
+            f"Unknown format '{format}', use one of: {', '.join(EXPORT_FORMATS)}."
+        )
+
+    if format == "parquet" and pyarrow_modules() is None:
+        raise MyError("Parquet format requires pyarrow library: pip install pyarrow")
+
+    done = exported_ids(output) | set(exclude)
+    part = len(table_files(output, "matches"))
+    total = 0
+
+    with open_match_store(directory=directory, storage=storage) as store:
+        ids = sorted(store.ids() - done)
+
+        for start in range(0, len(ids), EXPORT_BATCH_SIZE):
+            batch = ids[start : start + EXPORT_BATCH_SIZE]
+            rows = {table: [] for table in TABLES}
+
+            for id in batch:
+                for table, table_rows in match_rows(store.load(id)).items():
+                    rows[table].extend(table_rows)
+
+            for table in TABLES:
+                path = os.path.join(output, table, f"part-{part:05d}")
+                write_table(path, rows_to_columns(rows[table]), format=format)
+
+            # Record exported matches after their rows are written
+            with open(
+                os.path.join(output, "exported_ids.txt"), "a", encoding="utf-8"
+            ) as file:
+                file.writelines(f"{id}\n" for id in batch)
+
+            part += 1
+            total += len(batch)
+
+    return total
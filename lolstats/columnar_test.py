@@ -0,0 +1,141 @@
+import json
+import os
+import numpy as np
+import pytest
+from tempfile import TemporaryDirectory
+
+from lolstats.columnar import (
+    flatten,
+    match_rows,
+    rows_to_columns,
+    concat_columns,
+    export_matches,
+    load_table,
+    exported_ids,
+)
+from lolstats.stores import open_match_store
+from lolstats.errors import MyError
+
+
+def example_match(id="OC1_584214853"):
+    with open(os.path.join("docs", "match.json"), "r", encoding="utf-8") as file:
+        match = json.load(file)
+
+    match["metadata"]["matchId"] = id
+    return match
+
+
+def test_flatten():
+    result = flatten({"a": 1, "b": {"c": 2, "d": {"e": True}}, "f": [1, 2]})
+
+    assert result == {"a": 1, "b_c": 2, "b_d_e": True}
+
+
+def test_match_rows():
+    rows = match_rows(example_match())
+
+    assert len(rows["participants"]) == 10
+    assert len(rows["teams"]) == 2
+    assert len(rows["matches"]) == 1
+
+    participant = rows["participants"][0]
+    assert participant["matchId"] == "OC1_584214853"
+    assert participant["championName"] == "Akali"
+    assert participant["kills"] == 6
+    assert participant["win"] is True
+    assert participant["challenges_kda"] == pytest.approx(3.3333333)
+    assert participant["perks_primaryStyle"] == 8100
+    assert participant["perks_primaryStyle_0"] == 8112
+    assert "perks_subStyle_1" in participant
+    assert "perks_statPerks_defense" in participant
+
+    team = rows["teams"][0]
+    assert team["ban_0"] == 119
+    assert team["objectives_baron_kills"] == 0
+    assert "bans" not in team
+
+    match = rows["matches"][0]
+    assert match["queueId"] == 400
+    assert "participants" not in match
+
+
+def test_rows_to_columns():
+    columns = rows_to_columns(
+        [
+            {"a": 1, "b": True, "c": "x", "d": 1},
+            {"a": 2, "b": False, "d": 1.5},
+        ]
+    )
+
+    assert columns["a"].dtype == np.int64
+    assert columns["b"].dtype == bool
+    assert columns["c"].tolist() == ["x", ""]
+    assert columns["d"].dtype == np.float64
+
+
+def test_rows_to_columns_missing_numbers():
+    columns = rows_to_columns([{"a": 1}, {"b": 2}])
+
+    assert columns["a"][0] == 1
+    assert np.isnan(columns["a"][1])
+
+
+def test_concat_columns():
+    result = concat_columns(
+        [
+            {"a": np.array([1, 2]), "b": np.array(["x", "y"])},
+            {"a": np.array([3]), "c": np.array([1.5])},
+        ]
+    )
+
+    assert result["a"].tolist() == [1, 2, 3]
+    assert result["b"].tolist() == ["x", "y", ""]
+    assert np.isnan(result["c"][:2]).all()
+    assert result["c"][2] == 1.5
+
+
+@pytest.mark.parametrize("format", ["npz", "parquet"])
+@pytest.mark.parametrize("storage", ["files", "sqlite"])
+def test_export_matches(format, storage):
+    if format == "parquet":
+        pytest.importorskip("pyarrow")
+
+    with TemporaryDirectory() as tmpdir:
+        with open_match_store(tmpdir, storage=storage) as store:
+            store.save([example_match("OC1_1"), example_match("OC1_2")])
+
+        assert export_matches(tmpdir, storage=storage, format=format) == 2
+
+        # Nothing new to export
+        assert export_matches(tmpdir, storage=storage, format=format) == 0
+
+        with open_match_store(tmpdir, storage=storage) as store:
+            store.save([example_match("OC1_3")])
+
+        assert export_matches(tmpdir, storage=storage, format=format) == 1
+
+        export_dir = os.path.join(tmpdir, "export")
+        assert exported_ids(export_dir) == {"OC1_1", "OC1_2", "OC1_3"}
+
+        participants = load_table(export_dir, "participants")
+        assert len(participants["matchId"]) == 30
+        assert participants["matchId"][-1] == "OC1_3"
+        assert participants["championName"][0] == "Akali"
+        assert participants["kills"].dtype == np.int64
+        assert participants["win"].dtype == bool
+
+        teams = load_table(export_dir, "teams")
+        assert len(teams["teamId"]) == 6
+
+        matches = load_table(export_dir, "matches")
+        assert matches["matchId"].tolist() == ["OC1_1", "OC1_2", "OC1_3"]
+
+        selected = load_table(export_dir, "participants", columns=["kills", "other"])
+        assert list(selected) == ["kills"]
+        assert len(selected["kills"]) == 30
+
+
+def test_export_matches_unknown_format():
+    with TemporaryDirectory() as tmpdir:
+        with pytest.raises(MyError, match="Unknown format"):
+            export_matches(tmpdir, format="csv")
@@ -0,0 +1,191 @@
+"""Discover players from saved matches and load their matches, breadth first."""
+
+import json
+import os
+from collections import deque
+from lolstats.disk import write_json_atomic
+from lolstats.roster import load_roster_matches
+from lolstats.stores import open_match_store
+
+# Number of players whose matches are loaded together, see `load_roster_matches`
+CRAWL_BATCH_SIZE = 10
+
+
+def crawl_state_path(directory):
+    """Return path to the file with the crawl progress."""
+    return os.path.join(directory, "crawl.json")
+
+
+def load_crawl_state(directory):
+    """
+    Load progress of the crawl saved by `save_crawl_state`.
+
+    Parameters
+    ----------
+    directory : str
+        Path to the data directory.
+
+    Returns
+    -------
+    dict
+        Dictionary with keys:
+            * `frontier`: list of [puuid, depth] pairs of players waiting
+              to be crawled, in crawl order.
+            * `seen`: set of PUUIDs of crawled players and players in the frontier.
+            * `players`: number of crawled players.
+            * `matches`: number of matches saved by the crawl.
+    """
+
+    path = crawl_state_path(directory)
+
+    if not os.path.exists(path):
+        return {"frontier": [], "seen": set(), "players": 0, "matches": 0}
+
+    with open(path, "r", encoding="utf-8") as file:
+        state = json.load(file)
+
+    state["seen"] = set(state["seen"])
+    return state
+
+
+def save_crawl_state(directory, state):
+    """
+    Save progress of the crawl, replacing the file atomically,
+    so an interrupted crawl can be resumed.
+
+    Parameters
+    ----------
+    directory : str
+        Path to the data directory.
+
+    state : dict
+        Crawl progress, see `load_crawl_state`.
+    """
+
+    data = dict(state, seen=sorted(state["seen"]))
+    write_json_atomic(crawl_state_path(directory), data, indent=None)
+
+
+def crawl(
+    directory,
+    seeds,
+    route,
+    api_key,
+    max_depth=1,
+    max_players=100,
+    max_matches=1000,
+    matches_per_player=20,
+    queue=None,
+    concurrency=1,
+    format="json",
+    storage="files",
+    raw=False,
+):
+    """
+    Load matches of the seed players, then of the players they played with,
+    and so on, breadth first. Progress is saved to `crawl.json` after each
+    batch of players, and the next call continues the crawl.
+
+    Parameters
+    ----------
+    directory : str
+        Path to directory where the matches are saved.
+
+    seeds : list of str
+        PUUIDs of the players to start from. Seeds that were already crawled
+        or are waiting in the frontier are skipped.
+
+    route, api_key, queue, concurrency, format, storage, raw
+        See `lolstats.matches.load_matches`.
+
+    max_depth : int, optional
+        Maximum distance from the seed players: 0 to crawl the seeds only,
+        1 to crawl the seeds and their co-players, and so on.
+
+    max_players : int, optional
+        Maximum total number of crawled players.
+
+    max_matches : int, optional
+        The crawl stops after the batch of players in which the total number
+        of matches saved by the crawl reaches `max_matches`.
+
+    matches_per_player : int, optional
+        Maximum number of recent matches loaded for each player.
+
+    Returns
+    -------
+    dict
+        Dictionary with keys:
+            * `players`: total number of crawled players.
+            * `matches`: total number of matches saved by the crawl.
+            * `frontier`: number of discovered players waiting to be crawled.
+            * `failed`: number of matches that failed to load in this call,
+              see `load_roster_matches`.
+    """
+
+    state = load_crawl_state(directory)
+    frontier = deque(tuple(item) for item in state["frontier"])
+
+    for puuid in seeds:
+        if puuid not in state["seen"]:
+            state["seen"].add(puuid)
+            frontier.append((puuid, 0))
+
+    state["frontier"] = [list(item) for item in frontier]
+    save_crawl_state(directory, state)
+    failed = 0
+
+    # The store is kept open for the whole crawl, so that the manifest
+    # of saved match files is written once instead of after each batch
+    with open_match_store(directory=directory, storage=storage, format=format) as store:
+        while (
+            frontier
+            and state["players"] < max_players
+            and state["matches"] < max_matches
+        ):
+            size = min(CRAWL_BATCH_SIZE, max_players - state["players"], len(frontier))
+            batch = [frontier.popleft() for _ in range(size)]
+
+            result = load_roster_matches(
+                directory=directory,
+                players=[{"puuid": puuid} for puuid, _ in batch],
+                total_matches=matches_per_player,
+                route=route,
+                api_key=api_key,
+                queue=queue,
+                concurrency=concurrency,
+                raw=raw,
+                store=store,
+                # Co-players are read from the saved matches too, so all recent
+                # matches are listed, including the ones saved by previous runs
+                incremental=False,
+                stop_at_saved=False,
+            )
+
+            for puuid, depth in batch:
+                if depth >= max_depth:
+                    continue
+
+                for id in result["players"][puuid]["ids"]:
+                    try:
+                        co_players = store.participants(id)
+                    except KeyError:
+                        continue
+
+                    for co_player in co_players:
+                        if co_player not in state["seen"]:
+                            state["seen"].add(co_player)
+                            frontier.append((co_player, depth + 1))
+
+            state["players"] += len(batch)
+            state["matches"] += result["new"]
+            failed += result["failed"]
+            state["frontier"] = [list(item) for item in frontier]
+            save_crawl_state(directory, state)
+
+    return {
+        "players": state["players"],
+        "matches": state["matches"],
+        "frontier": len(frontier),
+        "failed": failed,
+    }
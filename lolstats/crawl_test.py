@@ -0,0 +1,113 @@
+import os
+import pytest
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from lolstats.crawl import crawl, load_crawl_state, save_crawl_state
+
+# Matches of each player, newest first, and players of each match
+PLAYER_MATCHES = {
+    "a": ["3", "1"],
+    "b": ["1"],
+    "c": ["2", "1"],
+    "d": ["2"],
+    "e": ["3"],
+}
+
+MATCH_PLAYERS = {
+    "1": ["a", "b", "c"],
+    "2": ["c", "d"],
+    "3": ["a", "e"],
+}
+
+
+def run_crawl(tmpdir, seeds, storage="files", **kwargs):
+    def list_ids(puuid, start, count, **kwargs):
+        return PLAYER_MATCHES[puuid][start : start + count]
+
+    def get_match(id, **kwargs):
+        return {
+            "metadata": {"matchId": id, "participants": MATCH_PLAYERS[id]},
+            "info": {"gameEndTimestamp": int(id) * 1000},
+        }
+
+    with patch("lolstats.matches.get_list_of_match_ids", side_effect=list_ids), patch(
+        "lolstats.lol_http.get_match", side_effect=get_match
+    ) as mock_match:
+        result = crawl(
+            directory=tmpdir,
+            seeds=seeds,
+            route="asia",
+            api_key="testkey",
+            storage=storage,
+            **kwargs,
+        )
+
+        return result, mock_match
+
+
+def test_save_crawl_state():
+    with TemporaryDirectory() as tmpdir:
+        state = {"frontier": [["a", 1]], "seen": {"a", "b"}, "players": 1, "matches": 2}
+        save_crawl_state(tmpdir, state)
+
+        assert load_crawl_state(tmpdir) == state
+        assert os.listdir(tmpdir) == ["crawl.json"]
+
+
+@pytest.mark.parametrize("storage", ["files", "sqlite"])
+def test_crawl_depth(storage):
+    with TemporaryDirectory() as tmpdir:
+        result, _ = run_crawl(tmpdir, ["a"], storage=storage, max_depth=1)
+
+        # Players b, c and e played with a, d is two steps away
+        assert result == {"players": 4, "matches": 3, "frontier": 0, "failed": 0}
+        assert load_crawl_state(tmpdir)["seen"] == {"a", "b", "c", "e"}
+
+        # Seeds that were already crawled are skipped
+        result, mock_match = run_crawl(tmpdir, ["a"], storage=storage, max_depth=2)
+        assert result == {"players": 4, "matches": 3, "frontier": 0, "failed": 0}
+        assert mock_match.call_count == 0
+
+
+def test_crawl_resume():
+    with TemporaryDirectory() as tmpdir:
+        result, _ = run_crawl(tmpdir, ["a"], max_depth=2, max_players=1)
+        assert result == {"players": 1, "matches": 2, "frontier": 3, "failed": 0}
+
+        state = load_crawl_state(tmpdir)
+        assert state["frontier"] == [["e", 1], ["b", 1], ["c", 1]]
+
+        # Continue without seeds
+        result, mock_match = run_crawl(tmpdir, [], max_depth=2, max_players=10)
+        assert result == {"players": 5, "matches": 3, "frontier": 0, "failed": 0}
+        assert [c.kwargs["id"] for c in mock_match.call_args_list] == ["2"]
+
+
+def test_crawl_max_matches():
+    with TemporaryDirectory() as tmpdir:
+        result, _ = run_crawl(tmpdir, ["b"], max_depth=2, max_matches=1)
+
+        assert result == {"players": 1, "matches": 1, "frontier": 2, "failed": 0}
+
+
+def test_crawl_saved_matches():
+    with TemporaryDirectory() as tmpdir:
+        run_crawl(tmpdir, ["a"], max_depth=0)
+        os.remove(os.path.join(tmpdir, "crawl.json"))
+
+        # Players are discovered from the matches saved by the previous run
+        result, mock_match = run_crawl(tmpdir, ["a"], max_depth=1)
+        assert result == {"players": 4, "matches": 1, "frontier": 0, "failed": 0}
+        assert load_crawl_state(tmpdir)["seen"] == {"a", "b", "c", "e"}
+        assert [c.kwargs["id"] for c in mock_match.call_args_list] == ["2"]
+
+
+def test_crawl_writes_manifest_once():
+    with TemporaryDirectory() as tmpdir, patch(
+        "lolstats.crawl.CRAWL_BATCH_SIZE", 1
+    ), patch("lolstats.stores.save_match_index") as mock_save_index:
+        result, _ = run_crawl(tmpdir, ["a"], max_depth=2)
+
+        assert result == {"players": 5, "matches": 3, "frontier": 0, "failed": 0}
+        assert mock_save_index.call_count == 1
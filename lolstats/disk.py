@@ -1,17 +1,304 @@
 """Save match data to disk"""
 
+import gzip
 import json
 import os
 import glob
+import threading
+import time
+import zlib
+from lolstats.errors import MyError
+from lolstats.raw import raw_match_summary
+from lolstats.players import player_registry
+
+# Layouts of the matches directory:
+#   * `flat`: {directory}/{id}.json
+#   * `sharded`: {directory}/{platform}/{bucket}/{id}.json, where platform is
+#     the prefix of the match ID (e.g. NA1, EUW1) and bucket is one of 256
+#     hash buckets, for example `NA1/3f/NA1_4912345678.json`.
+LAYOUTS = ("flat", "sharded")
+SHARD_BUCKETS = 256
+
+# Storage formats of match files and their file extensions:
+#   * `json`: indented JSON.
+#   * `compact`: JSON without whitespace.
+#   * `gzip`: compact JSON compressed with gzip.
+#   * `zstd`: compact JSON compressed with Zstandard, requires `zstandard` library.
+FORMATS = {"json": ".json", "compact": ".json", "gzip": ".json.gz", "zstd": ".json.zst"}
+EXTENSIONS = (".json", ".json.gz", ".json.zst")
+
+# Number of seconds PUUIDs of Riot IDs are cached, see `load_account_cache`
+ACCOUNT_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Sets of saved match IDs for each matches directory, loaded once per process
+_match_indexes = {}
+_match_index_sizes = {}
+_match_index_lock = threading.Lock()
+_match_layouts = {}
 
 
 def make_dir_if_not_exists(directory):
     """Create a directory if it does not exist."""
-    if not os.path.exists(directory):
-        os.makedirs(directory)
+    os.makedirs(directory, exist_ok=True)
+
+
+def match_layout(directory):
+    """
+    Return layout of the matches directory, see LAYOUTS.
+    The layout is stored in the `layout.txt` file in the directory,
+    directories without the file use the flat layout.
+    """
+
+    key = os.path.abspath(directory)
+
+    if key not in _match_layouts:
+        path = os.path.join(directory, "layout.txt")
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                _match_layouts[key] = file.read().strip()
+        else:
+            _match_layouts[key] = "flat"
+
+    return _match_layouts[key]
+
+
+def set_match_layout(directory, layout):
+    """
+    Store layout of the matches directory.
+    Use `reshard_matches` to change the layout of a directory with saved matches.
+    """
+
+    if layout not in LAYOUTS:
+        raise MyError(f"Unknown layout '{layout}', use one of: {', '.join(LAYOUTS)}.")
+
+    make_dir_if_not_exists(directory)
+
+    with open(os.path.join(directory, "layout.txt"), "w", encoding="utf-8") as file:
+        file.write(f"{layout}\n")
+
+    _match_layouts[os.path.abspath(directory)] = layout
+
+
+def use_match_layout(directory, layout):
+    """
+    Use the layout for matches saved to the directory.
+
+    Raises
+    ------
+    MyError
+      If the directory already has matches saved in a different layout.
+    """
+
+    if layout == match_layout(directory):
+        return
+
+    if load_match_index(directory):
+        raise MyError(
+            f"Matches in '{directory}' are saved in {match_layout(directory)} layout. "
+            f"Run reshard.py to move them to {layout} layout."
+        )
+
+    set_match_layout(directory, layout)
+
+
+def shard(id):
+    """
+    Return subdirectory of the sharded layout for the match ID,
+    for example `NA1/3f` for `NA1_4912345678`.
+    """
+
+    platform = id.split("_")[0] if "_" in id else "other"
+    bucket = zlib.crc32(id.encode("utf-8")) % SHARD_BUCKETS
+    return f"{platform}/{bucket:02x}"
+
+
+def match_path(directory, id, layout=None, extension=".json"):
+    """
+    Return path to the match file.
+
+    Parameters
+    ----------
+    directory : str
+      Path to directory where the match is saved.
+
+    id : str
+      Match id.
+
+    layout : str, optional
+      Layout of the directory, see LAYOUTS. By default, the stored layout of the directory.
+
+    extension : str, optional
+      File extension, see EXTENSIONS.
+
+    Returns
+    -------
+    str
+      Path to the match file.
+    """
+
+    if (layout or match_layout(directory)) == "sharded":
+        return f"{directory}/{shard(id)}/{id}{extension}"
+
+    return f"{directory}/{id}{extension}"
+
+
+def find_match_file(directory, id):
+    """
+    Return path to the saved match file in any format and layout,
+    None if the match is not saved.
+    """
+
+    layout = match_layout(directory)
+    # The other layout is checked when the directory is being resharded
+    other = "flat" if layout == "sharded" else "sharded"
+
+    for path_layout in (layout, other):
+        for extension in EXTENSIONS:
+            path = match_path(directory, id, layout=path_layout, extension=extension)
+
+            if os.path.exists(path):
+                return path
+
+    return None
+
+
+def match_extension(filename):
+    """Return extension of the match file (see EXTENSIONS), None for other files."""
+
+    for extension in EXTENSIONS:
+        if filename.endswith(extension):
+            return extension
+
+    return None
+
+
+def zstandard():
+    """
+    Return `zstandard` module.
+
+    Raises
+    ------
+    MyError
+      If `zstandard` library is not installed.
+    """
+
+    try:
+        import zstandard as zstd  # pylint: disable=import-outside-toplevel
+    except ImportError as e:
+        raise MyError(
+            "zstd format requires zstandard library: pip install zstandard"
+        ) from e
+
+    return zstd
+
+
+def encode_match(match, format="json"):
+    """
+    Serialize match data to bytes in the storage format.
+
+    Parameters
+    ----------
+    match : dict
+      Match data.
+
+    format : str, optional
+      Storage format, see FORMATS.
+
+    Returns
+    -------
+    bytes
+    """
+
+    if format not in FORMATS:
+        raise MyError(f"Unknown format '{format}', use one of: {', '.join(FORMATS)}.")
+
+    if format == "json":
+        return json.dumps(match, indent=2).encode("utf-8")
+
+    data = json.dumps(match, separators=(",", ":")).encode("utf-8")
+    return compress_match(data, format=format)
+
+
+def compress_match(data, format="json"):
+    """
+    Compress match JSON for `gzip` and `zstd` storage formats.
+    JSON is returned unchanged for other formats.
+
+    Parameters
+    ----------
+    data : bytes
+      Match JSON.
+
+    format : str, optional
+      Storage format, see FORMATS.
+
+    Returns
+    -------
+    bytes
+    """
+
+    if format not in FORMATS:
+        raise MyError(f"Unknown format '{format}', use one of: {', '.join(FORMATS)}.")
+
+    if format == "gzip":
+        return gzip.compress(data, compresslevel=6)
+
+    if format == "zstd":
+        return zstandard().ZstdCompressor().compress(data)
+
+    return data
+
+
+def decode_match(data, extension=".json"):
+    """
+    Parse match data from the contents of the match file.
+
+    Parameters
+    ----------
+    data : bytes
+      Contents of the file.
+
+    extension : str, optional
+      File extension, see EXTENSIONS.
+
+    Returns
+    -------
+    dict
+      Match data.
+    """
+
+    return json.loads(decompress_match(data, extension=extension))
+
+
+def decompress_match(data, extension=".json"):
+    """
+    Return match JSON from the contents of the match file.
+
+    Parameters
+    ----------
+    data : bytes
+      Contents of the file.
+
+    extension : str, optional
+      File extension, see EXTENSIONS.
+
+    Returns
+    -------
+    bytes
+      Match JSON.
+    """
+
+    if extension == ".json.gz":
+        return gzip.decompress(data)
+
+    if extension == ".json.zst":
+        return zstandard().ZstdDecompressor().decompress(data)
 
+    return data
 
-def save_match(directory, id, match):
+
+def save_match(directory, id, match, format="json"):
     """
     Save match to disk.
 
@@ -25,14 +312,331 @@ def save_match(directory, id, match):
 
     match : dict
       Match data.
+
+    format : str, optional
+      Storage format, see FORMATS.
     """
 
-    filename = f"{directory}/{id}.json"
-    make_dir_if_not_exists(directory)
+    data = encode_match(match, format=format)
+    save_match_data(directory=directory, id=id, data=data, format=format)
+
+
+def save_raw_match(directory, id, data, format="json"):
+    """
+    Save match JSON returned by Riot API to disk without parsing it.
+
+    Parameters
+    ----------
+    directory : str
+      Path to directory where the match is saved.
+
+    id : str
+      Match id.
+
+    data : bytes
+      Match JSON.
+
+    format : str, optional
+      Storage format, see FORMATS. The JSON is saved as received
+      for `json` and `compact` formats.
+    """
+
+    data = compress_match(data, format=format)
+    save_match_data(directory=directory, id=id, data=data, format=format)
+
+
+def save_match_data(directory, id, data, format="json"):
+    """
+    Write the contents of the match file and add the match to the index.
+    The data is written to a temporary file first, which then replaces
+    the match file, so an interrupted write does not leave a truncated match.
+
+    Parameters
+    ----------
+    directory : str
+      Path to directory where the match is saved.
+
+    id : str
+      Match id.
+
+    data : bytes
+      Match data in the storage format, see `encode_match`.
+
+    format : str, optional
+      Storage format, see FORMATS.
+    """
+
+    filename = match_path(directory, id, extension=FORMATS[format])
+    make_dir_if_not_exists(os.path.dirname(filename))
+
+    temp_path = f"{filename}.tmp"
 
     # Save the match
-    with open(filename, "w", encoding="utf-8") as file:
-        json.dump(match, file, indent=2)
+    with open(temp_path, "wb") as file:
+        file.write(data)
+
+    os.replace(temp_path, filename)
+
+    index = _match_indexes.get(os.path.abspath(directory))
+
+    if index is not None:
+        index.add(id)
+
+
+def load_match(directory, id):
+    """
+    Load match from disk.
+
+    Parameters
+    ----------
+    directory : str
+      Path to directory where the match is saved.
+
+    id : str
+      Match id.
+
+    Returns
+    -------
+    dict
+      Match data.
+    """
+
+    path = find_match_file(directory, id)
+
+    if path is None:
+        raise FileNotFoundError(f"Match {id} is not saved in '{directory}'.")
+
+    with open(path, "rb") as file:
+        return decode_match(file.read(), extension=match_extension(path))
+
+
+def load_match_participants(directory, id):
+    """
+    Return PUUIDs of the match participants from `metadata.participants`,
+    without parsing the whole match.
+
+    Parameters
+    ----------
+    directory : str
+      Path to directory where the match is saved.
+
+    id : str
+      Match id.
+
+    Returns
+    -------
+    list of str
+      PUUIDs of the players.
+    """
+
+    path = find_match_file(directory, id)
+
+    if path is None:
+        raise FileNotFoundError(f"Match {id} is not saved in '{directory}'.")
+
+    with open(path, "rb") as file:
+        data = decompress_match(file.read(), extension=match_extension(path))
+
+    return raw_match_summary(data)["metadata"].get("participants", [])
+
+
+def match_index_path(directory):
+    """
+    Return path to the manifest file that lists the IDs of matches saved
+    in the directory, for example `data/matches.index` for `data/matches`.
+    """
+    return f"{os.path.normpath(directory)}.index"
+
+
+def scan_matches(directory):
+    """
+    Return IDs of the matches saved in the directory by listing its files.
+    Matches are found in all formats and in both flat and sharded layouts.
+
+    Parameters
+    ----------
+    directory : str
+      Directory where the matches are stored.
+
+    Returns
+    -------
+    set of str
+      Match IDs.
+    """
+
+    return {id for id, _ in match_files(directory)}
+
+
+def match_files(directory):
+    """
+    Iterate over matches saved in the directory.
+
+    Parameters
+    ----------
+    directory : str
+      Directory where the matches are stored.
+
+    Yields
+    ------
+    tuple of str
+      (match ID, path to the match file)
+    """
+
+    for path in shard_dirs(directory):
+        with os.scandir(path) as entries:
+            for entry in entries:
+                extension = match_extension(entry.name)
+
+                if extension is not None and entry.is_file():
+                    yield entry.name[: -len(extension)], entry.path
+
+
+def shard_dirs(directory):
+    """
+    Return the matches directory and all its shard subdirectories.
+    """
+
+    if not os.path.exists(directory):
+        return []
+
+    result = [directory]
+
+    with os.scandir(directory) as platforms:
+        for platform in platforms:
+            if not platform.is_dir():
+                continue
+
+            with os.scandir(platform.path) as buckets:
+                result.extend(bucket.path for bucket in buckets if bucket.is_dir())
+
+    return result
+
+
+def layout_dirs(directory):
+    """
+    Return the directories whose modification time changes when matches
+    are added or removed: the matches directory and, in the sharded layout,
+    its platform and shard subdirectories. Match files are not listed.
+    """
+
+    if not os.path.exists(directory):
+        return []
+
+    if match_layout(directory) != "sharded":
+        return [directory]
+
+    # The sharded layout only has layout.txt and platform directories at the top
+    return shard_dirs(directory)
+
+
+def read_match_index(directory):
+    """
+    Read IDs of the saved matches from the manifest file.
+
+    Parameters
+    ----------
+    directory : str
+      Directory where the matches are stored.
+
+    Returns
+    -------
+    set of str or None
+      Match IDs, or None if the manifest is missing or older than
+      the last change of the directory.
+    """
+
+    path = match_index_path(directory)
+
+    if not os.path.exists(path) or not os.path.exists(directory):
+        return None
+
+    changed = max(os.stat(dir).st_mtime_ns for dir in layout_dirs(directory))
+
+    if os.stat(path).st_mtime_ns < changed:
+        # Files were added or removed after the manifest was written
+        return None
+
+    with open(path, "r", encoding="utf-8") as file:
+        return {line.strip() for line in file if line.strip()}
+
+
+def load_match_index(directory):
+    """
+    Return IDs of the matches saved in the directory.
+
+    The IDs are loaded once per process from the manifest file
+    (see `save_match_index`), or by listing the directory when the
+    manifest is missing or stale, and then kept up to date by `save_match`.
+
+    Parameters
+    ----------
+    directory : str
+      Directory where the matches are stored.
+
+    Returns
+    -------
+    set of str
+      Match IDs.
+    """
+
+    key = os.path.abspath(directory)
+
+    with _match_index_lock:
+        if key not in _match_indexes:
+            ids = read_match_index(directory)
+
+            if ids is None:
+                ids = scan_matches(directory)
+                _match_index_sizes[key] = None
+            else:
+                _match_index_sizes[key] = len(ids)
+
+            _match_indexes[key] = ids
+
+        return _match_indexes[key]
+
+
+def forget_match_index(directory):
+    """
+    Drop the IDs of saved matches loaded in memory, so they are loaded again
+    on the next use.
+    """
+
+    key = os.path.abspath(directory)
+
+    with _match_index_lock:
+        _match_indexes.pop(key, None)
+        _match_index_sizes.pop(key, None)
+
+
+def save_match_index(directory):
+    """
+    Write IDs of the saved matches to the manifest file, so that the next
+    process does not need to list the directory. Does nothing if the
+    manifest is up to date.
+
+    Parameters
+    ----------
+    directory : str
+      Directory where the matches are stored.
+    """
+
+    key = os.path.abspath(directory)
+    ids = load_match_index(directory)
+
+    with _match_index_lock:
+        if _match_index_sizes.get(key) == len(ids):
+            return
+
+        path = match_index_path(directory)
+        make_dir_if_not_exists(os.path.dirname(path) or ".")
+        temp_path = f"{path}.tmp"
+
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.writelines(f"{id}\n" for id in sorted(ids))
+
+        os.replace(temp_path, path)
+        _match_index_sizes[key] = len(ids)
 
 
 def unsaved_matches(directory, ids):
@@ -53,15 +657,11 @@ def unsaved_matches(directory, ids):
       List of match IDs for matches that are not saved to disk.
     """
 
-    if os.path.exists(directory):
-        existing_files = os.listdir(directory)
-    else:
-        existing_files = []
-
-    return [id for id in ids if f"{id}.json" not in existing_files]
+    saved = load_match_index(directory)
+    return [id for id in ids if id not in saved]
 
 
-def save_matches(directory, matches):
+def save_matches(directory, matches, format="json"):
     """
     Save matches to disk.
 
@@ -72,11 +672,85 @@ def save_matches(directory, matches):
 
     matches : list of dict
       List of match dictionaries, where each dictionary contains match details.
+
+    format : str, optional
+      Storage format, see FORMATS.
     """
 
     for match in matches:
         id = match["metadata"]["matchId"]
-        save_match(directory=directory, id=id, match=match)
+        save_match(directory=directory, id=id, match=match, format=format)
+
+
+def save_raw_matches(directory, matches, format="json"):
+    """
+    Save matches to disk as received from Riot API.
+
+    Parameters
+    ----------
+    directory : str
+      Path to directory where the match is saved.
+
+    matches : list of tuple
+      List of (summary, data) pairs, where `summary` is match data with
+      the match ID (see `lolstats.raw.raw_match_summary`) and `data` is match JSON.
+
+    format : str, optional
+      Storage format, see FORMATS.
+    """
+
+    for summary, data in matches:
+        id = summary["metadata"]["matchId"]
+        save_raw_match(directory=directory, id=id, data=data, format=format)
+
+
+def reshard_matches(directory, layout):
+    """
+    Move saved matches into the layout, in place. Can be run again to finish
+    a migration that was interrupted.
+
+    Parameters
+    ----------
+    directory : str
+      Directory where the matches are stored.
+
+    layout : str
+      New layout, see LAYOUTS.
+
+    Returns
+    -------
+    int
+      Number of moved match files.
+    """
+
+    if layout not in LAYOUTS:
+        raise MyError(f"Unknown layout '{layout}', use one of: {', '.join(LAYOUTS)}.")
+
+    moved = 0
+
+    for id, path in list(match_files(directory)):
+        extension = match_extension(path)
+        new_path = match_path(directory, id, layout=layout, extension=extension)
+
+        if os.path.normpath(path) == os.path.normpath(new_path):
+            continue
+
+        make_dir_if_not_exists(os.path.dirname(new_path))
+        os.replace(path, new_path)
+        moved += 1
+
+    if layout == "flat":
+        # Remove empty shard directories
+        for path, _, _ in os.walk(directory, topdown=False):
+            if path != directory and not os.listdir(path):
+                os.rmdir(path)
+
+    # Store the layout after all files are moved, so an interrupted
+    # migration keeps the old layout for new matches
+    set_match_layout(directory, layout)
+    forget_match_index(directory)
+    save_match_index(directory)
+    return moved
 
 
 def save_player(name, tag, puuid, directory):
@@ -84,6 +758,9 @@ def save_player(name, tag, puuid, directory):
     Save a player's name and tag to a mapping based on their puuid
     and store it to disk in JSON format.
 
+    To save many players, add them to `lolstats.players.player_registry`
+    and flush it once instead.
+
     Parameters
     ----------
     name : str
@@ -95,30 +772,228 @@ def save_player(name, tag, puuid, directory):
     directory : str
         The directory where data will be stored.
     """
-    make_dir_if_not_exists(directory)
-    file_path = os.path.join(directory, "player_names.json")
-
-    # Load existing data if file exists
-    if os.path.exists(file_path):
-        with open(file_path, "r", encoding="utf-8") as file:
-            try:
-                data = json.load(file)
-            except json.JSONDecodeError:
-                data = {}
+    registry = player_registry(directory)
+    registry.add(name=name, tag=tag, puuid=puuid)
+    registry.flush()
+
+
+def find_player_puuid(name, tag, directory):
+    """
+    Find the puuid of a player saved by `save_player`.
+
+    Parameters
+    ----------
+    name : str
+        Gamer name part from Riot ID: Name#Tag
+    tag : str
+        Gamer tag line part from Riot ID: Name#Tag
+    directory : str
+        The directory where data is stored.
+
+    Returns
+    -------
+    str or None
+        The player's unique identifier, None if the player is not saved.
+    """
+    return player_registry(directory).find(name=name, tag=tag)
+
+
+def _read_json(path, default):
+    """Return data of the JSON file, `default` if the file is missing or corrupted."""
+
+    if not os.path.exists(path):
+        return default
+
+    with open(path, "r", encoding="utf-8") as file:
+        try:
+            return json.load(file)
+        except json.JSONDecodeError:
+            return default
+
+
+def write_json_atomic(path, data, indent=4):
+    """
+    Write data to the JSON file. The data is written to a temporary file
+    first, which then replaces the file, so a crash does not leave
+    a truncated file.
+
+    Parameters
+    ----------
+    path : str
+      Path to the JSON file.
+
+    data : object
+      JSON-serializable data.
+
+    indent : int or None, optional
+      Indentation of the JSON, None for the most compact output.
+    """
+
+    make_dir_if_not_exists(os.path.dirname(path) or ".")
+    temp_path = f"{path}.tmp"
+
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=indent)
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(temp_path, path)
+
+
+def load_watermark(directory, puuid, queue=None):
+    """
+    Return the newest match saved for a player by a previous run.
+
+    Parameters
+    ----------
+    directory : str
+        The directory where data is stored.
+    puuid : str
+        The player's unique identifier.
+    queue : int, optional
+        Game queue type, None for all queues.
+
+    Returns
+    -------
+    dict or None
+        Dictionary with keys `matchId` and `gameEndTimestamp` (in milliseconds),
+        or None if no matches were saved for the player and queue.
+    """
+    data = _read_json(os.path.join(directory, "watermarks.json"), {})
+    return data.get(puuid, {}).get(str(queue or "all"))
+
+
+def save_watermark(directory, puuid, match_id, game_end_timestamp, queue=None):
+    """
+    Save the newest match saved for a player, so that the next run only
+    loads newer matches. The file is replaced atomically.
+
+    Parameters
+    ----------
+    directory : str
+        The directory where data is stored.
+    puuid : str
+        The player's unique identifier.
+    match_id : str
+        ID of the newest saved match.
+    game_end_timestamp : int
+        UNIX timestamp of the end of the match in milliseconds.
+    queue : int, optional
+        Game queue type, None for all queues.
+    """
+    file_path = os.path.join(directory, "watermarks.json")
+    data = _read_json(file_path, {})
+
+    data.setdefault(puuid, {})[str(queue or "all")] = {
+        "matchId": match_id,
+        "gameEndTimestamp": game_end_timestamp,
+    }
+
+    write_json_atomic(file_path, data)
+
+
+def load_checkpoint(directory, puuid, queue=None):
+    """
+    Return the checkpoint of the player's download saved by `save_checkpoint`.
+
+    Parameters
+    ----------
+    directory : str
+        The directory where data is stored.
+    puuid : str
+        The player's unique identifier.
+    queue : int, optional
+        Game queue type, None for all queues.
+
+    Returns
+    -------
+    dict or None
+        The checkpoint, None if there is no checkpoint.
+    """
+    data = _read_json(os.path.join(directory, "checkpoints.json"), {})
+    return data.get(puuid, {}).get(str(queue or "all"))
+
+
+def save_checkpoint(directory, puuid, checkpoint, queue=None):
+    """
+    Save the progress of the player's download, so that an interrupted
+    download can be resumed. The file is replaced atomically.
+
+    Parameters
+    ----------
+    directory : str
+        The directory where data is stored.
+    puuid : str
+        The player's unique identifier.
+    checkpoint : dict or None
+        Download progress, see `lolstats.matches.load_matches`.
+        None removes the checkpoint.
+    queue : int, optional
+        Game queue type, None for all queues.
+    """
+    file_path = os.path.join(directory, "checkpoints.json")
+    data = _read_json(file_path, {})
+    key = str(queue or "all")
+
+    if checkpoint is None:
+        data.get(puuid, {}).pop(key, None)
+
+        if not data.get(puuid, True):
+            del data[puuid]
     else:
-        data = {}
+        data.setdefault(puuid, {})[key] = checkpoint
+
+    write_json_atomic(file_path, data)
 
-    # Update the data with the new player information
-    if puuid not in data:
-        data[puuid] = []
 
-    # Prepare the player entry
-    new_entry = {"name": name, "tag": tag}
+def account_key(name, tag):
+    """Return key of the Riot ID in the account cache. Riot IDs are case-insensitive."""
+    return f"{name}#{tag}".lower()
+
+
+def load_account_cache(directory, ttl=ACCOUNT_CACHE_TTL):
+    """
+    Return PUUIDs of Riot IDs saved by `save_account_cache`.
+
+    Parameters
+    ----------
+    directory : str
+        The directory where data is stored.
+    ttl : int, optional
+        Number of seconds the PUUIDs are valid after they were saved.
+        Older PUUIDs are not returned, since players can change their Riot ID.
+
+    Returns
+    -------
+    dict
+        Maps Riot ID key (see `account_key`) to PUUID.
+    """
+    data = _read_json(os.path.join(directory, "accounts.json"), {})
+    now = time.time()
+
+    return {
+        key: account["puuid"]
+        for key, account in data.items()
+        if now - account["cachedAt"] < ttl
+    }
+
+
+def save_account_cache(directory, accounts):
+    """
+    Save PUUIDs of Riot IDs to `accounts.json`, replacing the file atomically.
+
+    Parameters
+    ----------
+    directory : str
+        The directory where data is stored.
+    accounts : list of tuple
+        Players' (name, tag, puuid) tuples.
+    """
+    file_path = os.path.join(directory, "accounts.json")
+    data = _read_json(file_path, {})
+    now = int(time.time())
 
-    # Check for duplicate entry
-    if new_entry not in data[puuid]:
-        data[puuid].append(new_entry)
+    for name, tag, puuid in accounts:
+        data[account_key(name, tag)] = {"puuid": puuid, "cachedAt": now}
 
-    # Write the updated data back to the file
-    with open(file_path, "w", encoding="utf-8") as file:
-        json.dump(data, file, indent=4)
+    write_json_atomic(file_path, data)
@@ -1,14 +1,39 @@
 import os
+import pytest
 import json
+import time
 from tempfile import TemporaryDirectory
+from unittest.mock import patch
 
 from .disk import (
     make_dir_if_not_exists,
     save_match,
     unsaved_matches,
     save_matches,
+    save_raw_match,
     save_player,
+    find_player_puuid,
+    load_match,
+    load_watermark,
+    save_watermark,
+    load_checkpoint,
+    load_account_cache,
+    save_account_cache,
+    save_checkpoint,
+    load_match_index,
+    read_match_index,
+    save_match_index,
+    scan_matches,
+    shard,
+    match_path,
+    match_layout,
+    set_match_layout,
+    use_match_layout,
+    reshard_matches,
+    encode_match,
+    decode_match,
 )
+from .errors import MyError
 
 
 def test_make_dir_if_not_exists():
@@ -40,6 +65,21 @@ def test_save_match():
             assert data == match_data
 
 
+def test_save_match_interrupted():
+    with TemporaryDirectory() as tmpdir:
+        with patch("os.replace", side_effect=KeyboardInterrupt):
+            with pytest.raises(KeyboardInterrupt):
+                save_match(tmpdir, "match1", {"player": "TestPlayer"})
+
+        # The partially written match is not counted as saved
+        assert not scan_matches(tmpdir)
+        assert unsaved_matches(tmpdir, ["match1"]) == ["match1"]
+
+        save_match(tmpdir, "match1", {"player": "TestPlayer"})
+        assert load_match(tmpdir, "match1") == {"player": "TestPlayer"}
+        assert os.listdir(tmpdir) == ["match1.json"]
+
+
 def test_unsaved_matches():
     with TemporaryDirectory() as tmpdir:
         # Simulate saving some matches
@@ -130,3 +170,338 @@ def test_prevent_duplicate_entries():
             # Ensure only one entry exists for the player
             assert len(data["puuid3"]) == 1
             assert data["puuid3"] == [{"name": "Player", "tag": "Tag"}]
+
+
+def test_find_player_puuid():
+    with TemporaryDirectory() as tmpdir:
+        assert find_player_puuid("Player", "Tag", tmpdir) is None
+
+        save_player("Player", "Tag", "puuid3", tmpdir)
+
+        assert find_player_puuid("player", "TAG", tmpdir) == "puuid3"
+        assert find_player_puuid("Other", "Tag", tmpdir) is None
+
+
+def test_load_match():
+    with TemporaryDirectory() as tmpdir:
+        save_match(tmpdir, "test_match_id", {"player": "TestPlayer"})
+
+        assert load_match(tmpdir, "test_match_id") == {"player": "TestPlayer"}
+
+
+def test_watermark():
+    with TemporaryDirectory() as tmpdir:
+        assert load_watermark(tmpdir, "puuid1") is None
+
+        save_watermark(tmpdir, "puuid1", "match1", 1000)
+        save_watermark(tmpdir, "puuid1", "match2", 2000, queue=420)
+        save_watermark(tmpdir, "puuid2", "match3", 3000)
+
+        assert load_watermark(tmpdir, "puuid1") == {
+            "matchId": "match1",
+            "gameEndTimestamp": 1000,
+        }
+
+        assert load_watermark(tmpdir, "puuid1", queue=420) == {
+            "matchId": "match2",
+            "gameEndTimestamp": 2000,
+        }
+
+        assert load_watermark(tmpdir, "puuid1", queue=440) is None
+        assert load_watermark(tmpdir, "puuid2")["matchId"] == "match3"
+
+
+def test_save_watermark_interrupted():
+    with TemporaryDirectory() as tmpdir:
+        save_watermark(tmpdir, "puuid1", "match1", 1000)
+
+        with patch("json.dump", side_effect=KeyboardInterrupt):
+            with pytest.raises(KeyboardInterrupt):
+                save_watermark(tmpdir, "puuid1", "match2", 2000)
+
+        # The previous file is kept
+        assert load_watermark(tmpdir, "puuid1")["matchId"] == "match1"
+
+        save_watermark(tmpdir, "puuid1", "match2", 2000)
+        assert load_watermark(tmpdir, "puuid1")["matchId"] == "match2"
+        assert os.listdir(tmpdir) == ["watermarks.json"]
+
+
+def test_checkpoint():
+    with TemporaryDirectory() as tmpdir:
+        assert load_checkpoint(tmpdir, "puuid1") is None
+
+        save_checkpoint(tmpdir, "puuid1", {"start": 100, "failed": ["match1"]})
+        save_checkpoint(tmpdir, "puuid1", {"start": 200, "failed": []}, queue=420)
+
+        assert load_checkpoint(tmpdir, "puuid1") == {
+            "start": 100,
+            "failed": ["match1"],
+        }
+
+        assert load_checkpoint(tmpdir, "puuid1", queue=420)["start"] == 200
+        assert load_checkpoint(tmpdir, "puuid2") is None
+
+        # Removed when the download is finished
+        save_checkpoint(tmpdir, "puuid1", None)
+        assert load_checkpoint(tmpdir, "puuid1") is None
+        assert load_checkpoint(tmpdir, "puuid1", queue=420)["start"] == 200
+
+
+def test_account_cache():
+    with TemporaryDirectory() as tmpdir:
+        assert load_account_cache(tmpdir) == {}
+
+        save_account_cache(
+            tmpdir, [("Faker", "T1", "puuid1"), ("Gumayusi", "T1", "p2")]
+        )
+
+        assert load_account_cache(tmpdir) == {"faker#t1": "puuid1", "gumayusi#t1": "p2"}
+
+        # Expired
+        with patch("lolstats.disk.time.time", return_value=time.time() + 100):
+            assert load_account_cache(tmpdir, ttl=50) == {}
+
+
+def test_unsaved_matches_after_save_match():
+    with TemporaryDirectory() as tmpdir:
+        assert unsaved_matches(tmpdir, ["match1", "match2"]) == ["match1", "match2"]
+
+        save_match(tmpdir, "match1", {"data": 1})
+
+        assert unsaved_matches(tmpdir, ["match1", "match2"]) == ["match2"]
+
+
+def test_match_index_manifest():
+    with TemporaryDirectory() as tmpdir:
+        matches_dir = os.path.join(tmpdir, "matches")
+        save_match(matches_dir, "match1", {"data": 1})
+        save_match(matches_dir, "match2", {"data": 2})
+        load_match_index(matches_dir)
+        save_match(matches_dir, "match3", {"data": 3})
+        save_match_index(matches_dir)
+
+        manifest = os.path.join(tmpdir, "matches.index")
+
+        with open(manifest, "r", encoding="utf-8") as file:
+            assert file.read() == "match1\nmatch2\nmatch3\n"
+
+        # New process reads the manifest instead of listing the directory
+        with patch.dict("lolstats.disk._match_indexes", clear=True), patch(
+            "lolstats.disk.scan_matches"
+        ) as mock_scan:
+            assert load_match_index(matches_dir) == {"match1", "match2", "match3"}
+            mock_scan.assert_not_called()
+
+
+def test_match_index_stale_manifest():
+    with TemporaryDirectory() as tmpdir:
+        matches_dir = os.path.join(tmpdir, "matches")
+        save_match(matches_dir, "match1", {"data": 1})
+        save_match_index(matches_dir)
+
+        # Match saved by another process after the manifest
+        with open(os.path.join(matches_dir, "match2.json"), "w") as f:
+            f.write("{}")
+
+        mtime = os.stat(os.path.join(tmpdir, "matches.index")).st_mtime_ns
+        os.utime(matches_dir, ns=(mtime + 10**9, mtime + 10**9))
+
+        with patch.dict("lolstats.disk._match_indexes", clear=True):
+            assert read_match_index(matches_dir) is None
+            assert load_match_index(matches_dir) == {"match1", "match2"}
+
+
+def test_read_match_index_does_not_list_flat_directory():
+    with TemporaryDirectory() as tmpdir:
+        matches_dir = os.path.join(tmpdir, "matches")
+        save_match(matches_dir, "match1", {"data": 1})
+        save_match_index(matches_dir)
+
+        with patch("os.scandir", side_effect=AssertionError("Directory listed")):
+            assert read_match_index(matches_dir) == {"match1"}
+
+
+def test_read_match_index_stale_shard():
+    with TemporaryDirectory() as tmpdir:
+        matches_dir = os.path.join(tmpdir, "matches")
+        set_match_layout(matches_dir, "sharded")
+        save_match(matches_dir, "NA1_1", {"data": 1})
+        save_match_index(matches_dir)
+        assert read_match_index(matches_dir) == {"NA1_1"}
+
+        # Match saved to the shard by another process after the manifest
+        shard_dir = os.path.join(matches_dir, shard("NA1_1"))
+        mtime = os.stat(os.path.join(tmpdir, "matches.index")).st_mtime_ns
+        os.utime(shard_dir, ns=(mtime + 10**9, mtime + 10**9))
+
+        assert read_match_index(matches_dir) is None
+
+
+def test_shard():
+    assert shard("NA1_4912345678") == shard("NA1_4912345678")
+    assert shard("NA1_4912345678").startswith("NA1/")
+    assert shard("EUW1_123").startswith("EUW1/")
+    assert len(shard("EUW1_123").split("/")[1]) == 2
+    assert shard("match1").startswith("other/")
+
+
+def test_match_path():
+    with TemporaryDirectory() as tmpdir:
+        assert match_path(tmpdir, "NA1_1") == f"{tmpdir}/NA1_1.json"
+
+        assert (
+            match_path(tmpdir, "NA1_1", layout="sharded")
+            == f"{tmpdir}/{shard('NA1_1')}/NA1_1.json"
+        )
+
+        set_match_layout(tmpdir, "sharded")
+        assert match_layout(tmpdir) == "sharded"
+        assert match_path(tmpdir, "NA1_1") == f"{tmpdir}/{shard('NA1_1')}/NA1_1.json"
+
+
+def test_sharded_layout():
+    with TemporaryDirectory() as tmpdir:
+        set_match_layout(tmpdir, "sharded")
+        save_match(tmpdir, "NA1_1", {"data": 1})
+        save_match(tmpdir, "EUW1_2", {"data": 2})
+
+        assert os.path.exists(os.path.join(tmpdir, shard("NA1_1"), "NA1_1.json"))
+        assert load_match(tmpdir, "EUW1_2") == {"data": 2}
+        assert scan_matches(tmpdir) == {"NA1_1", "EUW1_2"}
+        assert unsaved_matches(tmpdir, ["NA1_1", "NA1_3"]) == ["NA1_3"]
+
+
+def test_use_match_layout():
+    with TemporaryDirectory() as tmpdir:
+        use_match_layout(tmpdir, "flat")
+        use_match_layout(tmpdir, "sharded")
+        assert match_layout(tmpdir) == "sharded"
+
+        save_match(tmpdir, "NA1_1", {"data": 1})
+
+        with pytest.raises(MyError) as excinfo:
+            use_match_layout(tmpdir, "flat")
+
+        assert "Run reshard.py" in str(excinfo.value)
+
+
+def test_reshard_matches():
+    with TemporaryDirectory() as tmpdir:
+        ids = [f"NA1_{i}" for i in range(20)] + ["KR_1"]
+
+        for id in ids:
+            save_match(tmpdir, id, {"id": id})
+
+        assert reshard_matches(tmpdir, "sharded") == len(ids)
+        assert match_layout(tmpdir) == "sharded"
+        assert sorted(os.listdir(tmpdir)) == ["KR", "NA1", "layout.txt"]
+        assert load_match(tmpdir, "NA1_5") == {"id": "NA1_5"}
+        assert unsaved_matches(tmpdir, ["NA1_5", "NA1_30"]) == ["NA1_30"]
+
+        # Nothing to move
+        assert reshard_matches(tmpdir, "sharded") == 0
+
+        assert reshard_matches(tmpdir, "flat") == len(ids)
+        assert sorted(os.listdir(tmpdir)) == sorted(
+            [f"{id}.json" for id in ids] + ["layout.txt"]
+        )
+
+        assert load_match(tmpdir, "KR_1") == {"id": "KR_1"}
+
+
+def test_reshard_matches_interrupted():
+    with TemporaryDirectory() as tmpdir:
+        save_match(tmpdir, "NA1_1", {"data": 1})
+        save_match(tmpdir, "NA1_2", {"data": 2})
+
+        # Only one file was moved before the migration stopped
+        path = match_path(tmpdir, "NA1_1", layout="sharded")
+        os.makedirs(os.path.dirname(path))
+        os.replace(match_path(tmpdir, "NA1_1"), path)
+
+        assert scan_matches(tmpdir) == {"NA1_1", "NA1_2"}
+        assert load_match(tmpdir, "NA1_1") == {"data": 1}
+
+        assert reshard_matches(tmpdir, "sharded") == 1
+        assert load_match(tmpdir, "NA1_2") == {"data": 2}
+
+
+def test_reshard_matches_unknown_layout():
+    with TemporaryDirectory() as tmpdir:
+        with pytest.raises(MyError):
+            reshard_matches(tmpdir, "nested")
+
+
+@pytest.mark.parametrize(
+    "format, extension",
+    [
+        ("json", ".json"),
+        ("compact", ".json"),
+        ("gzip", ".json.gz"),
+        ("zstd", ".json.zst"),
+    ],
+)
+def test_save_match_format(format, extension):
+    if format == "zstd":
+        pytest.importorskip("zstandard")
+
+    with TemporaryDirectory() as tmpdir:
+        match = {"metadata": {"matchId": "NA1_1"}, "info": {"gameDuration": 1800}}
+        save_match(tmpdir, "NA1_1", match, format=format)
+
+        assert os.listdir(tmpdir) == [f"NA1_1{extension}"]
+        assert load_match(tmpdir, "NA1_1") == match
+        assert unsaved_matches(tmpdir, ["NA1_1", "NA1_2"]) == ["NA1_2"]
+
+
+@pytest.mark.parametrize("format", ["json", "compact", "gzip"])
+def test_save_raw_match(format):
+    with TemporaryDirectory() as tmpdir:
+        data = b'{"metadata":{"matchId":"NA1_1"},"info":{}}'
+        save_raw_match(tmpdir, "NA1_1", data, format=format)
+
+        assert load_match(tmpdir, "NA1_1") == {
+            "metadata": {"matchId": "NA1_1"},
+            "info": {},
+        }
+
+        if format != "gzip":
+            # Saved as received
+            with open(os.path.join(tmpdir, "NA1_1.json"), "rb") as file:
+                assert file.read() == data
+
+
+def test_encode_match():
+    match = {"metadata": {"matchId": "NA1_1"}, "info": [1, 2]}
+
+    assert encode_match(match) == json.dumps(match, indent=2).encode("utf-8")
+    assert (
+        encode_match(match, "compact")
+        == b'{"metadata":{"matchId":"NA1_1"},"info":[1,2]}'
+    )
+    assert decode_match(encode_match(match, "gzip"), ".json.gz") == match
+
+    with pytest.raises(MyError):
+        encode_match(match, "xml")
+
+
+def test_scan_matches_formats():
+    with TemporaryDirectory() as tmpdir:
+        save_match(tmpdir, "NA1_1", {"data": 1})
+        save_match(tmpdir, "NA1_2", {"data": 2}, format="gzip")
+        set_match_layout(tmpdir, "sharded")
+        save_match(tmpdir, "NA1_3", {"data": 3}, format="compact")
+
+        assert scan_matches(tmpdir) == {"NA1_1", "NA1_2", "NA1_3"}
+
+        reshard_matches(tmpdir, "sharded")
+
+        assert os.path.exists(match_path(tmpdir, "NA1_2", extension=".json.gz"))
+        assert load_match(tmpdir, "NA1_2") == {"data": 2}
+
+
+def test_load_match_not_saved():
+    with TemporaryDirectory() as tmpdir:
+        with pytest.raises(FileNotFoundError):
+            load_match(tmpdir, "NA1_1")
@@ -0,0 +1,613 @@
+"""
+Local stand-in for the Riot API endpoints used by the loader, for offline
+integration tests and benchmarks. Serves synthetic matches based on
+`docs/match.json` and enforces rate limits like Riot API does.
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+from lolstats.lol_http import ENDPOINTS
+from lolstats.rate_limit import parse_rate_limits
+
+# Limits of a development API key
+DEFAULT_APP_LIMITS = "20:1,100:120"
+
+DEFAULT_METHOD_LIMITS = {
+    "account-v1.getByRiotId": "1000:60",
+    "match-v5.getMatchIdsByPUUID": "2000:10",
+    "match-v5.getMatch": "2000:10",
+    "match-v5.getTimeline": "2000:10",
+}
+
+TEMPLATE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "docs", "match.json"
+)
+
+QUEUES = (420, 440, 400, 450)
+
+# Seconds between the creation times of consecutive synthetic matches
+MATCH_INTERVAL = 600
+
+# Placeholders for the values that differ between synthetic matches
+_PLACEHOLDER = re.compile(r'"@@(\w+)@@"')
+
+
+class WindowCounter:
+    """
+    Request counts for a set of rate limits. Like in Riot API, each window
+    starts with the first request and the count is reset when it ends.
+    """
+
+    def __init__(self, limits):
+        self.limits = limits
+        self._windows = [[0.0, 0] for _ in limits]
+
+    def hit(self, now):
+        """
+        Return the number of seconds to wait if a request at time `now`
+        exceeds a limit, None otherwise.
+        """
+
+        retry_after = None
+
+        for (limit, window), state in zip(self.limits, self._windows):
+            if now - state[0] >= window:
+                state[0], state[1] = now, 0
+
+            if state[1] >= limit:
+                wait = state[0] + window - now
+                retry_after = max(retry_after or 0, wait)
+
+        return retry_after
+
+    def count(self):
+        """Count a request."""
+
+        for state in self._windows:
+            state[1] += 1
+
+    def header(self):
+        """Return value of `X-...-Rate-Limit-Count` header."""
+        return ",".join(
+            f"{state[1]}:{window}"
+            for (_, window), state in zip(self.limits, self._windows)
+        )
+
+
+def format_limits(limits):
+    """Return value of `X-...-Rate-Limit` header for (count, window) pairs."""
+    return ",".join(f"{count}:{window}" for count, window in limits)
+
+
+class FakeWorld:
+    """
+    Synthetic players and matches. Each match has 10 players drawn at random,
+    so players share matches like in real ranked games.
+
+    Parameters
+    ----------
+    players : int
+        Number of players.
+
+    matches : int
+        Number of matches.
+
+    seed : int
+        Seed of the random generator, the same seed gives the same world.
+
+    platform : str
+        Platform ID, the prefix of match IDs.
+    """
+
+    def __init__(self, players=1000, matches=10000, seed=0, platform="NA1"):
+        rng = random.Random(seed)
+        self.platform = platform
+        self.puuids = [self._make_puuid(seed, number) for number in range(players)]
+        self.players = {puuid: number for number, puuid in enumerate(self.puuids)}
+        self.participants = [rng.sample(range(players), 10) for _ in range(matches)]
+        self.queues = [rng.choice(QUEUES) for _ in range(matches)]
+        self.durations = [rng.randint(900, 2400) for _ in range(matches)]
+        self.start_time = 1_700_000_000
+        self.player_matches = [[] for _ in range(players)]
+
+        for number, participants in enumerate(self.participants):
+            for player in participants:
+                self.player_matches[player].append(number)
+
+        with open(TEMPLATE_PATH, "r", encoding="utf-8") as file:
+            self._template = self._make_template(json.load(file))
+
+    @staticmethod
+    def _make_puuid(seed, number):
+        digest = hashlib.sha512(f"{seed}:{number}".encode()).hexdigest()
+        return digest[:78]
+
+    @staticmethod
+    def _make_template(match):
+        """Return match JSON with placeholders for the synthetic values."""
+
+        match["metadata"]["matchId"] = "@@matchId@@"
+        match["metadata"]["participants"] = [f"@@puuid{i}@@" for i in range(10)]
+
+        for name in (
+            "gameId",
+            "gameCreation",
+            "gameStartTimestamp",
+            "gameEndTimestamp",
+            "gameDuration",
+            "platformId",
+            "queueId",
+        ):
+            match["info"][name] = f"@@{name}@@"
+
+        for i, participant in enumerate(match["info"]["participants"]):
+            participant["puuid"] = f"@@puuid{i}@@"
+
+        return json.dumps(match, separators=(",", ":"))
+
+    def match_id(self, number):
+        """Return ID of the match."""
+        return f"{self.platform}_{1_000_000_000 + number}"
+
+    def match_number(self, id):
+        """Return number of the match with the ID, None if there is no such match."""
+
+        prefix, _, number = id.partition("_")
+
+        if prefix != self.platform or not number.isdigit():
+            return None
+
+        number = int(number) - 1_000_000_000
+        return number if 0 <= number < len(self.participants) else None
+
+    def creation_time(self, number):
+        """Return creation time of the match in seconds."""
+        return self.start_time + number * MATCH_INTERVAL
+
+    def account_puuid(self, name, tag):
+        """Return PUUID of the Riot ID, every Riot ID belongs to one of the players."""
+
+        digest = hashlib.sha256(f"{name}#{tag}".lower().encode()).digest()
+        return self.puuids[int.from_bytes(digest[:8], "big") % len(self.puuids)]
+
+    def match_ids(self, puuid, start_time=None, end_time=None, queue=None):
+        """Return IDs of the player's matches, newest first."""
+
+        if puuid not in self.players:
+            return []
+
+        ids = []
+
+        for number in reversed(self.player_matches[self.players[puuid]]):
+            created = self.creation_time(number)
+
+            if start_time is not None and created < start_time:
+                break
+
+            if end_time is not None and created > end_time:
+                continue
+
+            if queue is not None and self.queues[number] != queue:
+                continue
+
+            ids.append(self.match_id(number))
+
+        return ids
+
+    def match_json(self, number):
+        """Return JSON of the match as bytes."""
+
+        created = self.creation_time(number) * 1000
+        duration = self.durations[number]
+
+        values = {
+            "matchId": self.match_id(number),
+            "gameId": 1_000_000_000 + number,
+            "gameCreation": created,
+            "gameStartTimestamp": created + 60_000,
+            "gameEndTimestamp": created + 60_000 + duration * 1000,
+            "gameDuration": duration,
+            "platformId": self.platform,
+            "queueId": self.queues[number],
+        }
+
+        for i, player in enumerate(self.participants[number]):
+            values[f"puuid{i}"] = self.puuids[player]
+
+        return _PLACEHOLDER.sub(
+            lambda match: json.dumps(values[match.group(1)]), self._template
+        ).encode("utf-8")
+
+    def timeline_json(self, number):
+        """Return JSON of the match timeline as bytes."""
+
+        rng = random.Random(number)
+        duration = self.durations[number]
+        frames = []
+
+        for frame in range(duration // 60 + 2):
+            timestamp = min(frame * 60_000, duration * 1000)
+
+            participant_frames = {
+                str(id): {
+                    "participantId": id,
+                    "level": min(18, 1 + frame // 2),
+                    "currentGold": rng.randint(0, 3000),
+                    "totalGold": 500 + frame * rng.randint(250, 450),
+                    "goldPerSecond": 0,
+                    "xp": frame * rng.randint(200, 500),
+                    "minionsKilled": frame * rng.randint(0, 10),
+                    "jungleMinionsKilled": frame * rng.randint(0, 5),
+                    "position": {
+                        "x": rng.randint(0, 14800),
+                        "y": rng.randint(0, 14800),
+                    },
+                    "damageStats": {
+                        "totalDamageDoneToChampions": frame * rng.randint(0, 800),
+                        "totalDamageTaken": frame * rng.randint(0, 800),
+                    },
+                    "timeEnemySpentControlled": 0,
+                }
+                for id in range(1, 11)
+            }
+
+            events = [
+                {
+                    "type": "ITEM_PURCHASED",
+                    "timestamp": timestamp + rng.randint(0, 59_999),
+                    "participantId": rng.randint(1, 10),
+                    "itemId": rng.choice((1055, 1056, 2003, 3006, 3153)),
+                }
+                for _ in range(rng.randint(0, 8))
+            ]
+
+            frames.append(
+                {
+                    "timestamp": timestamp,
+                    "participantFrames": participant_frames,
+                    "events": sorted(events, key=lambda event: event["timestamp"]),
+                }
+            )
+
+        timeline = {
+            "metadata": {
+                "dataVersion": "2",
+                "matchId": self.match_id(number),
+                "participants": [
+                    self.puuids[player] for player in self.participants[number]
+                ],
+            },
+            "info": {
+                "frameInterval": 60_000,
+                "frames": frames,
+                "gameId": 1_000_000_000 + number,
+                "participants": [
+                    {"participantId": i + 1, "puuid": self.puuids[player]}
+                    for i, player in enumerate(self.participants[number])
+                ],
+            },
+        }
+
+        return json.dumps(timeline, separators=(",", ":")).encode("utf-8")
+
+
+class FakeRiotApi:
+    """
+    HTTP server implementing the account-v1 and match-v5 endpoints used by
+    the loader. Point `lolstats.lol_http` at it with `configure_api_url(api.url)`,
+    or with `LOLSTATS_API_URL` environment variable. Routing values are ignored,
+    all routing hosts are served by the same server.
+
+    Use as a context manager, which starts the server in a background thread:
+
+        with FakeRiotApi(latency=0.05, error_rate=0.01) as api:
+            configure_api_url(api.url)
+            ...
+
+    Parameters
+    ----------
+    host, port : str, int
+        Address to listen on, port 0 picks a free port.
+
+    api_key : str, optional
+        When given, requests with another API key get 403 Forbidden.
+        Requests without an API key always get 401 Unauthorized.
+
+    app_limits : str
+        Application rate limits of each API key, in the format of
+        `X-App-Rate-Limit` header, for example "20:1,100:120".
+
+    method_limits : dict, optional
+        Maps method name (see `lolstats.lol_http.ENDPOINTS`) to its rate limits.
+        Defaults to DEFAULT_METHOD_LIMITS.
+
+    latency : float
+        Seconds added to each response.
+
+    latency_jitter : float
+        Maximum random number of seconds added to `latency`.
+
+    error_rate : float
+        Fraction of requests that fail with 500 or 503 error.
+
+    throttle_rate : float
+        Fraction of requests that fail with 429 error of the underlying service,
+        without Retry-After header.
+
+    players, matches, seed, platform
+        See `FakeWorld`.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        api_key=None,
+        app_limits=DEFAULT_APP_LIMITS,
+        method_limits=None,
+        latency=0,
+        latency_jitter=0,
+        error_rate=0,
+        throttle_rate=0,
+        players=1000,
+        matches=10000,
+        seed=0,
+        platform="NA1",
+    ):
+        self.world = FakeWorld(
+            players=players, matches=matches, seed=seed, platform=platform
+        )
+
+        self.api_key = api_key
+        self.app_limits = parse_rate_limits(app_limits)
+
+        self.method_limits = {
+            name: parse_rate_limits(value)
+            for name, value in (method_limits or DEFAULT_METHOD_LIMITS).items()
+        }
+
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._statuses = Counter()
+        self._methods = Counter()
+        self._thread = None
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        """Base URL of the server, see `lolstats.lol_http.configure_api_url`."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Start serving requests in a background thread."""
+
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def serve_forever(self):
+        """Serve requests in the current thread until interrupted."""
+        self._server.serve_forever()
+
+    def close(self):
+        """Stop the server."""
+
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self):
+        """
+        Return request counts.
+
+        Returns
+        -------
+        dict
+            Dictionary with keys:
+                * `requests`: total number of requests.
+                * `statuses`: maps HTTP status code to the number of responses.
+                * `methods`: maps method name to the number of requests.
+        """
+
+        with self._lock:
+            return {
+                "requests": sum(self._statuses.values()),
+                "statuses": dict(self._statuses),
+                "methods": dict(self._methods),
+            }
+
+    def _limit_headers(self, api_key, method):
+        """
+        Count the request against the rate limits of the API key.
+
+        Returns
+        -------
+        tuple
+            (headers, retry_after, limit_type), where `retry_after` is None
+            when the request is within the limits.
+        """
+
+        now = time.monotonic()
+
+        with self._lock:
+            app = self._counters.setdefault(
+                (api_key, None), WindowCounter(self.app_limits)
+            )
+
+            method_counter = self._counters.setdefault(
+                (api_key, method), WindowCounter(self.method_limits.get(method, []))
+            )
+
+            app_retry = app.hit(now)
+            method_retry = method_counter.hit(now)
+
+            if app_retry is None and method_retry is None:
+                app.count()
+                method_counter.count()
+
+            headers = {
+                "X-App-Rate-Limit": format_limits(app.limits),
+                "X-App-Rate-Limit-Count": app.header(),
+                "X-Method-Rate-Limit": format_limits(method_counter.limits),
+                "X-Method-Rate-Limit-Count": method_counter.header(),
+            }
+
+        if app_retry is not None:
+            return headers, app_retry, "application"
+
+        if method_retry is not None:
+            return headers, method_retry, "method"
+
+        return headers, None, None
+
+    def _respond(self, path, query):
+        """
+        Return (status, headers, body) of the response to a GET request.
+        """
+
+        method = next(
+            (name for name, pattern in ENDPOINTS if pattern.match(path)), None
+        )
+
+        with self._lock:
+            self._methods[method or path] += 1
+
+        if method is None:
+            return 404, {}, b'{"status":{"message":"Not found","status_code":404}}'
+
+        api_key = query.get("api_key", [None])[0]
+
+        if not api_key:
+            return 401, {}, b'{"status":{"message":"Unauthorized","status_code":401}}'
+
+        if self.api_key is not None and api_key != self.api_key:
+            return 403, {}, b'{"status":{"message":"Forbidden","status_code":403}}'
+
+        headers, retry_after, limit_type = self._limit_headers(api_key, method)
+
+        if retry_after is not None:
+            headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+            headers["X-Rate-Limit-Type"] = limit_type
+            return 429, headers, b'{"status":{"message":"Rate limit exceeded"}}'
+
+        with self._lock:
+            draw = self._random.random()
+
+        if draw < self.throttle_rate:
+            return 429, {"X-Rate-Limit-Type": "service"}, b"{}"
+
+        if draw < self.throttle_rate + self.error_rate:
+            status = 500 if draw < self.throttle_rate + self.error_rate / 2 else 503
+            return status, headers, b'{"status":{"message":"Server error"}}'
+
+        body = self._body(method, path, query)
+
+        if body is None:
+            return 404, headers, b'{"status":{"message":"Data not found"}}'
+
+        if isinstance(body, int):
+            return body, headers, b'{"status":{"message":"Bad request"}}'
+
+        return 200, headers, body
+
+    def _body(self, method, path, query):
+        """Return response body, None for 404 or status code of other errors."""
+
+        parts = [unquote(part) for part in path.split("/")]
+        world = self.world
+
+        if method == "account-v1.getByRiotId":
+            name, tag = parts[-2], parts[-1]
+            puuid = world.account_puuid(name, tag)
+            data = {"puuid": puuid, "gameName": name, "tagLine": tag}
+            return json.dumps(data).encode("utf-8")
+
+        if method == "match-v5.getMatchIdsByPUUID":
+
+            def number(name, default=None):
+                value = query.get(name, [""])[0]
+                return int(value) if value else default
+
+            try:
+                start, count = number("start", 0), number("count", 20)
+                start_time, end_time = number("startTime"), number("endTime")
+                queue = number("queue")
+            except ValueError:
+                return 400
+
+            if count < 0 or count > 100 or start < 0:
+                return 400
+
+            ids = world.match_ids(
+                parts[-2], start_time=start_time, end_time=end_time, queue=queue
+            )
+
+            return json.dumps(ids[start : start + count]).encode("utf-8")
+
+        if method == "match-v5.getTimeline":
+            number = world.match_number(parts[-2])
+            return None if number is None else world.timeline_json(number)
+
+        number = world.match_number(parts[-1])
+        return None if number is None else world.match_json(number)
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                parts = urlsplit(self.path)
+                status, headers, body = api._respond(parts.path, parse_qs(parts.query))
+                delay = api.latency
+
+                if api.latency_jitter:
+                    with api._lock:
+                        delay += api._random.uniform(0, api.latency_jitter)
+
+                if delay:
+                    time.sleep(delay)
+
+                with api._lock:
+                    api._statuses[status] += 1
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json;charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+
+                for name, value in headers.items():
+                    self.send_header(name, value)
+
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                pass
+
+        return Handler
@@ -0,0 +1,221 @@
+import json
+import time
+import pytest
+import requests
+from tempfile import TemporaryDirectory
+
+from lolstats.fake_api import FakeRiotApi, FakeWorld, WindowCounter
+from lolstats.lol_http import configure_api_url, configure_retries
+from lolstats.retry import RetryPolicy
+from lolstats.errors import HttpError
+from lolstats.matches import load_matches
+from lolstats.stores import open_match_store
+
+
+@pytest.fixture
+def fake_api():
+    """Start the stand-in server with a small world and point lol_http at it."""
+
+    with FakeRiotApi(players=50, matches=500, app_limits="1000:1") as api:
+        configure_api_url(api.url)
+
+        try:
+            yield api
+        finally:
+            configure_api_url(None)
+
+
+def test_window_counter():
+    counter = WindowCounter([(2, 1), (3, 10)])
+
+    assert counter.hit(0) is None
+    counter.count()
+    assert counter.hit(0.5) is None
+    counter.count()
+    assert counter.header() == "2:1,2:10"
+
+    assert counter.hit(0.9) == pytest.approx(0.1)
+    assert counter.hit(1.0) is None
+    counter.count()
+
+    # Second window is full until it ends
+    assert counter.hit(2.0) == pytest.approx(8)
+
+
+def test_fake_world():
+    world = FakeWorld(players=20, matches=100)
+    puuid = world.account_puuid("Faker", "T1")
+
+    assert world.account_puuid("faker", "t1") == puuid
+
+    ids = world.match_ids(puuid)
+    assert ids == sorted(ids, reverse=True)
+
+    number = world.match_number(ids[0])
+    match = json.loads(world.match_json(number))
+    assert match["metadata"]["matchId"] == ids[0]
+    assert puuid in match["metadata"]["participants"]
+    assert match["info"]["gameCreation"] == world.creation_time(number) * 1000
+
+    assert [p["puuid"] for p in match["info"]["participants"]] == match["metadata"][
+        "participants"
+    ]
+
+    # Filters by creation time
+    start_time = world.creation_time(world.match_number(ids[2]))
+    assert world.match_ids(puuid, start_time=start_time) == ids[:3]
+
+    assert world.match_number("NA1_1") is None
+    assert world.match_number("EUW1_1000000000") is None
+
+
+def test_fake_api_rate_limits():
+    with FakeRiotApi(players=10, matches=50, app_limits="3:10") as api:
+        url = f"{api.url}/riot/account/v1/accounts/by-riot-id/Faker/T1?api_key=key"
+        responses = [requests.get(url, timeout=10) for _ in range(4)]
+
+    assert [response.status_code for response in responses] == [200, 200, 200, 429]
+    assert responses[0].headers["X-App-Rate-Limit"] == "3:10"
+    assert responses[2].headers["X-App-Rate-Limit-Count"] == "3:10"
+    assert responses[2].headers["X-Method-Rate-Limit"] == "1000:60"
+    assert responses[3].headers["X-Rate-Limit-Type"] == "application"
+    assert 1 <= int(responses[3].headers["Retry-After"]) <= 10
+
+
+def test_fake_api_errors():
+    with FakeRiotApi(players=10, matches=50, api_key="secret") as api:
+
+        def status(path):
+            return requests.get(f"{api.url}{path}", timeout=10).status_code
+
+        assert status("/lol/match/v5/matches/NA1_1000000000") == 401
+        assert status("/lol/match/v5/matches/NA1_1000000000?api_key=wrong") == 403
+        assert status("/lol/match/v5/matches/NA1_1000000000?api_key=secret") == 200
+        assert status("/lol/match/v5/matches/NA1_1?api_key=secret") == 404
+
+        assert (
+            status("/lol/match/v5/matches/by-puuid/x/ids?api_key=secret&count=101")
+            == 400
+        )
+
+        assert api.stats()["statuses"] == {401: 1, 403: 1, 200: 1, 404: 1, 400: 1}
+
+
+def test_load_matches_from_fake_api(fake_api):
+    with TemporaryDirectory() as tmpdir:
+        result = load_matches(
+            directory=tmpdir,
+            total_matches=150,
+            route="americas",
+            name="Faker",
+            tag="T1",
+            api_key="key",
+            concurrency=4,
+        )
+
+        puuid = fake_api.world.account_puuid("Faker", "T1")
+        ids = fake_api.world.match_ids(puuid)
+        assert result == {"total": len(ids), "new": len(ids), "failed": 0}
+
+        with open_match_store(tmpdir) as store:
+            assert store.ids() == set(ids)
+            assert store.load(ids[0])["metadata"]["matchId"] == ids[0]
+
+        stats = fake_api.stats()
+        assert stats["statuses"] == {200: len(ids) + 2}
+        assert stats["methods"]["match-v5.getMatchIdsByPUUID"] == 1
+
+
+def test_load_matches_from_fake_api_with_errors():
+    with FakeRiotApi(
+        players=50, matches=500, app_limits="1000:1", error_rate=0.3, seed=1
+    ) as api:
+        configure_api_url(api.url)
+
+        # Errors are not retried, so some matches fail
+        configure_retries(
+            policies={"server": RetryPolicy(max_retries=0)}, failure_threshold=1000
+        )
+
+        try:
+            with TemporaryDirectory() as tmpdir:
+
+                def load():
+                    return load_matches(
+                        directory=tmpdir,
+                        total_matches=100,
+                        route="americas",
+                        name="Faker",
+                        tag="T1",
+                        api_key="key",
+                        concurrency=4,
+                    )
+
+                # The account and match lists are requested until they do not fail
+                for _ in range(20):
+                    try:
+                        result = load()
+                        break
+                    except HttpError:
+                        continue
+
+                assert result["failed"] > 0
+
+                api.error_rate = 0
+                assert load()["failed"] == 0
+
+                puuid = api.world.account_puuid("Faker", "T1")
+
+                with open_match_store(tmpdir) as store:
+                    assert store.ids() == set(api.world.match_ids(puuid)[:100])
+        finally:
+            configure_api_url(None)
+            configure_retries()
+
+
+def test_load_matches_from_fake_api_retries_errors():
+    with FakeRiotApi(
+        players=50, matches=500, app_limits="1000:1", error_rate=0.3, seed=1
+    ) as api:
+        configure_api_url(api.url)
+
+        configure_retries(
+            policies={
+                "server": RetryPolicy(max_retries=20, base_delay=0.01, max_delay=0.05)
+            },
+            cooldown=0.05,
+        )
+
+        try:
+            with TemporaryDirectory() as tmpdir:
+                result = load_matches(
+                    directory=tmpdir,
+                    total_matches=100,
+                    route="americas",
+                    name="Faker",
+                    tag="T1",
+                    api_key="key",
+                    concurrency=4,
+                )
+
+                assert result["failed"] == 0
+
+                puuid = api.world.account_puuid("Faker", "T1")
+
+                with open_match_store(tmpdir) as store:
+                    assert store.ids() == set(api.world.match_ids(puuid)[:100])
+
+                statuses = api.stats()["statuses"]
+                assert statuses.get(500, 0) + statuses.get(503, 0) > 0
+        finally:
+            configure_api_url(None)
+            configure_retries()
+
+
+def test_fake_api_latency():
+    with FakeRiotApi(players=10, matches=50, latency=0.2) as api:
+        url = f"{api.url}/lol/match/v5/matches/NA1_1000000000?api_key=key"
+        start = time.monotonic()
+        requests.get(url, timeout=10)
+
+        assert time.monotonic() - start >= 0.2
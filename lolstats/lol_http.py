@@ -1,11 +1,207 @@
 """Load data from Riot API"""
 
+import os
+import re
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit, parse_qs
 import requests
 from lolstats.errors import MyError, HttpError
+from lolstats.sessions import SessionPool
+from lolstats.rate_limit import RateLimiter
+from lolstats.retry import Retries, TRANSIENT_STATUS_CODES
+from lolstats.metrics import get_metrics
+
+# Maximum number of match IDs returned by one match-v5 request
+MAX_MATCH_IDS = 100
+
+# Nearest account-v1 routing value for each match-v5 routing value.
+# Accounts can be queried from any cluster, SEA accounts are served by asia.
+ACCOUNT_ROUTES = {
+    "americas": "americas",
+    "asia": "asia",
+    "europe": "europe",
+    "sea": "asia",
+}
+
+_session_pool = SessionPool()
+
+# Base URL of Riot API requests, see `configure_api_url`
+_api_url = os.environ.get("LOLSTATS_API_URL") or None
+_rate_limiter = RateLimiter()
+_retries = Retries()
+
+# Riot API method names used for method rate limits.
+ENDPOINTS = [
+    (
+        "account-v1.getByRiotId",
+        re.compile(r"^/riot/account/v1/accounts/by-riot-id/[^/]+/[^/]+$"),
+    ),
+    (
+        "match-v5.getMatchIdsByPUUID",
+        re.compile(r"^/lol/match/v5/matches/by-puuid/[^/]+/ids$"),
+    ),
+    ("match-v5.getMatch", re.compile(r"^/lol/match/v5/matches/[^/]+$")),
+    ("match-v5.getTimeline", re.compile(r"^/lol/match/v5/matches/[^/]+/timeline$")),
+]
+
+
+def configure_sessions(pool_size=10, keep_alive=True):
+    """
+    Replace the pooled HTTP sessions used for all Riot API requests.
+
+    Parameters
+    ----------
+    pool_size : int
+      Maximum number of connections kept open to each routing host.
+
+    keep_alive : bool
+      When False, connections are closed after each response.
+    """
+
+    global _session_pool
+    _session_pool.close()
+    _session_pool = SessionPool(pool_size=pool_size, keep_alive=keep_alive)
+
+
+def configure_retries(
+    policies=None, request_budget=120, run_budget=None, failure_threshold=5, cooldown=30
+):
+    """
+    Replace the retry policies of requests that fail with transient server
+    errors (500, 502, 503 and 504), timeouts and connection errors.
+
+    Parameters
+    ----------
+    policies : dict, optional
+      Maps error class, "server" or "network", to `lolstats.retry.RetryPolicy`.
+
+    request_budget : float or None
+      Maximum number of seconds a request is retried for.
+
+    run_budget : float or None
+      Maximum number of seconds all requests can spend waiting before retries.
+      None for no limit.
+
+    failure_threshold : int
+      Number of consecutive transient errors of a routing host after which
+      requests to the host are paused for `cooldown` seconds.
+
+    cooldown : float
+      See `failure_threshold`.
+    """
+
+    global _retries
+
+    _retries = Retries(
+        policies=policies,
+        request_budget=request_budget,
+        run_budget=run_budget,
+        failure_threshold=failure_threshold,
+        cooldown=cooldown,
+    )
+
+
+def connection_stats():
+    """
+    Return connection reuse counts for each routing host.
+
+    Returns
+    -------
+    dict
+      See `SessionPool.stats`.
+    """
+
+    return _session_pool.stats()
+
+
+def endpoint_name(url):
+    """
+    Return Riot API method name for the URL.
+
+    Parameters
+    ----------
+    url : str
+      Request URL.
+
+    Returns
+    -------
+    str
+      Method name, for example `match-v5.getMatch`, or the URL path for unknown endpoints.
+    """
+
+    path = urlsplit(url).path
+
+    for name, pattern in ENDPOINTS:
+        if pattern.match(path):
+            return name
+
+    return path
+
+
+def rate_limit_keys(url):
+    """
+    Return API key, host and method name that identify the rate limit buckets for the URL.
+
+    Parameters
+    ----------
+    url : str
+      Request URL.
 
+    Returns
+    -------
+    tuple of str
+      (api_key, host, method)
+    """
+
+    parts = urlsplit(url)
+    api_key = parse_qs(parts.query).get("api_key", [None])[0]
+    return api_key, parts.netloc, endpoint_name(url)
+
+
+def raise_for_status(status_code, reason):
+    """
+    Raise an exception for an unsuccessful HTTP response.
+
+    Parameters
+    ----------
+    status_code : int
+      HTTP status code other than 200 and 429.
+
+    reason : str
+      HTTP reason phrase, for example "Not Found".
+
+    Raises
+    ------
+    MyError
+      For 401 and 403 errors, which mean the API key is incorrect or expired.
 
-def send_get_request(url, max_retries=8, retry_delay=10):
+    HttpError
+      For other errors.
+    """
+
+    if status_code == 401:
+        raise MyError(
+            "401 Unauthorized. Your API key is missing or incorrect. "
+            "Regenerate a new key from https://developer.riotgames.com/."
+        )
+    elif status_code == 403:
+        raise MyError(
+            "403 Forbidden. Your API key has expired. "
+            "Regenerate a new key from https://developer.riotgames.com/."
+        )
+
+    raise HttpError(f"{status_code} {reason}", status_code)
+
+
+def response_size(response):
+    """Return number of bytes downloaded from the Content-Length header, 0 if it is missing."""
+    return int(response.headers.get("Content-Length", 0))
+
+
+def send_get_request(url, max_retries=8, retry_delay=10, raw=False):
     """
     Send a GET request to a specified URL.
 
@@ -17,53 +213,213 @@ def send_get_request(url, max_retries=8, retry_delay=10):
     max_retries : int
       Number of times the HTTP request is retried when Riot server returns
       HTTP error 429 Rate limit exceeded.
-      Riot API has request limit of 100 requests per two minutes.
+      Requests are scheduled according to the rate limits from the response
+      headers, so 429 errors are normally not returned.
 
     retry_delay : int
-      Delay before the next retried HTTP request in seconds. For
+      Delay before the next retried HTTP request in seconds, used when
+      429 response has no Retry-After header. For
       each subsequent request the delay is doubled.
 
+    raw : bool
+      When True, return the response body as bytes without parsing it.
+
     Returns
     -------
-    dict
+    dict or bytes
       The JSON response from the server if the request is successful.
 
     Raises
     ------
     Exception
       If the request fails, an exception is raised with the error message.
+
+    HttpError
+      When a transient server error (500, 502, 503 or 504), a timeout or
+      a connection error persists after the retries allowed by the policy
+      set with `configure_retries`. The status code is None for timeouts
+      and connection errors.
+
+    Notes
+    -----
+    Latency, status code and size of each response, retries and time spent
+    waiting are recorded by the collector from `lolstats.metrics.get_metrics`.
     """
 
     attempts = 0
+    retries = 0
+    keys = rate_limit_keys(url)
+    host = keys[1]
+    endpoint = keys[2]
+    metrics = get_metrics()
+    started = time.monotonic()
+
+    def backoff(delay):
+        metrics.observe_retry(endpoint, backoff=delay)
+        time.sleep(delay)
 
     while attempts < max_retries:
-        response = requests.get(url, timeout=10)
+        pause = _retries.pause(host, time.monotonic() - started)
 
-        if response.status_code == 200:
-            return response.json()
-        elif response.status_code == 401:
-            raise MyError(
-                "401 Unauthorized. Your API key is missing or incorrect. "
-                "Regenerate a new key from https://developer.riotgames.com/."
+        if pause is None:
+            raise HttpError(
+                f"503 Service Unavailable. Requests to {host} are paused after repeated errors.",
+                503,
             )
-        elif response.status_code == 403:
-            raise MyError(
-                "403 Forbidden. Your API key has expired. "
-                "Regenerate a new key from https://developer.riotgames.com/."
+        elif pause > 0:
+            metrics.observe_backoff(endpoint, pause)
+            time.sleep(pause)
+
+        metrics.observe_wait(endpoint, _rate_limiter.wait(*keys))
+        start = time.perf_counter()
+
+        try:
+            response = _session_pool.get(url, timeout=10)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            metrics.observe_request(endpoint, "error", time.perf_counter() - start)
+
+            delay = _retries.failure(
+                host, "network", retries, time.monotonic() - started
             )
+
+            if delay is None:
+                raise HttpError(f"Request to {host} failed: {e}", None) from e
+
+            retries += 1
+            backoff(delay)
+            continue
+        except requests.RequestException:
+            metrics.observe_request(endpoint, "error", time.perf_counter() - start)
+            raise
+
+        metrics.observe_request(
+            endpoint,
+            response.status_code,
+            time.perf_counter() - start,
+            response_size(response),
+        )
+
+        if response.status_code in TRANSIENT_STATUS_CODES:
+            delay = _retries.failure(
+                host, "server", retries, time.monotonic() - started
+            )
+
+            if delay is None:
+                raise_for_status(response.status_code, response.reason)
+
+            retries += 1
+            backoff(delay)
+            continue
+
+        _retries.success(host)
+
+        retry_after = _rate_limiter.update(
+            *keys, status_code=response.status_code, headers=response.headers
+        )
+
+        if response.status_code == 200:
+            return response.content if raw else response.json()
         elif response.status_code == 429:
-            time.sleep(retry_delay)
-            retry_delay *= 2  # Double the delay for the next retry
+            if retry_after is None:
+                _rate_limiter.sleep(retry_delay)
+                metrics.observe_retry(endpoint, backoff=retry_delay)
+                retry_delay *= 2  # Double the delay for the next retry
+            else:
+                metrics.observe_retry(endpoint)
+
+            # Otherwise the rate limiter waits for Retry-After seconds before the next attempt
             attempts += 1
         else:
-            raise HttpError(
-                f"{response.status_code} {response.reason}", response.status_code
-            )
+            raise_for_status(response.status_code, response.reason)
 
     # If the loop exits without returning or raising for status 200, it means max retries were reached.
     raise MyError("Max retries exceeded.")
 
 
+def configure_api_url(url=None):
+    """
+    Send all Riot API requests to another server, for example to the local
+    stand-in server `lolstats.fake_api.FakeRiotApi`.
+
+    Parameters
+    ----------
+    url : str, optional
+      Base URL of the server, for example `http://127.0.0.1:8080`.
+      None sends requests to Riot API. The default is the value of
+      `LOLSTATS_API_URL` environment variable.
+    """
+
+    global _api_url
+    _api_url = url or None
+
+
+def api_url(routing):
+    """Return base URL of Riot API requests for the routing value."""
+
+    if _api_url is not None:
+        return _api_url.rstrip("/")
+
+    return f"https://{routing}.api.riotgames.com"
+
+
+def rate_limiter():
+    """Return the rate limiter shared by all Riot API requests of the process."""
+    return _rate_limiter
+
+
+def rate_limit_wait_time():
+    """Return total number of seconds requests waited for the rate limits."""
+    return _rate_limiter.waited
+
+
+def account_url(routing, name, tag, api_key):
+    """Return URL of account-v1 request for the Riot ID. See get_account_puuid."""
+    return f"{api_url(routing)}/riot/account/v1/accounts/by-riot-id/{name}/{tag}?api_key={api_key}"
+
+
+def match_ids_url(
+    route, puuid, api_key, start=0, count=20, start_time=None, end_time=None, queue=None
+):
+    """Return URL of match-v5 request for the list of match IDs. See get_list_of_match_ids."""
+    return (
+        f"{api_url(route)}/lol/match/v5/matches/by-puuid/{puuid}/ids"
+        f"?api_key={api_key}"
+        f"&start={start}"
+        f"&count={count}"
+        f"&startTime={start_time or ''}"
+        f"&endTime={end_time or ''}"
+        f"&queue={queue or ''}"
+    )
+
+
+def match_url(route, id, api_key):
+    """Return URL of match-v5 request for the match data. See get_match."""
+    return f"{api_url(route)}/lol/match/v5/matches/{id}?api_key={api_key}"
+
+
+def timeline_url(route, id, api_key):
+    """Return URL of match-v5 request for the match timeline. See get_timeline."""
+    return f"{api_url(route)}/lol/match/v5/matches/{id}/timeline?api_key={api_key}"
+
+
+def account_routing(route):
+    """
+    Return the nearest account-v1 routing value for the match-v5 routing value.
+
+    Parameters
+    ----------
+    route : str
+      Routing value of match-v5 requests: americas, asia, europe or sea.
+
+    Returns
+    -------
+    str
+      One of americas, asia or europe.
+    """
+
+    return ACCOUNT_ROUTES.get(route, "asia")
+
+
 def get_account_puuid(routing, name, tag, api_key):
     """
     Returns player's identified PUUID given their in-game name.
@@ -92,7 +448,7 @@ def get_account_puuid(routing, name, tag, api_key):
     """
 
     try:
-        url = f"https://{routing}.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{name}/{tag}?api_key={api_key}"
+        url = account_url(routing=routing, name=name, tag=tag, api_key=api_key)
         data = send_get_request(url)
         return data["puuid"]
 
@@ -106,7 +462,14 @@ def get_account_puuid(routing, name, tag, api_key):
 
 
 def get_list_of_match_ids(
-    route, puuid, api_key, start=0, count=20, end_time=None, queue=None
+    route,
+    puuid,
+    api_key,
+    start=0,
+    count=20,
+    start_time=None,
+    end_time=None,
+    queue=None,
 ):
     """
     Returns list of match ids.
@@ -130,7 +493,11 @@ def get_list_of_match_ids(
       Start index.
 
     count: int, optional
-      Number of match ids to return. Valid values: 0 to 100.
+      Number of match ids to return. Valid values: 0 to MAX_MATCH_IDS (100).
+
+    start_time: int, optional
+      The UNIX timestamp in seconds for the start of time range.
+      Matches that start after this time will be included.
 
     end_time: int, optional
       The UNIX timestamp in seconds for the end of time range.
@@ -146,19 +513,21 @@ def get_list_of_match_ids(
       List of match IDs.
     """
 
-    url = (
-        f"https://{route}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids"
-        f"?api_key={api_key}"
-        f"&start={start}"
-        f"&count={count}"
-        f"&endTime={end_time or ''}"
-        f"&queue={queue or ''}"
+    url = match_ids_url(
+        route=route,
+        puuid=puuid,
+        api_key=api_key,
+        start=start,
+        count=count,
+        start_time=start_time,
+        end_time=end_time,
+        queue=queue,
     )
 
     return send_get_request(url)
 
 
-def get_match(route, id, api_key):
+def get_match(route, id, api_key, raw=False):
     """
     Return match data.
 
@@ -172,20 +541,146 @@ def get_match(route, id, api_key):
 
     api_key : str
 
+    raw : bool, optional
+      When True, return match JSON as bytes without parsing it.
+
     Returns
     -------
-    dict
+    dict or bytes
       Match data (see https://developer.riotgames.com/apis#match-v5/GET_getMatch).
     """
 
-    url = (
-        f"https://{route}.api.riotgames.com/lol/match/v5/matches/{id}?api_key={api_key}"
-    )
+    url = match_url(route=route, id=id, api_key=api_key)
+
+    if raw:
+        return send_get_request(url, raw=True)
+
+    return send_get_request(url)
+
+
+def get_timeline(route, id, api_key):
+    """
+    Return match timeline: participants' gold, experience and positions
+    every minute, and all match events.
+
+    Parameters
+    ----------
+    route : str
+      See get_list_of_match_ids.
+
+    id : str
+      Match id.
+
+    api_key : str
+
+    Returns
+    -------
+    dict
+      Match timeline (see https://developer.riotgames.com/apis#match-v5/GET_getTimeline).
+    """
 
+    url = timeline_url(route=route, id=id, api_key=api_key)
     return send_get_request(url)
 
 
-def get_matches(route, ids, api_key):
+def get_match_and_timeline(route, id, api_key, raw=False):
+    """Return (match, timeline) pair, see get_match and get_timeline."""
+
+    match = get_match(route=route, id=id, api_key=api_key, raw=raw)
+    return match, get_timeline(route=route, id=id, api_key=api_key)
+
+
+def get_match_or_error(route, id, api_key, raw=False, timeline=False):
+    """
+    Return match data, or (match, timeline) pair when `timeline` is True,
+    or HttpError if a request failed with HTTP error.
+    """
+
+    load = get_match_and_timeline if timeline else get_match
+
+    try:
+        return load(route=route, id=id, api_key=api_key, raw=raw)
+    except HttpError as e:
+        return e
+
+
+def iter_matches(
+    route, ids, api_key, concurrency=1, raw=False, return_errors=False, timeline=False
+):
+    """
+    Loads match data from Riot API, yielding each match as soon as it is loaded.
+
+    At most `concurrency` matches are requested or waiting to be yielded
+    at any time, so memory use does not depend on the number of IDs.
+
+    Parameters
+    ----------
+    route : str
+      See get_list_of_match_ids.
+
+    ids : list
+      List of match IDs.
+
+    api_key : str
+
+    concurrency : int, optional
+      Maximum number of matches loaded in parallel. All requests share
+      the same rate limiter and connection pool.
+
+    raw : bool, optional
+      When True, yield match JSON as bytes without parsing it.
+
+    return_errors : bool, optional
+      When True, HttpError of a match that failed to load, for example
+      404 Not Found, is yielded in place of the match instead of being raised,
+      and the remaining matches are loaded.
+
+    timeline : bool, optional
+      When True, the match timeline is loaded together with each match
+      and (match, timeline) pairs are yielded, see get_timeline.
+
+    Yields
+    ------
+    dict or bytes
+      Match data (see https://developer.riotgames.com/apis#match-v5/GET_getMatch)
+      in the same order as `ids`.
+    """
+
+    if return_errors:
+        load = partial(get_match_or_error, timeline=timeline)
+    elif timeline:
+        load = get_match_and_timeline
+    else:
+        load = get_match
+
+    if concurrency <= 1 or len(ids) <= 1:
+        for id in ids:
+            yield load(route=route, id=id, api_key=api_key, raw=raw)
+
+        return
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(ids))) as executor:
+        pending = deque()
+
+        try:
+            for id in ids:
+                pending.append(
+                    executor.submit(load, route=route, id=id, api_key=api_key, raw=raw)
+                )
+
+                if len(pending) >= concurrency:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # Do not start loading the remaining matches after an error
+            # or when the consumer stops early
+            for future in pending:
+                future.cancel()
+
+
+def get_matches(route, ids, api_key, concurrency=1):
     """
     Loads match data from Riot API.
 
@@ -199,10 +694,17 @@ def get_matches(route, ids, api_key):
 
     api_key : str
 
+    concurrency : int, optional
+      Maximum number of matches loaded in parallel. All requests share
+      the same rate limiter and connection pool.
+
     Returns
     -------
     list of dict
-      List of match data (see https://developer.riotgames.com/apis#match-v5/GET_getMatch).
+      List of match data (see https://developer.riotgames.com/apis#match-v5/GET_getMatch)
+      in the same order as `ids`.
     """
 
-    return [get_match(route=route, id=id, api_key=api_key) for id in ids]
+    return list(
+        iter_matches(route=route, ids=ids, api_key=api_key, concurrency=concurrency)
+    )
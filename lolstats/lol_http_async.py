@@ -0,0 +1,165 @@
+"""Load data from Riot API with asyncio.
+
+Async counterparts of the functions in `lolstats.lol_http`. They share
+the rate limiter with the blocking functions and send requests through
+an `aiohttp.ClientSession` with pooled keep-alive connections.
+"""
+
+import asyncio
+import aiohttp
+from lolstats.lol_http import (
+    rate_limiter,
+    rate_limit_keys,
+    raise_for_status,
+    account_url,
+    match_ids_url,
+    match_url,
+)
+from lolstats.errors import MyError, HttpError
+
+
+def create_session(pool_size=10, keep_alive=True):
+    """
+    Create HTTP session for async Riot API requests.
+    Must be called from a running event loop.
+
+    Parameters
+    ----------
+    pool_size : int
+      Maximum number of connections kept open to each routing host.
+
+    keep_alive : bool
+      When False, connections are closed after each response.
+
+    Returns
+    -------
+    aiohttp.ClientSession
+    """
+
+    connector = aiohttp.TCPConnector(
+        limit=0, limit_per_host=pool_size, force_close=not keep_alive
+    )
+
+    return aiohttp.ClientSession(
+        connector=connector, timeout=aiohttp.ClientTimeout(total=10)
+    )
+
+
+async def send_get_request(session, url, max_retries=8, retry_delay=10, raw=False):
+    """
+    Send a GET request to a specified URL.
+
+    Parameters
+    ----------
+    session : aiohttp.ClientSession
+      See `create_session`.
+
+    url, max_retries, retry_delay, raw
+      See `lolstats.lol_http.send_get_request`.
+
+    Returns
+    -------
+    dict or bytes
+      The JSON response from the server if the request is successful.
+
+    Raises
+    ------
+    HttpError
+      For unsuccessful responses, and with None status code for timeouts
+      and connection errors.
+    """
+
+    attempts = 0
+    keys = rate_limit_keys(url)
+    limiter = rate_limiter()
+
+    while attempts < max_retries:
+        delay = limiter.schedule(*keys)
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        try:
+            async with session.get(url) as response:
+                retry_after = limiter.update(
+                    *keys, status_code=response.status, headers=response.headers
+                )
+
+                if response.status == 200:
+                    return await (response.read() if raw else response.json())
+                elif response.status == 429:
+                    if retry_after is None:
+                        await asyncio.sleep(retry_delay)
+                        retry_delay *= 2
+
+                    attempts += 1
+                else:
+                    raise_for_status(response.status, response.reason)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise HttpError(f"Request to {keys[1]} failed: {e!r}", None) from e
+
+    raise MyError("Max retries exceeded.")
+
+
+async def get_account_puuid(session, routing, name, tag, api_key):
+    """
+    Returns player's identified PUUID given their in-game name.
+    See `lolstats.lol_http.get_account_puuid`.
+    """
+
+    try:
+        url = account_url(routing=routing, name=name, tag=tag, api_key=api_key)
+        data = await send_get_request(session, url)
+        return data["puuid"]
+
+    except HttpError as e:
+        if e.status_code == 404:
+            raise MyError(
+                f"Player {name}#{tag} not found. Check if the name and tag are correct."
+            ) from e
+
+        raise
+
+
+async def get_list_of_match_ids(
+    session,
+    route,
+    puuid,
+    api_key,
+    start=0,
+    count=20,
+    start_time=None,
+    end_time=None,
+    queue=None,
+):
+    """
+    Returns list of match ids.
+    See `lolstats.lol_http.get_list_of_match_ids`.
+    """
+
+    url = match_ids_url(
+        route=route,
+        puuid=puuid,
+        api_key=api_key,
+        start=start,
+        count=count,
+        start_time=start_time,
+        end_time=end_time,
+        queue=queue,
+    )
+
+    return await send_get_request(session, url)
+
+
+async def get_match(session, route, id, api_key, raw=False):
+    """
+    Return match data.
+    See `lolstats.lol_http.get_match`.
+    """
+
+    url = match_url(route=route, id=id, api_key=api_key)
+
+    if raw:
+        return await send_get_request(session, url, raw=True)
+
+    return await send_get_request(session, url)
@@ -0,0 +1,170 @@
+import asyncio
+import aiohttp
+import pytest
+from unittest.mock import patch
+
+from lolstats.lol_http_async import (
+    create_session,
+    send_get_request,
+    get_account_puuid,
+    get_list_of_match_ids,
+    get_match,
+)
+
+from lolstats.errors import MyError, HttpError
+
+
+class FakeResponse:
+    def __init__(self, status, data=None, headers=None, reason="OK"):
+        self.status = status
+        self.data = data
+        self.headers = headers or {}
+        self.reason = reason
+
+    async def json(self):
+        return self.data
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.urls = []
+
+    def get(self, url):
+        self.urls.append(url)
+        return self.responses.pop(0)
+
+
+def test_create_session():
+    async def create():
+        async with create_session(pool_size=3, keep_alive=False) as session:
+            assert session.connector.limit_per_host == 3
+            assert session.connector.force_close
+
+    asyncio.run(create())
+
+
+def test_send_get_request_success():
+    session = FakeSession([FakeResponse(200, {"key": "value"})])
+
+    response = asyncio.run(send_get_request(session, "http://example.com"))
+
+    assert response == {"key": "value"}
+    assert session.urls == ["http://example.com"]
+
+
+def test_send_get_request_forbidden():
+    session = FakeSession([FakeResponse(403, reason="Forbidden")])
+
+    with pytest.raises(MyError) as excinfo:
+        asyncio.run(send_get_request(session, "http://example.com"))
+
+    assert "403 Forbidden. Your API key has expired." in str(excinfo.value)
+
+
+def test_send_get_request_http_error():
+    session = FakeSession([FakeResponse(500, reason="Internal Server Error")])
+
+    with pytest.raises(HttpError) as excinfo:
+        asyncio.run(send_get_request(session, "http://example.com"))
+
+    assert str(excinfo.value) == "500 Internal Server Error"
+    assert excinfo.value.status_code == 500
+
+
+@patch("asyncio.sleep")
+def test_send_get_request_max_retries_exceeded(mock_sleep):
+    session = FakeSession([FakeResponse(429, reason="Too Many Requests")] * 3)
+
+    with pytest.raises(MyError) as excinfo:
+        asyncio.run(
+            send_get_request(
+                session, "http://example.com", max_retries=3, retry_delay=1
+            )
+        )
+
+    assert "Max retries exceeded." in str(excinfo.value)
+    assert [c.args[0] for c in mock_sleep.call_args_list] == [1, 2, 4]
+
+
+def test_get_account_puuid():
+    session = FakeSession([FakeResponse(200, {"puuid": "test-puuid"})])
+
+    puuid = asyncio.run(
+        get_account_puuid(session, "americas", "PlayerName", "PlayerTag", "testkey")
+    )
+
+    assert puuid == "test-puuid"
+
+    assert session.urls == [
+        "https://americas.api.riotgames.com/riot/account/v1/accounts/by-riot-id/PlayerName/PlayerTag?api_key=testkey"
+    ]
+
+
+def test_get_account_puuid_not_found():
+    session = FakeSession([FakeResponse(404, reason="Not Found")])
+
+    with pytest.raises(MyError) as excinfo:
+        asyncio.run(get_account_puuid(session, "americas", "Unknown", "Tag", "key"))
+
+    assert "Player Unknown#Tag not found" in str(excinfo.value)
+
+
+def test_get_list_of_match_ids():
+    session = FakeSession([FakeResponse(200, [1, 2, 3])])
+
+    result = asyncio.run(
+        get_list_of_match_ids(
+            session, route="americas", puuid="puuid123", api_key="testkey", queue=456
+        )
+    )
+
+    assert result == [1, 2, 3]
+
+    assert session.urls == [
+        "https://americas.api.riotgames.com/lol/match/v5/matches/by-puuid/puuid123/ids?api_key=testkey&start=0&count=20&startTime=&endTime=&queue=456"
+    ]
+
+
+def test_get_match():
+    session = FakeSession([FakeResponse(200, {"data": 123})])
+
+    result = asyncio.run(
+        get_match(session, route="americas", id="match123", api_key="testkey")
+    )
+
+    assert result == {"data": 123}
+
+    assert session.urls == [
+        "https://americas.api.riotgames.com/lol/match/v5/matches/match123?api_key=testkey"
+    ]
+
+
+class FailingSession:
+    def __init__(self, error):
+        self.error = error
+
+    def get(self, url):
+        raise self.error
+
+
+@pytest.mark.parametrize(
+    "error",
+    [aiohttp.ClientConnectionError("Connection reset"), asyncio.TimeoutError()],
+)
+def test_send_get_request_network_error(error):
+    session = FailingSession(error)
+
+    with pytest.raises(HttpError) as excinfo:
+        asyncio.run(
+            send_get_request(session, "https://asia.api.riotgames.com/a?api_key=key")
+        )
+
+    assert excinfo.value.status_code is None
+    assert "Request to asia.api.riotgames.com failed" in str(excinfo.value)
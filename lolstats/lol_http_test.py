@@ -1,21 +1,37 @@
 import pytest
+import requests
 import sys
+import time
 from pathlib import Path
 from unittest.mock import patch, Mock, call
 
 from lolstats.lol_http import (
     send_get_request,
+    account_routing,
     get_account_puuid,
     get_list_of_match_ids,
     get_match,
+    get_timeline,
     get_matches,
+    iter_matches,
+    configure_sessions,
+    configure_api_url,
+    configure_retries,
+    match_url,
+    connection_stats,
+    endpoint_name,
+    rate_limit_keys,
 )
+from lolstats.rate_limit import RateLimiter, WINDOW_MARGIN
+from lolstats.fake_api import FakeRiotApi
+from lolstats.retry import RetryPolicy
 
 from lolstats.errors import MyError, HttpError
 
 
 @patch(
-    "requests.get", return_value=Mock(status_code=200, json=lambda: {"key": "value"})
+    "requests.Session.get",
+    return_value=Mock(status_code=200, headers={}, json=lambda: {"key": "value"}),
 )
 def test_send_get_request_success(mock_get):
     response = send_get_request("http://example.com")
@@ -23,7 +39,20 @@ def test_send_get_request_success(mock_get):
     assert response == {"key": "value"}
 
 
-@patch("requests.get", return_value=Mock(status_code=401, reason="Unauthorized"))
+@patch(
+    "requests.Session.get",
+    return_value=Mock(status_code=200, headers={}, content=b'{"key": "value"}'),
+)
+def test_send_get_request_raw(mock_get):
+    response = send_get_request("http://example.com", raw=True)
+
+    assert response == b'{"key": "value"}'
+
+
+@patch(
+    "requests.Session.get",
+    return_value=Mock(status_code=401, headers={}, reason="Unauthorized"),
+)
 def test_send_get_request_unauthorised(mock_get):
     with pytest.raises(MyError) as excinfo:
         send_get_request("http://example.com")
@@ -33,7 +62,10 @@ def test_send_get_request_unauthorised(mock_get):
     )
 
 
-@patch("requests.get", return_value=Mock(status_code=403, reason="Forbidden"))
+@patch(
+    "requests.Session.get",
+    return_value=Mock(status_code=403, headers={}, reason="Forbidden"),
+)
 def test_send_get_request_forbidden(mock_get):
     with pytest.raises(MyError) as excinfo:
         send_get_request("http://example.com")
@@ -43,10 +75,12 @@ def test_send_get_request_forbidden(mock_get):
 
 @patch("time.sleep", return_value=None)
 @patch(
-    "requests.get",
+    "requests.Session.get",
     side_effect=[
-        Mock(status_code=429, reason="Too Many Requests"),  # First attempt
-        Mock(status_code=200, json=lambda: {"key": "value"}),  # Second attempt
+        Mock(status_code=429, headers={}, reason="Too Many Requests"),  # First attempt
+        Mock(
+            status_code=200, headers={}, json=lambda: {"key": "value"}
+        ),  # Second attempt
     ],
 )
 def test_send_get_request_rate_limit_exceeded_and_success(mock_get, mock_sleep):
@@ -58,7 +92,10 @@ def test_send_get_request_rate_limit_exceeded_and_success(mock_get, mock_sleep):
 
 
 @patch("time.sleep", return_value=None)
-@patch("requests.get", return_value=Mock(status_code=429, reason="Too Many Requests"))
+@patch(
+    "requests.Session.get",
+    return_value=Mock(status_code=429, headers={}, reason="Too Many Requests"),
+)
 def test_send_get_request_max_retries_exceeded(mock_get, mock_sleep):
     with pytest.raises(MyError) as excinfo:
         send_get_request("http://example.com", max_retries=3, retry_delay=1)
@@ -111,7 +148,7 @@ def test_get_list_of_match_ids(mock_send_get_request):
     assert result == [1, 2, 3]
 
     mock_send_get_request.assert_called_with(
-        "https://americas.api.riotgames.com/lol/match/v5/matches/by-puuid/puuid123/ids?api_key=testkey&start=0&count=20&endTime=&queue="
+        "https://americas.api.riotgames.com/lol/match/v5/matches/by-puuid/puuid123/ids?api_key=testkey&start=0&count=20&startTime=&endTime=&queue="
     )
 
 
@@ -123,6 +160,7 @@ def test_get_list_of_match_ids_with_all_params(mock_send_get_request):
         api_key="testkey",
         start=5,
         count=15,
+        start_time=100,
         end_time=123,
         queue=456,
     )
@@ -130,7 +168,7 @@ def test_get_list_of_match_ids_with_all_params(mock_send_get_request):
     assert result == [1, 2, 3]
 
     mock_send_get_request.assert_called_with(
-        "https://americas.api.riotgames.com/lol/match/v5/matches/by-puuid/puuid123/ids?api_key=testkey&start=5&count=15&endTime=123&queue=456"
+        "https://americas.api.riotgames.com/lol/match/v5/matches/by-puuid/puuid123/ids?api_key=testkey&start=5&count=15&startTime=100&endTime=123&queue=456"
     )
 
 
@@ -167,3 +205,365 @@ def test_get_matches(mock_send_get_request):
     ]
 
     assert mock_send_get_request.call_args_list == expected_calls
+
+
+def test_configure_sessions():
+    configure_sessions(pool_size=2, keep_alive=False)
+
+    try:
+        with patch(
+            "requests.Session.get",
+            return_value=Mock(
+                status_code=200, headers={}, json=lambda: {"key": "value"}
+            ),
+        ):
+            send_get_request("https://asia.api.riotgames.com/path")
+
+        assert connection_stats() == {
+            "asia.api.riotgames.com": {"requests": 0, "connections": 0, "reused": 0}
+        }
+    finally:
+        configure_sessions()
+
+    assert connection_stats() == {}
+
+
+def test_configure_sessions_reuses_connection():
+    with FakeRiotApi(players=10, matches=50) as api:
+        configure_sessions(pool_size=2)
+        configure_api_url(api.url)
+
+        try:
+            for id in ["NA1_1000000000", "NA1_1000000001"]:
+                send_get_request(match_url(route="americas", id=id, api_key="key"))
+
+            assert connection_stats() == {
+                api.url.split("//")[1]: {"requests": 2, "connections": 1, "reused": 1}
+            }
+        finally:
+            configure_api_url(None)
+            configure_sessions()
+
+
+def test_endpoint_name():
+    assert (
+        endpoint_name(
+            "https://asia.api.riotgames.com/riot/account/v1/accounts/by-riot-id/Faker/t1?api_key=key"
+        )
+        == "account-v1.getByRiotId"
+    )
+
+    assert (
+        endpoint_name(
+            "https://asia.api.riotgames.com/lol/match/v5/matches/by-puuid/puuid123/ids?api_key=key&start=0"
+        )
+        == "match-v5.getMatchIdsByPUUID"
+    )
+
+    assert (
+        endpoint_name(
+            "https://asia.api.riotgames.com/lol/match/v5/matches/KR_123?api_key=key"
+        )
+        == "match-v5.getMatch"
+    )
+
+    assert (
+        endpoint_name(
+            "https://asia.api.riotgames.com/lol/match/v5/matches/KR_123/timeline?api_key=key"
+        )
+        == "match-v5.getTimeline"
+    )
+
+    assert endpoint_name("http://example.com/other") == "/other"
+
+
+def test_rate_limit_keys():
+    assert rate_limit_keys(
+        "https://asia.api.riotgames.com/lol/match/v5/matches/KR_123?api_key=key"
+    ) == ("key", "asia.api.riotgames.com", "match-v5.getMatch")
+
+
+@patch("lolstats.lol_http._rate_limiter", new_callable=RateLimiter)
+@patch("time.monotonic", return_value=100)
+@patch("time.sleep", return_value=None)
+@patch(
+    "requests.Session.get",
+    side_effect=[
+        Mock(
+            status_code=429,
+            headers={"Retry-After": "3", "X-Rate-Limit-Type": "method"},
+            reason="Too Many Requests",
+        ),
+        Mock(status_code=200, headers={}, json=lambda: {"key": "value"}),
+    ],
+)
+def test_send_get_request_uses_retry_after(
+    mock_get, mock_sleep, mock_monotonic, mock_limiter
+):
+    response = send_get_request("http://example.com")
+
+    assert response == {"key": "value"}
+    assert mock_get.call_count == 2
+    mock_sleep.assert_called_once_with(3)
+
+
+@patch("lolstats.lol_http._rate_limiter", new_callable=RateLimiter)
+@patch("time.monotonic", return_value=100)
+@patch("time.sleep", return_value=None)
+@patch(
+    "requests.Session.get",
+    return_value=Mock(
+        status_code=200,
+        headers={"X-App-Rate-Limit": "1:1", "X-App-Rate-Limit-Count": "1:1"},
+        json=lambda: {"key": "value"},
+    ),
+)
+def test_send_get_request_waits_for_rate_limit(
+    mock_get, mock_sleep, mock_monotonic, mock_limiter
+):
+    send_get_request("https://asia.api.riotgames.com/a?api_key=key")
+    send_get_request("https://asia.api.riotgames.com/b?api_key=key")
+
+    mock_sleep.assert_called_once_with(pytest.approx(1 + WINDOW_MARGIN))
+
+
+def test_get_matches_concurrent_keeps_order():
+    delays = {"a": 0.03, "b": 0.02, "c": 0.01, "d": 0}
+
+    def send(url):
+        id = url.split("/")[-1].split("?")[0]
+        time.sleep(delays[id])
+        return {"id": id}
+
+    with patch("lolstats.lol_http.send_get_request", side_effect=send) as mock_send:
+        result = get_matches(
+            route="americas", ids=["a", "b", "c", "d"], api_key="key", concurrency=4
+        )
+
+    assert result == [{"id": "a"}, {"id": "b"}, {"id": "c"}, {"id": "d"}]
+    assert mock_send.call_count == 4
+
+
+def test_get_matches_concurrent_error():
+    def send(url):
+        if "/b?" in url:
+            raise HttpError("Internal Server Error", 500)
+
+        return {"data": 1}
+
+    with patch("lolstats.lol_http.send_get_request", side_effect=send):
+        with pytest.raises(HttpError) as excinfo:
+            get_matches(
+                route="americas", ids=["a", "b", "c"], api_key="key", concurrency=2
+            )
+
+    assert excinfo.value.status_code == 500
+
+
+def test_iter_matches_stops_early():
+    with patch(
+        "lolstats.lol_http.send_get_request", side_effect=lambda url: {"url": url}
+    ) as mock_send:
+        matches = iter_matches(
+            route="americas",
+            ids=[str(i) for i in range(10)],
+            api_key="key",
+            concurrency=2,
+        )
+
+        assert "/0?" in next(matches)["url"]
+        matches.close()
+
+    # Only the matches within the concurrency window were requested
+    assert mock_send.call_count <= 3
+
+
+def test_iter_matches_return_errors():
+    def send(url):
+        if "/b?" in url:
+            raise HttpError("Not Found", 404)
+
+        return {"data": 1}
+
+    with patch("lolstats.lol_http.send_get_request", side_effect=send):
+        result = list(
+            iter_matches(
+                route="americas",
+                ids=["a", "b", "c"],
+                api_key="key",
+                concurrency=2,
+                return_errors=True,
+            )
+        )
+
+    assert result[0] == {"data": 1}
+    assert isinstance(result[1], HttpError)
+    assert result[1].status_code == 404
+    assert result[2] == {"data": 1}
+
+
+def test_account_routing():
+    assert account_routing("americas") == "americas"
+    assert account_routing("europe") == "europe"
+    assert account_routing("sea") == "asia"
+
+
+@patch("lolstats.lol_http.send_get_request")
+def test_get_timeline(mock_send_get_request):
+    mock_send_get_request.return_value = {"info": {"frames": []}}
+
+    result = get_timeline(route="americas", id="NA1_1", api_key="key")
+
+    assert result == {"info": {"frames": []}}
+
+    mock_send_get_request.assert_called_once_with(
+        "https://americas.api.riotgames.com/lol/match/v5/matches/NA1_1/timeline?api_key=key"
+    )
+
+
+def test_iter_matches_timeline():
+    with patch(
+        "lolstats.lol_http.send_get_request", side_effect=lambda url: {"url": url}
+    ):
+        result = list(
+            iter_matches(
+                route="americas",
+                ids=["a", "b"],
+                api_key="k",
+                concurrency=2,
+                timeline=True,
+            )
+        )
+
+    assert result == [
+        (
+            {
+                "url": "https://americas.api.riotgames.com/lol/match/v5/matches/a?api_key=k"
+            },
+            {
+                "url": "https://americas.api.riotgames.com/lol/match/v5/matches/a/timeline?api_key=k"
+            },
+        ),
+        (
+            {
+                "url": "https://americas.api.riotgames.com/lol/match/v5/matches/b?api_key=k"
+            },
+            {
+                "url": "https://americas.api.riotgames.com/lol/match/v5/matches/b/timeline?api_key=k"
+            },
+        ),
+    ]
+
+
+def test_configure_api_url():
+    try:
+        configure_api_url("http://127.0.0.1:8080/")
+
+        assert (
+            match_url(route="europe", id="EUW1_1", api_key="key")
+            == "http://127.0.0.1:8080/lol/match/v5/matches/EUW1_1?api_key=key"
+        )
+    finally:
+        configure_api_url(None)
+
+    assert match_url(route="europe", id="EUW1_1", api_key="key").startswith(
+        "https://europe.api.riotgames.com/"
+    )
+
+
+@patch("random.uniform", side_effect=lambda low, high: high)
+@patch("time.sleep", return_value=None)
+@patch(
+    "requests.Session.get",
+    side_effect=[
+        Mock(status_code=503, headers={}, reason="Service Unavailable"),
+        requests.Timeout("Read timed out"),
+        Mock(status_code=502, headers={}, reason="Bad Gateway"),
+        Mock(status_code=200, headers={}, json=lambda: {"key": "value"}),
+    ],
+)
+def test_send_get_request_retries_transient_errors(mock_get, mock_sleep, mock_uniform):
+    try:
+        configure_retries(failure_threshold=100)
+        assert send_get_request("https://asia.api.riotgames.com/a?api_key=key") == {
+            "key": "value"
+        }
+    finally:
+        configure_retries()
+
+    assert mock_get.call_count == 4
+
+    # Capped exponential back-off
+    assert mock_sleep.call_args_list == [call(1), call(2), call(4)]
+
+
+@patch("time.sleep", return_value=None)
+@patch(
+    "requests.Session.get",
+    return_value=Mock(status_code=500, headers={}, reason="Internal Server Error"),
+)
+def test_send_get_request_transient_error_retries_exceeded(mock_get, mock_sleep):
+    try:
+        configure_retries(
+            policies={"server": RetryPolicy(max_retries=2)}, failure_threshold=100
+        )
+
+        with pytest.raises(HttpError) as excinfo:
+            send_get_request("https://asia.api.riotgames.com/a?api_key=key")
+    finally:
+        configure_retries()
+
+    assert excinfo.value.status_code == 500
+    assert mock_get.call_count == 3
+
+
+@patch("time.sleep", return_value=None)
+@patch("requests.Session.get", side_effect=requests.ConnectionError("Reset"))
+def test_send_get_request_connection_error(mock_get, mock_sleep):
+    try:
+        configure_retries(
+            policies={"network": RetryPolicy(max_retries=1)}, failure_threshold=100
+        )
+
+        with pytest.raises(HttpError) as excinfo:
+            send_get_request("https://asia.api.riotgames.com/a?api_key=key")
+    finally:
+        configure_retries()
+
+    assert excinfo.value.status_code is None
+    assert "Reset" in str(excinfo.value)
+    assert mock_get.call_count == 2
+
+
+@patch("time.sleep", return_value=None)
+@patch(
+    "requests.Session.get",
+    return_value=Mock(status_code=503, headers={}, reason="Service Unavailable"),
+)
+def test_send_get_request_circuit_breaker(mock_get, mock_sleep):
+    try:
+        configure_retries(
+            policies={"server": RetryPolicy(max_retries=0)},
+            request_budget=10,
+            failure_threshold=2,
+            cooldown=60,
+        )
+
+        for _ in range(2):
+            with pytest.raises(HttpError):
+                send_get_request("https://asia.api.riotgames.com/a?api_key=key")
+
+        # Requests to the host are paused longer than the request budget
+        with pytest.raises(HttpError) as excinfo:
+            send_get_request("https://asia.api.riotgames.com/b?api_key=key")
+
+        assert "paused" in str(excinfo.value)
+        assert mock_get.call_count == 2
+
+        # Other hosts are not paused
+        with pytest.raises(HttpError):
+            send_get_request("https://europe.api.riotgames.com/a?api_key=key")
+
+        assert mock_get.call_count == 3
+    finally:
+        configure_retries()
@@ -1,12 +1,59 @@
 """Loads match data from Riot API and saves them to disk."""
 
+from contextlib import closing, nullcontext
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
-import os
-from lolstats.lol_http import get_account_puuid, get_list_of_match_ids, get_matches
-from lolstats.disk import unsaved_matches, save_matches, save_player
+import math
+import time
+from lolstats.lol_http import (
+    MAX_MATCH_IDS,
+    account_routing,
+    get_account_puuid,
+    get_list_of_match_ids,
+    iter_matches,
+)
+from lolstats.disk import (
+    ACCOUNT_CACHE_TTL,
+    account_key,
+    load_account_cache,
+    save_account_cache,
+    load_watermark,
+    save_watermark,
+    load_checkpoint,
+    save_checkpoint,
+)
+from lolstats.errors import HttpError
+from lolstats.players import player_registry
+from lolstats.stores import open_match_store
+from lolstats.pipeline import prefetch, BackgroundWriter
+from lolstats.metrics import timed_writer
+from lolstats.raw import raw_match_summary
+from lolstats.timeline import save_timelines
 
+# Maximum number of loaded matches that wait to be saved and are saved together
+WRITE_BATCH_SIZE = 8
 
-def load_matches(directory, total_matches, route, name, tag, api_key, queue=None):
+
+def load_matches(
+    directory,
+    total_matches,
+    route,
+    name,
+    tag,
+    api_key,
+    queue=None,
+    concurrency=1,
+    prefetch_pages=2,
+    incremental=True,
+    stop_at_saved=True,
+    layout=None,
+    format="json",
+    storage="files",
+    raw=False,
+    resume=False,
+    timelines=False,
+):
     """
     Load multiple matches and save them to directory as JSON files.
 
@@ -39,18 +86,371 @@ def load_matches(directory, total_matches, route, name, tag, api_key, queue=None
 
     api_key : str
         Riot API key.
+
+    concurrency : int, optional
+        Maximum number of matches loaded in parallel.
+
+    prefetch_pages : int, optional
+        Maximum number of pages of match IDs listed ahead of loading the matches.
+
+    incremental : bool, optional
+        When True, only the matches played after the newest match saved
+        by the previous run are listed. The newest match is stored
+        in `watermarks.json` for each player and queue.
+        When False, all `total_matches` recent matches are listed.
+
+    stop_at_saved : bool, optional
+        When True, stop listing match IDs at the first page whose matches
+        are all saved to disk.
+
+    layout : str, optional
+        Layout of the matches directory: `flat` or `sharded` (see `lolstats.disk.LAYOUTS`).
+        By default, the current layout of the directory is used.
+
+    format : str, optional
+        Storage format of match files: `json`, `compact`, `gzip` or `zstd`
+        (see `lolstats.disk.FORMATS`). Saved matches are recognized in all formats.
+
+    storage : str, optional
+        Storage backend: `files` saves each match to a file in `matches` directory,
+        `sqlite` saves matches into `matches.sqlite` database (see `lolstats.stores.STORAGES`).
+
+    raw : bool, optional
+        When True, match JSON is saved as received from Riot API, compressed
+        for `gzip` and `zstd` formats, without parsing the whole match.
+        Only the fields used for indexing are read, see `lolstats.raw.raw_match_summary`.
+
+    resume : bool, optional
+        When True, continue the download interrupted in the previous run from
+        the checkpoint: load the matches that were listed but not saved,
+        then continue listing from the same page.
+
+        The checkpoint is saved in `checkpoints.json` for each player and queue
+        before loading each page of matches. It stores the listing position,
+        IDs of the matches being loaded and IDs of the matches that failed to load
+        with HttpError, for example 404 Not Found or 500 Internal Server Error.
+        Failed matches do not stop the run and are retried by the next run.
+
+        When False and the previous download was interrupted, its checkpoint
+        is kept and the watermark is not moved, so that matches it did not list
+        are loaded later with `resume`.
+
+    timelines : bool, optional
+        When True, the timeline of each new match is loaded too and saved
+        with `lolstats.timeline.save_timeline`.
+
+    Returns
+    -------
+    dict
+        Dictionary with keys:
+            * `total`: number of listed matches.
+            * `new`: number of listed matches that were not saved.
+            * `failed`: number of matches that failed to load.
     """
-    puuid = get_account_puuid(routing="asia", name=name, tag=tag, api_key=api_key)
-    save_player(name=name, tag=tag, puuid=puuid, directory=directory)
-    batch_size = 20
+    (puuid,) = resolve_puuids(
+        directory=directory,
+        players=[{"name": name, "tag": tag}],
+        route=route,
+        api_key=api_key,
+    )
+
     total_loaded = 0
     total_new = 0
+    store = open_match_store(
+        directory=directory, storage=storage, format=format, layout=layout
+    )
+
+    checkpoint = load_checkpoint(directory=directory, puuid=puuid, queue=queue)
+
+    # True when the previous download stopped before listing and saving all matches
+    interrupted = (
+        not resume
+        and checkpoint is not None
+        and (
+            checkpoint["start"] < checkpoint["totalMatches"]
+            or len(checkpoint["pending"]) > 0
+        )
+    )
+
+    # Matches that failed to load in the previous runs are retried
+    retry_ids = checkpoint["failed"] if checkpoint else []
+
+    if resume and checkpoint:
+        # Continue listing where the previous run stopped. Matches played
+        # after the previous run started are excluded, so page offsets do not shift
+        retry_ids = checkpoint["pending"] + retry_ids
+        watermark = checkpoint["watermark"]
+        listed = {"newest": checkpoint["newest"], "complete": checkpoint["complete"]}
+        total_matches = checkpoint["totalMatches"]
+        end_time = checkpoint["endTime"]
+        first_page = checkpoint["start"]
+    else:
+        # Newest match saved by the previous run
+        watermark = None
+
+        if incremental:
+            watermark = load_watermark(directory=directory, puuid=puuid, queue=queue)
+
+        # True when all matches newer than the watermark were listed
+        listed = {"newest": None, "complete": watermark is None}
+        end_time = int(time.time())
+        first_page = 0
+
+    failed = []
+
+    def save_progress(start, pending):
+        if interrupted:
+            # Position of the interrupted download is kept for `resume`
+            save_checkpoint(
+                directory=directory,
+                puuid=puuid,
+                queue=queue,
+                checkpoint=dict(checkpoint, failed=failed),
+            )
+
+            return
+
+        save_checkpoint(
+            directory=directory,
+            puuid=puuid,
+            queue=queue,
+            checkpoint={
+                "totalMatches": total_matches,
+                "start": start,
+                "endTime": end_time,
+                "watermark": watermark,
+                "newest": listed["newest"],
+                "complete": listed["complete"],
+                "pending": pending,
+                "failed": failed,
+            },
+        )
+
+    # Pages of match IDs are listed ahead in a background thread. Each match
+    # is saved in another thread as soon as it is loaded, so only a few
+    # matches are kept in memory regardless of `total_matches`
+    pages = list_match_pages(
+        route=route,
+        puuid=puuid,
+        api_key=api_key,
+        total_matches=total_matches,
+        queue=queue,
+        watermark=watermark,
+        listed=listed,
+        start=first_page,
+        end_time=end_time if first_page > 0 else None,
+    )
+
+    pages = prefetch(pages, size=prefetch_pages)
+    total_pages = math.ceil(max(total_matches - first_page, 0) / MAX_MATCH_IDS)
+    newest_match = None
+
+    with store:
+        save = timed_writer("matches", store.save_raw if raw else store.save)
+
+        with closing(pages), BackgroundWriter(
+            save, size=WRITE_BATCH_SIZE, batch_size=WRITE_BATCH_SIZE
+        ) as writer, open_timeline_writer(directory, timelines) as timelines_writer:
+            retry_ids = store.unsaved(list(dict.fromkeys(retry_ids)))
 
-    for start in tqdm(range(0, total_matches, batch_size), desc="Loading matches"):
-        count = min(batch_size, total_matches - start)
+            if retry_ids:
+                save_progress(start=first_page, pending=retry_ids)
 
-        if count <= 0:
-            break
+                kept = fetch_matches(
+                    route=route,
+                    ids=retry_ids,
+                    api_key=api_key,
+                    writer=writer,
+                    concurrency=concurrency,
+                    raw=raw,
+                    keep={listed["newest"]},
+                    failed=failed,
+                    timeline_writer=timelines_writer,
+                )
+
+                newest_match = kept.get(listed["newest"], newest_match)
+
+            start = first_page
+            previous_ids = []
+
+            for match_ids in tqdm(pages, total=total_pages, desc="Loading matches"):
+                start += MAX_MATCH_IDS
+                total_loaded += len(match_ids)
+                new_match_ids = store.unsaved(match_ids)
+                total_new += len(new_match_ids)
+
+                if stop_at_saved and match_ids and not new_match_ids:
+                    # Match IDs are listed newest first, so older pages are saved too
+                    listed["complete"] = True
+                    break
+
+                # Matches of the previous page can still be waiting to be saved
+                save_progress(start=start, pending=previous_ids + new_match_ids)
+                previous_ids = new_match_ids
+
+                kept = fetch_matches(
+                    route=route,
+                    ids=new_match_ids,
+                    api_key=api_key,
+                    writer=writer,
+                    concurrency=concurrency,
+                    raw=raw,
+                    keep={listed["newest"]},
+                    failed=failed,
+                    timeline_writer=timelines_writer,
+                )
+
+                newest_match = kept.get(listed["newest"], newest_match)
+
+        # Matches older than the saved pages can be missing after an interrupted
+        # download, the watermark is moved when it is resumed
+        if listed["complete"] and listed["newest"] is not None and not interrupted:
+            update_watermark(
+                directory=directory,
+                store=store,
+                puuid=puuid,
+                queue=queue,
+                match_id=listed["newest"],
+                match=newest_match,
+            )
+
+    # All matches are listed and saved, only the failed ones are kept for the next run
+    if failed or interrupted:
+        save_progress(start=total_matches, pending=[])
+    else:
+        save_checkpoint(directory=directory, puuid=puuid, queue=queue, checkpoint=None)
+
+    return {"total": total_loaded, "new": total_new, "failed": len(failed)}
+
+
+def resolve_puuids(
+    directory, players, route, api_key, concurrency=1, ttl=ACCOUNT_CACHE_TTL
+):
+    """
+    Return PUUIDs of the players, requesting only the Riot IDs that are not
+    in the account cache (see `lolstats.disk.load_account_cache`).
+
+    Riot IDs are requested from the account-v1 cluster nearest to `route`,
+    then saved to the account cache and to `player_names.json`.
+
+    Parameters
+    ----------
+    directory : str
+        Path to the data directory.
+
+    players : list of dict
+        Players with `name` and `tag` keys, or with `puuid` key.
+
+    route, api_key
+        See `load_matches`.
+
+    concurrency : int, optional
+        Maximum number of Riot IDs requested in parallel.
+
+    ttl : int, optional
+        Number of seconds cached PUUIDs are used before they are requested again.
+
+    Returns
+    -------
+    list of str
+        PUUIDs of the players, in the same order.
+    """
+
+    cache = load_account_cache(directory=directory, ttl=ttl)
+    routing = account_routing(route)
+
+    # Riot IDs without duplicates that are not in the cache
+    missing = list(
+        {
+            account_key(player["name"], player["tag"]): player
+            for player in players
+            if "puuid" not in player
+            and account_key(player["name"], player["tag"]) not in cache
+        }.values()
+    )
+
+    def resolve(player):
+        return get_account_puuid(
+            routing=routing, name=player["name"], tag=player["tag"], api_key=api_key
+        )
+
+    if concurrency > 1 and len(missing) > 1:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(missing))) as executor:
+            resolved = list(executor.map(resolve, missing))
+    else:
+        resolved = [resolve(player) for player in missing]
+
+    accounts = [
+        (player["name"], player["tag"], puuid)
+        for player, puuid in zip(missing, resolved)
+    ]
+
+    if accounts:
+        save_account_cache(directory=directory, accounts=accounts)
+
+    with player_registry(directory) as registry:
+        for name, tag, puuid in accounts:
+            registry.add(name=name, tag=tag, puuid=puuid)
+            cache[account_key(name, tag)] = puuid
+
+    return [
+        (
+            player["puuid"]
+            if "puuid" in player
+            else cache[account_key(player["name"], player["tag"])]
+        )
+        for player in players
+    ]
+
+
+def list_match_pages(
+    route,
+    puuid,
+    api_key,
+    total_matches,
+    queue=None,
+    watermark=None,
+    listed=None,
+    start=0,
+    end_time=None,
+):
+    """
+    List IDs of the player's matches page by page, newest first.
+
+    Parameters
+    ----------
+    route, puuid, api_key, total_matches, queue
+        See `load_matches`.
+
+    watermark : dict, optional
+        Newest match saved by the previous run, see `lolstats.disk.load_watermark`.
+        Only the matches played after it are listed.
+
+    listed : dict, optional
+        Updated with the listing state: `newest` is the ID of the newest listed
+        match and `complete` is set to True when all matches newer than
+        the watermark were listed.
+
+    start : int, optional
+        Index of the first listed match, used to continue an interrupted listing.
+
+    end_time : int, optional
+        Only the matches played before this UNIX timestamp in seconds are listed.
+
+    Yields
+    ------
+    list of str
+        Match IDs, one page per request.
+    """
+
+    listed = {} if listed is None else listed
+    start_time = watermark["gameEndTimestamp"] // 1000 if watermark else None
+
+    first = start
+
+    for start in range(first, total_matches, MAX_MATCH_IDS):
+        count = min(MAX_MATCH_IDS, total_matches - start)
+        options = {} if end_time is None else {"end_time": end_time}
 
         match_ids = get_list_of_match_ids(
             route=route,
@@ -58,14 +458,176 @@ def load_matches(directory, total_matches, route, name, tag, api_key, queue=None
             api_key=api_key,
             start=start,
             count=count,
+            start_time=start_time,
             queue=queue,
+            **options,
         )
 
-        total_loaded += len(match_ids)
-        match_dir = os.path.join(directory, "matches")
-        new_match_ids = unsaved_matches(directory=match_dir, ids=match_ids)
-        total_new += len(new_match_ids)
-        matches = get_matches(route=route, ids=new_match_ids, api_key=api_key)
-        save_matches(directory=match_dir, matches=matches)
+        if start == 0 and match_ids:
+            listed["newest"] = match_ids[0]
+
+        if watermark and watermark["matchId"] in match_ids:
+            # Reached matches saved by the previous run
+            listed["complete"] = True
+            yield match_ids[: match_ids.index(watermark["matchId"])]
+            return
+
+        yield match_ids
+
+        if len(match_ids) < count:
+            # No more matches
+            listed["complete"] = True
+            return
+
+
+def fetch_matches(
+    route,
+    ids,
+    api_key,
+    writer,
+    concurrency=1,
+    raw=False,
+    keep=(),
+    progress=None,
+    failed=None,
+    timeline_writer=None,
+):
+    """
+    Load matches and pass each of them to the writer as soon as it is loaded.
+
+    Parameters
+    ----------
+    route, api_key, concurrency, raw
+        See `load_matches`.
+
+    ids : list of str
+        IDs of the matches to load.
+
+    writer : lolstats.pipeline.BackgroundWriter
+        Writer that saves the matches, each item is a list with one match.
+        In raw mode, the match is a (summary, data) pair, see `lolstats.disk.save_raw_matches`.
+
+    keep : collection of str, optional
+        IDs of the matches to return, for example the newest match used for the watermark.
+
+    progress : tqdm.tqdm, optional
+        Progress bar updated after each loaded match.
+
+    failed : list, optional
+        When given, IDs of the matches that failed to load with HttpError
+        (for example 404 Not Found) are appended to the list and the remaining
+        matches are loaded. Otherwise the error is raised.
+
+    timeline_writer : lolstats.pipeline.BackgroundWriter, optional
+        When given, the timeline of each match is loaded together with the match
+        and passed to this writer as a list with one (match ID, timeline) pair,
+        see `lolstats.timeline.save_timelines`.
+
+    Returns
+    -------
+    dict
+        Maps match ID from `keep` to match data, or to match summary
+        (see `lolstats.raw.raw_match_summary`) in raw mode.
+    """
+
+    kept = {}
+    options = {} if timeline_writer is None else {"timeline": True}
+
+    matches = iter_matches(
+        route=route,
+        ids=ids,
+        api_key=api_key,
+        concurrency=concurrency,
+        raw=raw,
+        return_errors=failed is not None,
+        **options,
+    )
+
+    with closing(matches):
+        for id, match in zip(ids, matches):
+            if isinstance(match, HttpError):
+                failed.append(id)
+                continue
+
+            if timeline_writer is not None:
+                match, timeline = match
+                timeline_writer.put([(id, timeline)])
+
+            if raw:
+                summary = raw_match_summary(match)
+
+                if id in keep:
+                    kept[id] = summary
+
+                match = (summary, match)
+            elif id in keep:
+                kept[id] = match
+
+            writer.put([match])
+
+            if progress is not None:
+                progress.update(1)
+
+    return kept
+
+
+def open_timeline_writer(directory, enabled):
+    """
+    Return writer of match timelines for `fetch_matches`,
+    or an empty context when timelines are not loaded.
+    """
+
+    if not enabled:
+        return nullcontext()
+
+    return BackgroundWriter(
+        timed_writer("timelines", partial(save_timelines, directory)),
+        size=WRITE_BATCH_SIZE,
+        batch_size=WRITE_BATCH_SIZE,
+    )
+
+
+def update_watermark(directory, store, puuid, queue, match_id, match=None):
+    """
+    Save the newest match of the player as the watermark for the next run.
+
+    Parameters
+    ----------
+    directory : str
+        Path to directory where the data is saved.
+
+    store : FileMatchStore or SqliteMatchStore
+        Storage of the saved matches, see `lolstats.stores.open_match_store`.
+
+    puuid : str
+        Player's unique identifier.
+
+    queue : int or None
+        Game queue type.
+
+    match_id : str
+        ID of the newest listed match.
+
+    match : dict, optional
+        Data of the newest match if it was loaded by this run,
+        otherwise it is loaded from the store.
+    """
+
+    if match is None:
+        try:
+            match = store.load(match_id)
+        except (KeyError, OSError, ValueError):
+            return
+
+    game_end_timestamp = match.get("info", {}).get("gameEndTimestamp")
+
+    if game_end_timestamp is None:
+        return
 
-    return {"total": total_loaded, "new": total_new}
+    save_watermark(
+        directory=directory,
+        puuid=puuid,
+        queue=queue,
+        match_id=match_id,
+        game_end_timestamp=game_end_timestamp,
+    )
@@ -0,0 +1,200 @@
+"""Loads match data from Riot API and saves them to disk with asyncio."""
+
+import asyncio
+from tqdm import tqdm
+from lolstats.lol_http import MAX_MATCH_IDS, account_routing
+from lolstats.lol_http_async import (
+    create_session,
+    get_account_puuid,
+    get_list_of_match_ids,
+    get_match,
+)
+from lolstats.disk import (
+    account_key,
+    load_account_cache,
+    save_account_cache,
+    save_player,
+)
+from lolstats.stores import open_match_store
+from lolstats.raw import raw_match_summary
+
+
+async def load_matches(
+    directory,
+    total_matches,
+    route,
+    name,
+    tag,
+    api_key,
+    queue=None,
+    concurrency=1,
+    session=None,
+    batch_size=MAX_MATCH_IDS,
+    prefetch_pages=2,
+    format="json",
+    storage="files",
+    raw=False,
+):
+    """
+    Load multiple matches and save them to directory as JSON files.
+
+    Listing match IDs, checking which matches are already on disk, loading
+    matches and saving them run as overlapping stages connected by bounded
+    queues, so the next page of match IDs is requested while matches from
+    the previous page are still loading.
+
+    Parameters
+    ----------
+    directory, total_matches, route, name, tag, api_key, queue, concurrency,
+    format, storage, raw
+        See `lolstats.matches.load_matches`.
+
+    session : aiohttp.ClientSession, optional
+        HTTP session used for the requests. When None, a new session
+        is created and closed after loading.
+
+    batch_size : int, optional
+        Number of match IDs requested per page.
+
+    prefetch_pages : int, optional
+        Maximum number of pages of match IDs listed ahead of the loading stage.
+
+    Returns
+    -------
+    dict
+        Dictionary with keys:
+            * `total`: number of listed matches.
+            * `new`: number of matches loaded and saved to disk.
+    """
+
+    if session is None:
+        async with create_session(pool_size=max(10, concurrency)) as session:
+            return await load_matches(
+                directory=directory,
+                total_matches=total_matches,
+                route=route,
+                name=name,
+                tag=tag,
+                api_key=api_key,
+                queue=queue,
+                concurrency=concurrency,
+                session=session,
+                batch_size=batch_size,
+                prefetch_pages=prefetch_pages,
+                format=format,
+                storage=storage,
+                raw=raw,
+            )
+
+    cache = await asyncio.to_thread(load_account_cache, directory)
+    puuid = cache.get(account_key(name, tag))
+
+    if puuid is None:
+        puuid = await get_account_puuid(
+            session,
+            routing=account_routing(route),
+            name=name,
+            tag=tag,
+            api_key=api_key,
+        )
+
+        await asyncio.to_thread(save_account_cache, directory, [(name, tag, puuid)])
+
+        await asyncio.to_thread(
+            save_player, name=name, tag=tag, puuid=puuid, directory=directory
+        )
+
+    store = await asyncio.to_thread(
+        open_match_store, directory=directory, storage=storage, format=format
+    )
+
+    save_matches = store.save_raw if raw else store.save
+    workers = max(1, concurrency)
+    pages = asyncio.Queue(maxsize=prefetch_pages)
+    new_ids = asyncio.Queue(maxsize=workers * 2)
+    loaded = asyncio.Queue(maxsize=workers * 2)
+    result = {"total": 0, "new": 0}
+    progress = tqdm(total=total_matches, desc="Loading matches")
+
+    async def list_ids():
+        for start in range(0, total_matches, batch_size):
+            count = min(batch_size, total_matches - start)
+
+            match_ids = await get_list_of_match_ids(
+                session,
+                route=route,
+                puuid=puuid,
+                api_key=api_key,
+                start=start,
+                count=count,
+                queue=queue,
+            )
+
+            await pages.put(match_ids)
+
+            if len(match_ids) < count:
+                # No more matches
+                break
+
+        await pages.put(None)
+
+    async def find_unsaved():
+        while (match_ids := await pages.get()) is not None:
+            result["total"] += len(match_ids)
+
+            unsaved = await asyncio.to_thread(store.unsaved, match_ids)
+
+            result["new"] += len(unsaved)
+            progress.update(len(match_ids) - len(unsaved))
+
+            for id in unsaved:
+                await new_ids.put(id)
+
+        for _ in range(workers):
+            await new_ids.put(None)
+
+    async def load():
+        while (id := await new_ids.get()) is not None:
+            match = await get_match(
+                session, route=route, id=id, api_key=api_key, raw=raw
+            )
+
+            if raw:
+                match = (raw_match_summary(match), match)
+
+            await loaded.put(match)
+
+        await loaded.put(None)
+
+    async def save():
+        running = workers
+
+        while running:
+            match = await loaded.get()
+
+            if match is None:
+                running -= 1
+                continue
+
+            await asyncio.to_thread(save_matches, [match])
+
+            progress.update(1)
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            group.create_task(list_ids())
+            group.create_task(find_unsaved())
+
+            for _ in range(workers):
+                group.create_task(load())
+
+            group.create_task(save())
+    except ExceptionGroup as e:
+        # Raise the original error, for example MyError, to keep the same
+        # error handling as the blocking loader
+        raise e.exceptions[0] from None
+    finally:
+        progress.close()
+        await asyncio.to_thread(store.close)
+
+    return result
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import json
+import pytest
+from tempfile import TemporaryDirectory
+
+from lolstats.matches_async import load_matches
+from lolstats.lol_http_async_test import FakeResponse
+from lolstats.errors import HttpError
+
+
+class FakeApi:
+    def __init__(self, pages, fail=None):
+        self.pages = pages
+        self.fail = fail or []
+        self.urls = []
+
+    def get(self, url):
+        self.urls.append(url)
+        path = url.split("?")[0]
+        id = path.split("/")[-1]
+
+        if "/accounts/by-riot-id/" in path:
+            return FakeResponse(200, {"puuid": "test-puuid"})
+
+        if path.endswith("/ids"):
+            start = int(url.split("&start=")[1].split("&")[0])
+            return FakeResponse(200, self.pages.get(start, []))
+
+        if id in self.fail:
+            return FakeResponse(500, reason="Internal Server Error")
+
+        return FakeResponse(200, {"metadata": {"matchId": id}, "data": id})
+
+
+def test_load_matches():
+    api = FakeApi({0: ["id1", "id2"], 2: ["id3", "id4"], 4: ["id5"]})
+
+    with TemporaryDirectory() as tmpdir:
+        matches_dir = os.path.join(tmpdir, "matches")
+        os.makedirs(matches_dir)
+
+        with open(os.path.join(matches_dir, "id3.json"), "w") as f:
+            f.write("dummy data")
+
+        result = asyncio.run(
+            load_matches(
+                directory=tmpdir,
+                total_matches=5,
+                route="asia",
+                name="Faker",
+                tag="t1",
+                api_key="testkey",
+                queue=420,
+                concurrency=3,
+                session=api,
+                batch_size=2,
+            )
+        )
+
+        assert result == {"total": 5, "new": 4}
+        assert sorted(os.listdir(matches_dir)) == [f"id{i}.json" for i in range(1, 6)]
+
+        with open(os.path.join(matches_dir, "id5.json"), "r", encoding="utf-8") as f:
+            assert json.load(f) == {"metadata": {"matchId": "id5"}, "data": "id5"}
+
+        with open(os.path.join(tmpdir, "player_names.json"), "r") as f:
+            assert json.load(f) == {"test-puuid": [{"name": "Faker", "tag": "t1"}]}
+
+        assert api.urls[:2] == [
+            "https://asia.api.riotgames.com/riot/account/v1/accounts/by-riot-id/Faker/t1?api_key=testkey",
+            "https://asia.api.riotgames.com/lol/match/v5/matches/by-puuid/test-puuid/ids?api_key=testkey&start=0&count=2&startTime=&endTime=&queue=420",
+        ]
+
+        assert (
+            "https://asia.api.riotgames.com/lol/match/v5/matches/by-puuid/test-puuid/ids?api_key=testkey&start=4&count=1&startTime=&endTime=&queue=420"
+            in api.urls
+        )
+
+        assert (
+            "https://asia.api.riotgames.com/lol/match/v5/matches/id3?api_key=testkey"
+            not in api.urls
+        )
+
+
+def test_load_matches_error():
+    api = FakeApi({0: ["id1", "id2", "id3"]}, fail=["id2"])
+
+    with TemporaryDirectory() as tmpdir:
+        with pytest.raises(HttpError) as excinfo:
+            asyncio.run(
+                load_matches(
+                    directory=tmpdir,
+                    total_matches=3,
+                    route="asia",
+                    name="Faker",
+                    tag="t1",
+                    api_key="testkey",
+                    concurrency=2,
+                    session=api,
+                )
+            )
+
+        assert excinfo.value.status_code == 500
+
+
+def test_load_matches_stops_at_short_page():
+    api = FakeApi({0: ["id1", "id2"], 2: ["id3"]})
+
+    with TemporaryDirectory() as tmpdir:
+        result = asyncio.run(
+            load_matches(
+                directory=tmpdir,
+                total_matches=10,
+                route="asia",
+                name="Faker",
+                tag="t1",
+                api_key="testkey",
+                session=api,
+                batch_size=2,
+            )
+        )
+
+        assert result == {"total": 3, "new": 3}
+        assert len([url for url in api.urls if "/ids?" in url]) == 2
@@ -1,21 +1,31 @@
 import os
 import json
+import time
+import tracemalloc
+import pytest
 from tempfile import TemporaryDirectory
 from unittest.mock import patch, Mock, call
-from lolstats.matches import load_matches
+from lolstats.matches import load_matches, resolve_puuids, WRITE_BATCH_SIZE
+from lolstats.disk import load_checkpoint
+from lolstats.errors import HttpError
+from lolstats.timeline import load_timeline
+from lolstats.timeline_test import fake_timeline
+from lolstats.sqlite_store import SqliteMatchStore
+from lolstats.stores import open_match_store
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_load_matches(mock_get):
     mock_get.side_effect = [
         Mock(
-            status_code=200, json=lambda: {"puuid": "test-puuid"}
+            status_code=200, headers={}, json=lambda: {"puuid": "test-puuid"}
         ),  # get_account_puuid response
         Mock(
-            status_code=200, json=lambda: ["id1", "id2", "id3", "id4"]
+            status_code=200, headers={}, json=lambda: ["id1", "id2", "id3", "id4"]
         ),  # get_list_of_match_ids response
         Mock(
             status_code=200,
+            headers={},
             json=lambda: {
                 "metadata": {"matchId": "id3"},
                 "data": {"player": "Player1", "result": "win"},
@@ -23,6 +33,7 @@ def test_load_matches(mock_get):
         ),  # get_match 1 response
         Mock(
             status_code=200,
+            headers={},
             json=lambda: {
                 "metadata": {"matchId": "id4"},
                 "data": {"player": "Player2", "result": "loss"},
@@ -52,7 +63,7 @@ def test_load_matches(mock_get):
             queue=123,
         )
 
-        assert result == {"total": 4, "new": 2}
+        assert result == {"total": 4, "new": 2, "failed": 0}
 
         # Check user is saved
         # -------
@@ -102,7 +113,7 @@ def test_load_matches(mock_get):
                 timeout=10,
             ),
             call(
-                "https://asia.api.riotgames.com/lol/match/v5/matches/by-puuid/test-puuid/ids?api_key=testkey&start=0&count=2&endTime=&queue=123",
+                "https://asia.api.riotgames.com/lol/match/v5/matches/by-puuid/test-puuid/ids?api_key=testkey&start=0&count=2&startTime=&endTime=&queue=123",
                 timeout=10,
             ),
             call(
@@ -114,3 +125,592 @@ def test_load_matches(mock_get):
                 timeout=10,
             ),
         ]
+
+
+@patch(
+    "lolstats.matches.iter_matches",
+    side_effect=lambda ids, **kwargs: ({"metadata": {"matchId": id}} for id in ids),
+)
+@patch("lolstats.matches.get_list_of_match_ids", return_value=["id1", "id2"])
+@patch("lolstats.matches.get_account_puuid", return_value="test-puuid")
+def test_load_matches_concurrency(mock_puuid, mock_ids, mock_matches):
+    with TemporaryDirectory() as tmpdir:
+        load_matches(
+            directory=tmpdir,
+            total_matches=2,
+            route="asia",
+            name="Faker",
+            tag="t1",
+            api_key="testkey",
+            concurrency=4,
+        )
+
+        mock_matches.assert_called_once_with(
+            route="asia",
+            ids=["id1", "id2"],
+            api_key="testkey",
+            concurrency=4,
+            raw=False,
+            return_errors=True,
+        )
+
+
+@patch(
+    "lolstats.matches.iter_matches",
+    side_effect=lambda ids, **kwargs: ({"metadata": {"matchId": id}} for id in ids),
+)
+@patch(
+    "lolstats.matches.get_list_of_match_ids",
+    side_effect=lambda start, count, **kwargs: [f"id{start}"] * count,
+)
+@patch("lolstats.matches.get_account_puuid", return_value="test-puuid")
+def test_load_matches_pages(mock_puuid, mock_ids, mock_matches):
+    with TemporaryDirectory() as tmpdir:
+        result = load_matches(
+            directory=tmpdir,
+            total_matches=250,
+            route="asia",
+            name="Faker",
+            tag="t1",
+            api_key="testkey",
+        )
+
+        assert result == {"total": 250, "new": 250, "failed": 0}
+
+        assert [
+            (c.kwargs["start"], c.kwargs["count"]) for c in mock_ids.call_args_list
+        ] == [
+            (0, 100),
+            (100, 100),
+            (200, 50),
+        ]
+
+        assert mock_matches.call_count == 3
+
+
+def peak_memory_loading_matches(total_matches, match_size):
+    """
+    Return peak memory in bytes allocated while loading `total_matches`
+    matches of about `match_size` bytes each.
+    """
+
+    def get_match(id, **kwargs):
+        return {"metadata": {"matchId": id}, "info": {"data": "x" * match_size}}
+
+    def list_ids(start, count, **kwargs):
+        return [f"{id}" for id in range(start, start + count)]
+
+    # Plain functions instead of mocks, which keep all their calls in memory
+    with TemporaryDirectory() as tmpdir, patch(
+        "lolstats.matches.get_account_puuid", new=lambda **kwargs: "test-puuid"
+    ), patch("lolstats.matches.get_list_of_match_ids", new=list_ids), patch(
+        "lolstats.lol_http.get_match", new=get_match
+    ):
+        tracemalloc.start()
+
+        try:
+            load_matches(
+                directory=tmpdir,
+                total_matches=total_matches,
+                route="asia",
+                name="Faker",
+                tag="t1",
+                api_key="testkey",
+                concurrency=4,
+                format="compact",
+            )
+
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+
+def test_load_matches_memory_does_not_grow_with_total_matches():
+    match_size = 100_000
+    peak_small = peak_memory_loading_matches(100, match_size)
+    peak_large = peak_memory_loading_matches(1000, match_size)
+
+    # Only a few matches are in memory at any time: loading ones,
+    # ones waiting to be saved and the batch being written
+    limit = (2 * WRITE_BATCH_SIZE + 20) * match_size
+    assert peak_small < limit
+    assert peak_large < limit
+    assert peak_large < peak_small * 1.5
+
+
+def fake_match(id):
+    return {"metadata": {"matchId": id}, "info": {"gameEndTimestamp": int(id) * 1000}}
+
+
+def load_fake_matches(
+    tmpdir, match_ids, total_matches=10, incremental=True, stop_at_saved=True
+):
+    """Run load_matches against a player whose matches are `match_ids`, newest first."""
+
+    def list_ids(start, count, start_time, **kwargs):
+        ids = [id for id in match_ids if start_time is None or int(id) > start_time]
+        return ids[start : start + count]
+
+    with patch("lolstats.matches.get_account_puuid", return_value="test-puuid"), patch(
+        "lolstats.matches.get_list_of_match_ids", side_effect=list_ids
+    ) as mock_ids, patch(
+        "lolstats.matches.iter_matches",
+        side_effect=lambda ids, **kwargs: (fake_match(id) for id in ids),
+    ):
+        result = load_matches(
+            directory=tmpdir,
+            total_matches=total_matches,
+            route="asia",
+            name="Faker",
+            tag="t1",
+            api_key="testkey",
+            queue=420,
+            incremental=incremental,
+            stop_at_saved=stop_at_saved,
+        )
+
+        return result, mock_ids
+
+
+def test_load_matches_incremental():
+    with TemporaryDirectory() as tmpdir:
+        result, mock_ids = load_fake_matches(tmpdir, ["13", "12", "11"])
+        assert result == {"total": 3, "new": 3, "failed": 0}
+        assert mock_ids.call_args.kwargs["start_time"] is None
+
+        with open(os.path.join(tmpdir, "watermarks.json"), "r") as file:
+            assert json.load(file) == {
+                "test-puuid": {"420": {"matchId": "13", "gameEndTimestamp": 13000}}
+            }
+
+        # Two new matches
+        result, mock_ids = load_fake_matches(tmpdir, ["15", "14", "13", "12", "11"])
+        assert result == {"total": 2, "new": 2, "failed": 0}
+        assert mock_ids.call_args.kwargs["start_time"] == 13
+
+        with open(os.path.join(tmpdir, "watermarks.json"), "r") as file:
+            assert json.load(file)["test-puuid"]["420"]["matchId"] == "15"
+
+        # No new matches
+        result, _ = load_fake_matches(tmpdir, ["15", "14", "13", "12", "11"])
+        assert result == {"total": 0, "new": 0, "failed": 0}
+
+
+def test_load_matches_incremental_stops_at_saved_match():
+    with TemporaryDirectory() as tmpdir:
+        load_fake_matches(tmpdir, ["13", "12"])
+
+        # Start time is ignored, newer matches are listed until the newest saved match
+        with patch(
+            "lolstats.matches.load_watermark",
+            return_value={"matchId": "13", "gameEndTimestamp": 0},
+        ):
+            result, _ = load_fake_matches(tmpdir, ["15", "14", "13", "12"])
+
+        assert result == {"total": 2, "new": 2, "failed": 0}
+
+
+def test_load_matches_incremental_does_not_skip_matches():
+    with TemporaryDirectory() as tmpdir:
+        load_fake_matches(tmpdir, ["10"])
+
+        # More new matches than total_matches, the watermark is not updated
+        # because matches 11 and 12 were not loaded
+        result, _ = load_fake_matches(tmpdir, ["14", "13", "12", "11", "10"], 2)
+        assert result == {"total": 2, "new": 2, "failed": 0}
+
+        with open(os.path.join(tmpdir, "watermarks.json"), "r") as file:
+            assert json.load(file)["test-puuid"]["420"]["matchId"] == "10"
+
+        result, _ = load_fake_matches(tmpdir, ["14", "13", "12", "11", "10"])
+        assert result == {"total": 4, "new": 2, "failed": 0}
+
+        with open(os.path.join(tmpdir, "watermarks.json"), "r") as file:
+            assert json.load(file)["test-puuid"]["420"]["matchId"] == "14"
+
+
+def test_load_matches_not_incremental():
+    with TemporaryDirectory() as tmpdir:
+        load_fake_matches(tmpdir, ["13", "12"])
+
+        result, mock_ids = load_fake_matches(
+            tmpdir, ["14", "13", "12"], incremental=False
+        )
+
+        assert result == {"total": 3, "new": 1, "failed": 0}
+        assert mock_ids.call_args.kwargs["start_time"] is None
+
+
+def test_load_matches_stops_at_saved_page():
+    with TemporaryDirectory() as tmpdir:
+        match_ids = [str(id) for id in range(500, 0, -1)]
+        load_fake_matches(tmpdir, match_ids[200:300], total_matches=100)
+
+        result, mock_ids = load_fake_matches(
+            tmpdir, match_ids, total_matches=500, incremental=False
+        )
+
+        # Third page is saved
+        assert result == {"total": 300, "new": 200, "failed": 0}
+        assert [c.kwargs["start"] for c in mock_ids.call_args_list][:3] == [0, 100, 200]
+
+        result, mock_ids = load_fake_matches(
+            tmpdir,
+            match_ids,
+            total_matches=500,
+            incremental=False,
+            stop_at_saved=False,
+        )
+
+        assert result == {"total": 500, "new": 200, "failed": 0}
+
+
+def test_load_matches_sqlite():
+    with TemporaryDirectory() as tmpdir:
+        with patch(
+            "lolstats.matches.get_account_puuid", return_value="test-puuid"
+        ), patch(
+            "lolstats.matches.get_list_of_match_ids", return_value=["13", "12"]
+        ), patch(
+            "lolstats.matches.iter_matches",
+            side_effect=lambda ids, **kwargs: (fake_match(id) for id in ids),
+        ):
+            result = load_matches(
+                directory=tmpdir,
+                total_matches=2,
+                route="asia",
+                name="Faker",
+                tag="t1",
+                api_key="testkey",
+                storage="sqlite",
+            )
+
+        assert result == {"total": 2, "new": 2, "failed": 0}
+        assert not os.path.exists(os.path.join(tmpdir, "matches"))
+
+        with SqliteMatchStore(os.path.join(tmpdir, "matches.sqlite")) as store:
+            assert store.ids() == {"13", "12"}
+            assert store.load("13") == fake_match("13")
+
+        with open(os.path.join(tmpdir, "watermarks.json"), "r") as file:
+            assert json.load(file)["test-puuid"]["all"]["matchId"] == "13"
+
+
+def test_load_matches_sqlite_saves_batches():
+    batches = []
+    save = SqliteMatchStore.save
+
+    def slow_save(self, matches):
+        batches.append(len(matches))
+        time.sleep(0.01)
+        save(self, matches)
+
+    ids = [str(id) for id in range(50, 0, -1)]
+
+    with TemporaryDirectory() as tmpdir:
+        with patch(
+            "lolstats.matches.get_account_puuid", return_value="test-puuid"
+        ), patch("lolstats.matches.get_list_of_match_ids", return_value=ids), patch(
+            "lolstats.matches.iter_matches",
+            side_effect=lambda ids, **kwargs: (fake_match(id) for id in ids),
+        ), patch.object(
+            SqliteMatchStore, "save", slow_save
+        ):
+            load_matches(
+                directory=tmpdir,
+                total_matches=50,
+                route="asia",
+                name="Faker",
+                tag="t1",
+                api_key="testkey",
+                storage="sqlite",
+            )
+
+        # Matches loaded while a batch is saved are saved in one transaction
+        assert sum(batches) == 50
+        assert 1 < max(batches) <= WRITE_BATCH_SIZE
+
+        with SqliteMatchStore(os.path.join(tmpdir, "matches.sqlite")) as store:
+            assert store.ids() == set(ids)
+
+
+@pytest.mark.parametrize("storage", ["files", "sqlite"])
+def test_load_matches_raw(storage):
+    def get_match(id, raw, **kwargs):
+        assert raw
+        return json.dumps(fake_match(id)).encode("utf-8")
+
+    with TemporaryDirectory() as tmpdir:
+        with patch(
+            "lolstats.matches.get_account_puuid", return_value="test-puuid"
+        ), patch(
+            "lolstats.matches.get_list_of_match_ids", return_value=["13", "12"]
+        ), patch(
+            "lolstats.lol_http.get_match", side_effect=get_match
+        ):
+            result = load_matches(
+                directory=tmpdir,
+                total_matches=2,
+                route="asia",
+                name="Faker",
+                tag="t1",
+                api_key="testkey",
+                queue=420,
+                format="gzip",
+                storage=storage,
+                raw=True,
+            )
+
+        assert result == {"total": 2, "new": 2, "failed": 0}
+
+        with open_match_store(tmpdir, storage=storage) as store:
+            assert store.load("13") == fake_match("13")
+
+        # Watermark is read from the raw match
+        with open(os.path.join(tmpdir, "watermarks.json"), "r") as file:
+            assert json.load(file)["test-puuid"]["420"]["gameEndTimestamp"] == 13000
+
+
+def test_load_matches_retries_failed_matches():
+    def get_match(id, **kwargs):
+        if id in missing:
+            raise HttpError("Not Found", 404)
+
+        return fake_match(id)
+
+    def load(resume=False):
+        with patch(
+            "lolstats.matches.get_account_puuid", return_value="test-puuid"
+        ), patch(
+            "lolstats.matches.get_list_of_match_ids",
+            side_effect=lambda start_time, **kwargs: (
+                [] if start_time else ["13", "12", "11"]
+            ),
+        ), patch(
+            "lolstats.lol_http.get_match", side_effect=get_match
+        ):
+            return load_matches(
+                directory=tmpdir,
+                total_matches=10,
+                route="asia",
+                name="Faker",
+                tag="t1",
+                api_key="testkey",
+                resume=resume,
+            )
+
+    with TemporaryDirectory() as tmpdir:
+        # Failed match does not stop the run
+        missing = {"12"}
+        assert load() == {"total": 3, "new": 3, "failed": 1}
+
+        with open_match_store(tmpdir) as store:
+            assert store.ids() == {"13", "11"}
+
+        assert load_checkpoint(tmpdir, "test-puuid")["failed"] == ["12"]
+
+        # Failed match is retried by the next run
+        missing = set()
+        assert load(resume=True) == {"total": 0, "new": 0, "failed": 0}
+
+        with open_match_store(tmpdir) as store:
+            assert store.ids() == {"13", "12", "11"}
+
+        assert load_checkpoint(tmpdir, "test-puuid") is None
+
+
+def test_load_matches_resume():
+    match_ids = [str(id) for id in range(1250, 1000, -1)]
+
+    def list_ids(start, count, **kwargs):
+        if interrupt and start == 200:
+            raise KeyboardInterrupt()
+
+        return match_ids[start : start + count]
+
+    def load(resume=False):
+        with patch(
+            "lolstats.matches.get_account_puuid", return_value="test-puuid"
+        ), patch(
+            "lolstats.matches.get_list_of_match_ids", side_effect=list_ids
+        ) as mock_ids, patch(
+            "lolstats.lol_http.get_match",
+            side_effect=lambda id, **kwargs: fake_match(id),
+        ) as mock_match:
+            result = load_matches(
+                directory=tmpdir,
+                total_matches=250,
+                route="asia",
+                name="Faker",
+                tag="t1",
+                api_key="testkey",
+                resume=resume,
+            )
+
+            return result, mock_ids, mock_match
+
+    with TemporaryDirectory() as tmpdir:
+        interrupt = True
+
+        with pytest.raises(KeyboardInterrupt):
+            load()
+
+        checkpoint = load_checkpoint(tmpdir, "test-puuid")
+        assert checkpoint["start"] == 200
+        assert checkpoint["newest"] == "1250"
+        assert "endTime" in checkpoint
+
+        with open_match_store(tmpdir) as store:
+            saved = store.ids()
+
+        # Listing continues from the third page, matches played after
+        # the first run are not listed
+        interrupt = False
+        result, mock_ids, mock_match = load(resume=True)
+        assert result == {"total": 50, "new": 50, "failed": 0}
+
+        assert [c.kwargs["start"] for c in mock_ids.call_args_list] == [200]
+        assert mock_ids.call_args.kwargs["end_time"] == checkpoint["endTime"]
+
+        loaded = {c.kwargs["id"] for c in mock_match.call_args_list}
+        assert loaded.isdisjoint(saved)
+
+        with open_match_store(tmpdir) as store:
+            assert store.ids() == set(match_ids)
+
+        assert load_checkpoint(tmpdir, "test-puuid") is None
+
+        with open(os.path.join(tmpdir, "watermarks.json"), "r") as file:
+            assert json.load(file)["test-puuid"]["all"]["matchId"] == "1250"
+
+
+def test_load_matches_after_interrupted_download():
+    match_ids = [str(id) for id in range(1300, 1000, -1)]
+
+    def list_ids(start, count, start_time=None, **kwargs):
+        if interrupt and start == 200:
+            raise KeyboardInterrupt()
+
+        return match_ids[start : start + count]
+
+    def load(resume=False):
+        with patch(
+            "lolstats.matches.get_account_puuid", return_value="test-puuid"
+        ), patch("lolstats.matches.get_list_of_match_ids", side_effect=list_ids), patch(
+            "lolstats.lol_http.get_match",
+            side_effect=lambda id, **kwargs: fake_match(id),
+        ):
+            return load_matches(
+                directory=tmpdir,
+                total_matches=300,
+                route="asia",
+                name="Faker",
+                tag="t1",
+                api_key="testkey",
+                resume=resume,
+            )
+
+    with TemporaryDirectory() as tmpdir:
+        interrupt = True
+
+        with pytest.raises(KeyboardInterrupt):
+            load()
+
+        checkpoint = load_checkpoint(tmpdir, "test-puuid")
+
+        # Run without `resume` stops at the saved first page
+        interrupt = False
+        assert load() == {"total": 100, "new": 0, "failed": 0}
+
+        # Checkpoint is kept and the watermark is not moved
+        assert load_checkpoint(tmpdir, "test-puuid") == checkpoint
+        assert not os.path.exists(os.path.join(tmpdir, "watermarks.json"))
+
+        assert load(resume=True) == {"total": 100, "new": 100, "failed": 0}
+
+        with open_match_store(tmpdir) as store:
+            assert store.ids() == set(match_ids)
+
+        assert load_checkpoint(tmpdir, "test-puuid") is None
+
+        with open(os.path.join(tmpdir, "watermarks.json"), "r") as file:
+            assert json.load(file)["test-puuid"]["all"]["matchId"] == "1300"
+
+
+def test_resolve_puuids():
+    with TemporaryDirectory() as tmpdir, patch(
+        "lolstats.matches.get_account_puuid",
+        side_effect=lambda name, **kwargs: f"puuid-{name.lower()}",
+    ) as mock_puuid:
+        players = [
+            {"name": "Faker", "tag": "T1"},
+            {"puuid": "puuid2"},
+            {"name": "faker", "tag": "t1"},
+            {"name": "Keria", "tag": "T1"},
+        ]
+
+        puuids = resolve_puuids(
+            tmpdir, players, route="sea", api_key="testkey", concurrency=2
+        )
+
+        assert puuids == ["puuid-faker", "puuid2", "puuid-faker", "puuid-keria"]
+
+        # Each Riot ID is requested once from the nearest account cluster
+        assert mock_puuid.call_count == 2
+        assert {c.kwargs["routing"] for c in mock_puuid.call_args_list} == {"asia"}
+
+        # The next run uses the cache
+        mock_puuid.reset_mock()
+        assert resolve_puuids(tmpdir, players, route="sea", api_key="testkey") == puuids
+        assert mock_puuid.call_count == 0
+
+        # Expired PUUIDs are requested again
+        resolve_puuids(tmpdir, players[:1], route="europe", api_key="testkey", ttl=0)
+        mock_puuid.assert_called_once_with(
+            routing="europe", name="Faker", tag="T1", api_key="testkey"
+        )
+
+        with open(os.path.join(tmpdir, "player_names.json"), "r") as file:
+            assert json.load(file)["puuid-keria"] == [{"name": "Keria", "tag": "T1"}]
+
+
+def test_load_matches_timelines():
+    def get_timeline(id, **kwargs):
+        if id == "12":
+            raise HttpError("Not Found", 404)
+
+        return fake_timeline(id, frames=2, participants=2)
+
+    with TemporaryDirectory() as tmpdir, patch(
+        "lolstats.matches.get_account_puuid", return_value="test-puuid"
+    ), patch(
+        "lolstats.matches.get_list_of_match_ids", return_value=["13", "12", "11"]
+    ), patch(
+        "lolstats.lol_http.get_match", side_effect=lambda id, **kwargs: fake_match(id)
+    ), patch(
+        "lolstats.lol_http.get_timeline", side_effect=get_timeline
+    ):
+        result = load_matches(
+            directory=tmpdir,
+            total_matches=3,
+            route="asia",
+            name="Faker",
+            tag="t1",
+            api_key="testkey",
+            concurrency=2,
+            timelines=True,
+        )
+
+        # Match is not saved without its timeline
+        assert result == {"total": 3, "new": 3, "failed": 1}
+
+        with open_match_store(tmpdir) as store:
+            assert store.ids() == {"13", "11"}
+
+        timeline = load_timeline(tmpdir, "13")
+        assert len(timeline["frames"]) == 4
+        assert timeline["participants"] == ["puuid1", "puuid2"]
+        assert sorted(os.listdir(os.path.join(tmpdir, "timelines"))) == [
+            "11.npz",
+            "13.npz",
+        ]
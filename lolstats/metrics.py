@@ -0,0 +1,549 @@
+"""Collect timings of Riot API requests and disk writes made by the loader."""
+
+import bisect
+import json
+import math
+import threading
+import time
+
+# Upper bounds of latency histogram buckets in seconds
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+# Quantiles estimated from the histograms in the summary
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Prefix of the metric names in Prometheus text format
+PROMETHEUS_PREFIX = "lolstats"
+
+
+class Histogram:
+    """
+    Counts observed durations in buckets with fixed upper bounds,
+    like a Prometheus histogram.
+
+    Parameters
+    ----------
+    buckets : sequence of float
+      Sorted upper bounds of the buckets in seconds. Values above the last
+      bound are counted in an extra `+Inf` bucket.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """Count one duration in seconds."""
+
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def cumulative(self):
+        """
+        Return (upper bound, number of durations not above it) pairs,
+        the last bound is `math.inf`.
+        """
+
+        total = 0
+        result = []
+
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            result.append((bound, total))
+
+        return result
+
+    def quantile(self, q):
+        """
+        Return the upper bound of the bucket that contains the `q` quantile,
+        or the largest duration when it is in the `+Inf` bucket.
+        None when nothing was observed.
+        """
+
+        if self.count == 0:
+            return None
+
+        for bound, total in self.cumulative():
+            if total >= q * self.count:
+                return min(bound, self.max)
+
+        return self.max
+
+    def summary(self):
+        """Return number, total, mean, maximum and quantiles of the durations."""
+
+        result = {
+            "count": self.count,
+            "sumSeconds": self.sum,
+            "meanSeconds": self.sum / self.count if self.count else None,
+            "maxSeconds": self.max,
+        }
+
+        for q in QUANTILES:
+            result[f"p{round(q * 100)}Seconds"] = self.quantile(q)
+
+        return result
+
+
+class Metrics:
+    """
+    Thread-safe collector of per-endpoint request latencies, status codes,
+    response sizes, retries, rate limit waits and disk write durations.
+
+    `lolstats.lol_http.send_get_request` records every request into
+    the collector returned by `get_metrics`, and writers wrapped with
+    `timed_writer` record each disk write.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget all recorded values and restart the elapsed time."""
+
+        with self._lock:
+            self.started = time.monotonic()
+            self._endpoints = {}
+            self._writes = {}
+
+    def _endpoint(self, endpoint):
+        return self._endpoints.setdefault(
+            endpoint,
+            {
+                "latency": Histogram(),
+                "statuses": {},
+                "bytes": 0,
+                "retries": 0,
+                "rateLimitWaitSeconds": 0.0,
+                "backoffSeconds": 0.0,
+            },
+        )
+
+    def observe_request(self, endpoint, status, seconds, size=0):
+        """
+        Record a finished request.
+
+        Parameters
+        ----------
+        endpoint : str
+          Riot API method name, see `lolstats.lol_http.endpoint_name`.
+
+        status : int or str
+          HTTP status code, or "error" when no response was received,
+          for example after a connection error or a timeout.
+
+        seconds : float
+          Time from sending the request to receiving the response.
+
+        size : int, optional
+          Number of bytes downloaded.
+        """
+
+        with self._lock:
+            record = self._endpoint(endpoint)
+            record["latency"].observe(seconds)
+            record["statuses"][status] = record["statuses"].get(status, 0) + 1
+            record["bytes"] += size
+
+    def observe_wait(self, endpoint, seconds):
+        """Record seconds a request waited for the rate limits before it was sent."""
+
+        if seconds <= 0:
+            return
+
+        with self._lock:
+            self._endpoint(endpoint)["rateLimitWaitSeconds"] += seconds
+
+    def observe_retry(self, endpoint, backoff=0):
+        """
+        Record a retried request.
+
+        Parameters
+        ----------
+        endpoint : str
+          See `observe_request`.
+
+        backoff : float, optional
+          Seconds slept before the retry, in addition to the rate limit wait.
+        """
+
+        with self._lock:
+            record = self._endpoint(endpoint)
+            record["retries"] += 1
+            record["backoffSeconds"] += backoff
+
+    def observe_backoff(self, endpoint, seconds):
+        """Record seconds a request waited for the routing host to recover from errors."""
+
+        with self._lock:
+            self._endpoint(endpoint)["backoffSeconds"] += seconds
+
+    def observe_write(self, target, seconds, items=1):
+        """
+        Record a disk write.
+
+        Parameters
+        ----------
+        target : str
+          What was written, for example "matches" or "timelines".
+
+        seconds : float
+          Duration of the write.
+
+        items : int, optional
+          Number of items written, for example matches.
+        """
+
+        with self._lock:
+            record = self._writes.setdefault(
+                target, {"latency": Histogram(), "items": 0}
+            )
+
+            record["latency"].observe(seconds)
+            record["items"] += items
+
+    def summary(self):
+        """
+        Return the recorded values, which can be saved as JSON.
+
+        Returns
+        -------
+        dict
+          Totals of all endpoints (number of requests, bytes downloaded,
+          seconds spent in requests, waiting for rate limits, sleeping
+          before retries and writing to disk) in the top level keys,
+          with the values of each endpoint in `endpoints` and of
+          each write target in `writes`.
+        """
+
+        with self._lock:
+            endpoints = {}
+
+            for name, record in sorted(self._endpoints.items()):
+                endpoints[name] = {
+                    "requests": record["latency"].count,
+                    "statuses": {
+                        str(status): count
+                        for status, count in sorted(
+                            record["statuses"].items(), key=lambda item: str(item[0])
+                        )
+                    },
+                    "bytes": record["bytes"],
+                    "retries": record["retries"],
+                    "rateLimitWaitSeconds": record["rateLimitWaitSeconds"],
+                    "backoffSeconds": record["backoffSeconds"],
+                    "latency": record["latency"].summary(),
+                }
+
+            writes = {
+                target: {
+                    "writes": record["latency"].count,
+                    "items": record["items"],
+                    "latency": record["latency"].summary(),
+                }
+                for target, record in sorted(self._writes.items())
+            }
+
+            elapsed = time.monotonic() - self.started
+
+        def total(key):
+            return sum(endpoint[key] for endpoint in endpoints.values())
+
+        return {
+            "elapsedSeconds": elapsed,
+            "requests": total("requests"),
+            "bytes": total("bytes"),
+            "retries": total("retries"),
+            "requestSeconds": sum(
+                endpoint["latency"]["sumSeconds"] for endpoint in endpoints.values()
+            ),
+            "rateLimitWaitSeconds": total("rateLimitWaitSeconds"),
+            "backoffSeconds": total("backoffSeconds"),
+            "writeSeconds": sum(
+                write["latency"]["sumSeconds"] for write in writes.values()
+            ),
+            "endpoints": endpoints,
+            "writes": writes,
+        }
+
+    def prometheus(self):
+        """
+        Return the recorded values in Prometheus text exposition format.
+
+        Returns
+        -------
+        str
+          Text with `lolstats_*` metrics, ending with a newline.
+        """
+
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            writes = sorted(self._writes.items())
+            lines = []
+
+            def metric(name, kind, help_text, samples):
+                name = f"{PROMETHEUS_PREFIX}_{name}"
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+                for suffix, labels, value in samples:
+                    lines.append(
+                        f"{name}{suffix}{format_labels(labels)} {format_value(value)}"
+                    )
+
+            metric(
+                "request_duration_seconds",
+                "histogram",
+                "Riot API request latency.",
+                histogram_samples(
+                    ({"endpoint": name}, record["latency"])
+                    for name, record in endpoints
+                ),
+            )
+
+            metric(
+                "requests_total",
+                "counter",
+                "Riot API responses by status code.",
+                [
+                    ("", {"endpoint": name, "status": status}, count)
+                    for name, record in endpoints
+                    for status, count in sorted(
+                        record["statuses"].items(), key=lambda item: str(item[0])
+                    )
+                ],
+            )
+
+            for key, name, help_text in (
+                ("bytes", "response_bytes_total", "Bytes downloaded from Riot API."),
+                ("retries", "retries_total", "Retried Riot API requests."),
+                (
+                    "rateLimitWaitSeconds",
+                    "rate_limit_wait_seconds_total",
+                    "Seconds requests waited for the rate limits.",
+                ),
+                (
+                    "backoffSeconds",
+                    "backoff_seconds_total",
+                    "Seconds slept before retries and while requests to a host were paused.",
+                ),
+            ):
+                metric(
+                    name,
+                    "counter",
+                    help_text,
+                    [
+                        ("", {"endpoint": endpoint}, record[key])
+                        for endpoint, record in endpoints
+                    ],
+                )
+
+            metric(
+                "write_duration_seconds",
+                "histogram",
+                "Duration of disk writes.",
+                histogram_samples(
+                    ({"target": target}, record["latency"]) for target, record in writes
+                ),
+            )
+
+            metric(
+                "written_items_total",
+                "counter",
+                "Items written to disk.",
+                [
+                    ("", {"target": target}, record["items"])
+                    for target, record in writes
+                ],
+            )
+
+        return "\n".join(lines) + "\n"
+
+
+def histogram_samples(histograms):
+    """
+    Return (suffix, labels, value) samples of Prometheus histograms
+    for (labels, Histogram) pairs.
+    """
+
+    samples = []
+
+    for labels, histogram in histograms:
+        for bound, total in histogram.cumulative():
+            samples.append(("_bucket", {**labels, "le": bound}, total))
+
+        samples.append(("_sum", labels, histogram.sum))
+        samples.append(("_count", labels, histogram.count))
+
+    return samples
+
+
+def format_value(value):
+    """Return number in Prometheus text format."""
+
+    if value == math.inf:
+        return "+Inf"
+
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def format_labels(labels):
+    """Return Prometheus labels, for example `{endpoint="match-v5.getMatch"}`."""
+
+    if not labels:
+        return ""
+
+    items = []
+
+    for name, value in labels.items():
+        value = format_value(value) if name == "le" else str(value)
+
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        items.append(f'{name}="{value}"')
+
+    return "{" + ",".join(items) + "}"
+
+
+def format_summary(summary):
+    """
+    Return human readable description of the summary, showing whether
+    the time was spent in requests, waiting for the rate limits or writing to disk.
+
+    Parameters
+    ----------
+    summary : dict
+      See `Metrics.summary`.
+
+    Returns
+    -------
+    str
+      Multiline text.
+    """
+
+    lines = [
+        f"Elapsed: {summary['elapsedSeconds']:.1f} s",
+        (
+            f"Requests: {summary['requests']}, {summary['bytes'] / 2**20:.1f} MB downloaded,"
+            f" {summary['retries']} retries"
+        ),
+        (
+            f"Time in requests: {summary['requestSeconds']:.1f} s,"
+            f" waiting for rate limits: {summary['rateLimitWaitSeconds']:.1f} s,"
+            f" retry back-off: {summary['backoffSeconds']:.1f} s,"
+            f" writing to disk: {summary['writeSeconds']:.1f} s"
+        ),
+    ]
+
+    def latency(values):
+        if not values["count"]:
+            return "no timings"
+
+        return (
+            f"mean {values['meanSeconds'] * 1000:.0f} ms,"
+            f" p95 {values['p95Seconds'] * 1000:.0f} ms,"
+            f" max {values['maxSeconds'] * 1000:.0f} ms"
+        )
+
+    for name, endpoint in summary["endpoints"].items():
+        statuses = ", ".join(
+            f"{status}: {count}" for status, count in endpoint["statuses"].items()
+        )
+
+        lines.append(
+            f"{name}: {endpoint['requests']} requests ({statuses}),"
+            f" {latency(endpoint['latency'])},"
+            f" {endpoint['rateLimitWaitSeconds']:.1f} s rate limit wait"
+        )
+
+    for target, write in summary["writes"].items():
+        lines.append(
+            f"Write {target}: {write['items']} items in {write['writes']} writes,"
+            f" {latency(write['latency'])}"
+        )
+
+    return "\n".join(lines)
+
+
+def timed_writer(target, write, collector=None):
+    """
+    Wrap a write function so that the duration of each call is recorded.
+
+    Parameters
+    ----------
+    target : str
+      See `Metrics.observe_write`.
+
+    write : callable
+      Function called with a list of items, for example `lolstats.stores.FileMatchStore.save`
+      used by `lolstats.pipeline.BackgroundWriter`.
+
+    collector : Metrics, optional
+      Defaults to the collector returned by `get_metrics`.
+
+    Returns
+    -------
+    callable
+      Function with the same arguments and return value as `write`.
+    """
+
+    def timed(items):
+        start = time.perf_counter()
+        result = write(items)
+        (collector or _metrics).observe_write(
+            target, time.perf_counter() - start, len(items)
+        )
+        return result
+
+    return timed
+
+
+def save_metrics(path, collector=None, format="json"):
+    """
+    Save the recorded values to a file.
+
+    Parameters
+    ----------
+    path : str
+      Path to the file.
+
+    collector : Metrics, optional
+      Defaults to the collector returned by `get_metrics`.
+
+    format : str
+      "json" for `Metrics.summary`, "prometheus" for `Metrics.prometheus`.
+    """
+
+    collector = collector or _metrics
+
+    with open(path, "w", encoding="utf-8") as file:
+        if format == "prometheus":
+            file.write(collector.prometheus())
+        else:
+            json.dump(collector.summary(), file, indent=2)
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    """Return the collector shared by all requests and writers of the process."""
+    return _metrics
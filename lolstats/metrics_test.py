@@ -0,0 +1,191 @@
+import json
+import os
+from tempfile import TemporaryDirectory
+from unittest.mock import patch, Mock
+import pytest
+import requests
+
+from lolstats.metrics import (
+    Histogram,
+    Metrics,
+    format_labels,
+    format_summary,
+    get_metrics,
+    save_metrics,
+    timed_writer,
+)
+from lolstats.lol_http import send_get_request, configure_retries
+from lolstats.retry import RetryPolicy
+from lolstats.errors import HttpError
+
+
+def test_histogram():
+    histogram = Histogram(buckets=(0.1, 1))
+
+    for value in (0.05, 0.05, 0.5, 3):
+        histogram.observe(value)
+
+    assert histogram.cumulative() == [(0.1, 2), (1, 3), (float("inf"), 4)]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1
+    assert histogram.quantile(0.99) == 3
+
+    summary = histogram.summary()
+    assert summary["count"] == 4
+    assert summary["sumSeconds"] == pytest.approx(3.6)
+    assert summary["meanSeconds"] == pytest.approx(0.9)
+    assert summary["maxSeconds"] == 3
+    assert summary["p50Seconds"] == 0.1
+
+
+def test_histogram_empty():
+    assert Histogram().summary()["p95Seconds"] is None
+
+
+def test_metrics_summary():
+    metrics = Metrics()
+    metrics.observe_wait("match-v5.getMatch", 0)
+    metrics.observe_request("match-v5.getMatch", 200, 0.2, size=1000)
+    metrics.observe_request("match-v5.getMatch", 429, 0.1)
+    metrics.observe_retry("match-v5.getMatch", backoff=10)
+    metrics.observe_wait("match-v5.getMatch", 1.5)
+    metrics.observe_request("match-v5.getMatch", "error", 0.3)
+    metrics.observe_write("matches", 0.05, items=2)
+
+    summary = metrics.summary()
+
+    assert summary["requests"] == 3
+    assert summary["bytes"] == 1000
+    assert summary["retries"] == 1
+    assert summary["requestSeconds"] == pytest.approx(0.6)
+    assert summary["rateLimitWaitSeconds"] == 1.5
+    assert summary["backoffSeconds"] == 10
+    assert summary["writeSeconds"] == pytest.approx(0.05)
+
+    endpoint = summary["endpoints"]["match-v5.getMatch"]
+    assert endpoint["statuses"] == {"200": 1, "429": 1, "error": 1}
+    assert endpoint["latency"]["maxSeconds"] == 0.3
+
+    assert summary["writes"]["matches"]["items"] == 2
+    assert summary["writes"]["matches"]["writes"] == 1
+
+    # Can be saved as JSON
+    json.dumps(summary)
+
+    text = format_summary(summary)
+    assert "waiting for rate limits: 1.5 s" in text
+    assert "match-v5.getMatch: 3 requests (200: 1, 429: 1, error: 1)" in text
+    assert "Write matches: 2 items in 1 writes" in text
+
+    metrics.reset()
+    assert metrics.summary()["requests"] == 0
+
+
+def test_metrics_prometheus():
+    metrics = Metrics()
+    metrics.observe_request("match-v5.getMatch", 200, 0.02, size=100)
+    metrics.observe_write("matches", 0.5)
+
+    lines = metrics.prometheus().splitlines()
+
+    assert "# TYPE lolstats_request_duration_seconds histogram" in lines
+
+    assert (
+        'lolstats_request_duration_seconds_bucket{endpoint="match-v5.getMatch",le="0.025"} 1'
+        in lines
+    )
+
+    assert (
+        'lolstats_request_duration_seconds_bucket{endpoint="match-v5.getMatch",le="0.01"} 0'
+        in lines
+    )
+
+    assert (
+        'lolstats_request_duration_seconds_bucket{endpoint="match-v5.getMatch",le="+Inf"} 1'
+        in lines
+    )
+
+    assert (
+        'lolstats_request_duration_seconds_count{endpoint="match-v5.getMatch"} 1'
+        in (lines)
+    )
+
+    assert (
+        'lolstats_requests_total{endpoint="match-v5.getMatch",status="200"} 1' in lines
+    )
+
+    assert 'lolstats_response_bytes_total{endpoint="match-v5.getMatch"} 100' in lines
+    assert 'lolstats_write_duration_seconds_sum{target="matches"} 0.5' in lines
+    assert 'lolstats_written_items_total{target="matches"} 1' in lines
+
+
+def test_format_labels():
+    assert format_labels({}) == ""
+    assert format_labels({"path": 'a"b\\c'}) == '{path="a\\"b\\\\c"}'
+
+
+def test_timed_writer():
+    metrics = Metrics()
+    written = []
+    write = timed_writer("matches", written.extend, collector=metrics)
+
+    write([1, 2])
+    write([3])
+
+    assert written == [1, 2, 3]
+    writes = metrics.summary()["writes"]["matches"]
+    assert writes["writes"] == 2
+    assert writes["items"] == 3
+
+
+def test_save_metrics():
+    metrics = Metrics()
+    metrics.observe_request("match-v5.getMatch", 200, 0.1)
+
+    with TemporaryDirectory() as tmpdir:
+        json_path = os.path.join(tmpdir, "metrics.json")
+        save_metrics(json_path, metrics)
+
+        with open(json_path, "r", encoding="utf-8") as file:
+            assert json.load(file)["requests"] == 1
+
+        text_path = os.path.join(tmpdir, "metrics.prom")
+        save_metrics(text_path, metrics, format="prometheus")
+
+        with open(text_path, "r", encoding="utf-8") as file:
+            assert file.read() == metrics.prometheus()
+
+
+@patch("time.sleep")
+@patch(
+    "requests.Session.get",
+    side_effect=[
+        Mock(status_code=429, headers={}, reason="Too Many Requests"),
+        Mock(
+            status_code=200,
+            headers={"Content-Length": "16"},
+            json=lambda: {"key": "value"},
+        ),
+        requests.ConnectionError("Connection refused"),
+    ],
+)
+def test_send_get_request_records_metrics(mock_get, mock_sleep):
+    metrics = get_metrics()
+    metrics.reset()
+    url = "https://asia.api.riotgames.com/lol/match/v5/matches/id1?api_key=key"
+
+    assert send_get_request(url, retry_delay=3) == {"key": "value"}
+
+    try:
+        configure_retries(policies={"network": RetryPolicy(max_retries=0)})
+
+        with pytest.raises(HttpError):
+            send_get_request(url)
+    finally:
+        configure_retries()
+
+    endpoint = metrics.summary()["endpoints"]["match-v5.getMatch"]
+    assert endpoint["statuses"] == {"200": 1, "429": 1, "error": 1}
+    assert endpoint["bytes"] == 16
+    assert endpoint["retries"] == 1
+    assert endpoint["backoffSeconds"] == 3
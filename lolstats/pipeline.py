@@ -0,0 +1,162 @@
+"""Run stages of the loader in background threads connected by bounded queues."""
+
+import queue
+import threading
+
+_DONE = object()
+
+
+class _Failure:
+    """Exception raised in a background thread, passed to the consumer."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def prefetch(iterable, size):
+    """
+    Iterate over `iterable` in a background thread, keeping up to `size`
+    items ready ahead of the consumer.
+
+    Parameters
+    ----------
+    iterable : iterable
+      Items to produce, for example pages of match IDs requested from Riot API.
+
+    size : int
+      Maximum number of items produced ahead of the consumer.
+
+    Yields
+    ------
+    Items from `iterable` in the same order. Exceptions raised by `iterable`
+    are re-raised in the consumer.
+    """
+
+    items = queue.Queue(maxsize=size)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+
+            put(_DONE)
+        except BaseException as e:  # pylint: disable=broad-exception-caught
+            put(_Failure(e))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = items.get()
+
+            if item is _DONE:
+                return
+
+            if isinstance(item, _Failure):
+                raise item.error
+
+            yield item
+    finally:
+        # Stop the producer when the consumer exits early
+        stopped.set()
+        thread.join()
+
+
+class BackgroundWriter:
+    """
+    Calls `write(item)` in a background thread for each item passed to `put`,
+    for example to save matches to disk while the next matches are loading.
+
+    Use as a context manager: leaving the block waits until all items are
+    written and re-raises the first exception raised by `write`.
+
+    Parameters
+    ----------
+    write : callable
+      Function called with each item.
+
+    size : int
+      Maximum number of items waiting to be written.
+
+    batch_size : int, optional
+      When given, items are lists, and the lists already waiting in the queue
+      are joined into one list of about `batch_size` elements, which is passed
+      to `write` at once. This way, a slow disk writes many matches in one call,
+      for example in one SQLite transaction, while a fast one writes each match
+      as soon as it is loaded.
+    """
+
+    def __init__(self, write, size, batch_size=None):
+        self._write = write
+        self._batch_size = batch_size
+        self._items = queue.Queue(maxsize=size)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._items.put(_DONE)
+        self._thread.join()
+
+        if exc_type is None and self._error is not None:
+            raise self._error
+
+    def put(self, item):
+        """Queue the item for writing, blocks when the queue is full."""
+
+        if self._error is not None:
+            raise self._error
+
+        self._items.put(item)
+
+    def _next_item(self):
+        """Return the next item to write, or _DONE after the last one."""
+
+        item = self._items.get()
+
+        if item is _DONE or self._batch_size is None:
+            return item
+
+        batch = list(item)
+
+        while len(batch) < self._batch_size:
+            try:
+                item = self._items.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is _DONE:
+                # Write the batch, then stop
+                self._items.put(_DONE)
+                break
+
+            batch.extend(item)
+
+        return batch
+
+    def _run(self):
+        while (item := self._next_item()) is not _DONE:
+            if self._error is not None:
+                # Keep draining the queue after an error so `put` does not block
+                continue
+
+            try:
+                self._write(item)
+            except BaseException as e:  # pylint: disable=broad-exception-caught
+                self._error = e
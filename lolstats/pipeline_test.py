@@ -0,0 +1,110 @@
+import threading
+import time
+import pytest
+
+from lolstats.pipeline import prefetch, BackgroundWriter
+from lolstats.errors import HttpError
+
+
+def test_prefetch():
+    assert list(prefetch(iter([1, 2, 3]), size=2)) == [1, 2, 3]
+    assert list(prefetch(iter([]), size=2)) == []
+
+
+def test_prefetch_runs_ahead():
+    produced = []
+
+    def produce():
+        for i in range(5):
+            produced.append(i)
+            yield i
+
+    items = prefetch(produce(), size=2)
+    assert next(items) == 0
+
+    # Producer keeps up to two items ready while the consumer is busy
+    time.sleep(0.1)
+    assert produced == [0, 1, 2, 3]
+
+    assert list(items) == [1, 2, 3, 4]
+
+
+def test_prefetch_error():
+    def produce():
+        yield 1
+        raise HttpError("Internal Server Error", 500)
+
+    items = prefetch(produce(), size=2)
+    assert next(items) == 1
+
+    with pytest.raises(HttpError) as excinfo:
+        next(items)
+
+    assert excinfo.value.status_code == 500
+
+
+def test_prefetch_stops_producer_when_closed():
+    produced = []
+
+    def produce():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    items = prefetch(produce(), size=1)
+    assert next(items) == 0
+    items.close()
+
+    assert len(produced) < 5
+
+
+def test_background_writer():
+    written = []
+    threads = set()
+
+    def write(item):
+        threads.add(threading.current_thread())
+        written.append(item)
+
+    with BackgroundWriter(write, size=2) as writer:
+        for i in range(10):
+            writer.put(i)
+
+    assert written == list(range(10))
+    assert threading.current_thread() not in threads
+
+
+def test_background_writer_error():
+    def write(item):
+        raise OSError("No space left on device")
+
+    with pytest.raises(OSError) as excinfo:
+        with BackgroundWriter(write, size=1) as writer:
+            writer.put(1)
+            time.sleep(0.1)
+            writer.put(2)
+
+    assert str(excinfo.value) == "No space left on device"
+
+
+def test_background_writer_batches_waiting_items():
+    batches = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def write(batch):
+        batches.append(batch)
+        started.set()
+        release.wait()
+
+    with BackgroundWriter(write, size=10, batch_size=4) as writer:
+        writer.put([0])
+        started.wait()
+
+        # Queued while the first batch is being written
+        for i in range(1, 7):
+            writer.put([i])
+
+        release.set()
+
+    assert batches == [[0], [1, 2, 3, 4], [5, 6]]
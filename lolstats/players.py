@@ -0,0 +1,175 @@
+"""Registry of players' Riot IDs saved to `player_names.json`."""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Number of added players kept in memory before they are written to disk
+PLAYER_BATCH_SIZE = 100
+
+# Registries of the data directories, loaded once per process
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+@contextmanager
+def locked_file(path):
+    """
+    Hold an exclusive lock on the file at `path`, waiting while another
+    process holds it. The file is created if it does not exist.
+    """
+
+    with open(path, "a+b") as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        else:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_players_file(path):
+    """Return data of `player_names.json`, empty dictionary if there is no file."""
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "r", encoding="utf-8") as file:
+        try:
+            return json.load(file)
+        except json.JSONDecodeError:
+            return {}
+
+
+class PlayerRegistry:
+    """
+    Names and tags of players for each PUUID, saved to `player_names.json`.
+
+    The file is read once. Added players are kept in memory and written
+    in batches: the file is locked, read again to keep players added by
+    other processes, and replaced atomically.
+
+    Parameters
+    ----------
+    directory : str
+        The directory where data is stored.
+
+    batch_size : int, optional
+        Number of added players that are written to disk together.
+    """
+
+    def __init__(self, directory, batch_size=PLAYER_BATCH_SIZE):
+        self.path = os.path.join(directory, "player_names.json")
+        self._directory = directory
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self._data = read_players_file(self.path)
+        self._pending = []
+        self._index()
+
+    def _index(self):
+        """Build the lookups of saved entries and of Riot IDs."""
+
+        self._entries = set()
+        self._puuids = {}
+
+        for puuid, entries in self._data.items():
+            for entry in entries:
+                self._entries.add((puuid, entry["name"], entry["tag"]))
+
+                # Riot IDs are case-insensitive
+                key = (entry["name"].lower(), entry["tag"].lower())
+                self._puuids.setdefault(key, puuid)
+
+    def add(self, name, tag, puuid):
+        """
+        Add player's name and tag to the registry. Players are written
+        to disk when the batch is full, or by `flush`.
+        """
+
+        with self._lock:
+            if (puuid, name, tag) in self._entries:
+                return
+
+            self._entries.add((puuid, name, tag))
+            self._puuids.setdefault((name.lower(), tag.lower()), puuid)
+            self._data.setdefault(puuid, []).append({"name": name, "tag": tag})
+            self._pending.append((puuid, name, tag))
+            full = len(self._pending) >= self._batch_size
+
+        if full:
+            self.flush()
+
+    def find(self, name, tag):
+        """Return PUUID of the player, None if the player is not in the registry."""
+
+        with self._lock:
+            return self._puuids.get((name.lower(), tag.lower()))
+
+    def flush(self):
+        """Write the added players to disk."""
+
+        with self._lock:
+            if not self._pending:
+                return
+
+            os.makedirs(self._directory, exist_ok=True)
+
+            with locked_file(f"{self.path}.lock"):
+                data = read_players_file(self.path)
+
+                for puuid, name, tag in self._pending:
+                    entry = {"name": name, "tag": tag}
+                    entries = data.setdefault(puuid, [])
+
+                    if entry not in entries:
+                        entries.append(entry)
+
+                temp_path = f"{self.path}.tmp"
+
+                with open(temp_path, "w", encoding="utf-8") as file:
+                    json.dump(data, file, indent=4)
+                    file.flush()
+                    os.fsync(file.fileno())
+
+                os.replace(temp_path, self.path)
+
+            self._pending = []
+            self._data = data
+            self._index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+
+def player_registry(directory):
+    """
+    Return the registry of players in the data directory, shared
+    by all threads of the process.
+    """
+
+    key = os.path.abspath(directory)
+
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = PlayerRegistry(directory)
+
+        return _registries[key]
@@ -0,0 +1,65 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import TemporaryDirectory
+
+from lolstats.players import PlayerRegistry, player_registry
+
+
+def read_players(directory):
+    with open(os.path.join(directory, "player_names.json"), "r") as file:
+        return json.load(file)
+
+
+def test_player_registry_batches():
+    with TemporaryDirectory() as tmpdir:
+        registry = PlayerRegistry(tmpdir, batch_size=3)
+        registry.add("Faker", "T1", "puuid1")
+        registry.add("Faker", "T1", "puuid1")
+        registry.add("Keria", "T1", "puuid2")
+
+        # Batch is not full
+        assert not os.path.exists(registry.path)
+        assert registry.find("faker", "t1") == "puuid1"
+
+        registry.add("Hide on bush", "KR1", "puuid1")
+
+        assert read_players(tmpdir) == {
+            "puuid1": [
+                {"name": "Faker", "tag": "T1"},
+                {"name": "Hide on bush", "tag": "KR1"},
+            ],
+            "puuid2": [{"name": "Keria", "tag": "T1"}],
+        }
+
+        assert not os.path.exists(f"{registry.path}.tmp")
+
+
+def test_player_registry_keeps_players_of_other_writers():
+    with TemporaryDirectory() as tmpdir:
+        registries = [PlayerRegistry(tmpdir, batch_size=10) for _ in range(4)]
+
+        def add_players(number):
+            for i in range(25):
+                registries[number].add(f"Player{number}_{i}", "T1", f"p{number}_{i}")
+
+            registries[number].flush()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(add_players, range(4)))
+
+        assert len(read_players(tmpdir)) == 100
+
+        # Registry loads the file once
+        registry = PlayerRegistry(tmpdir)
+        assert registry.find("player3_24", "t1") == "p3_24"
+
+
+def test_player_registry_is_shared():
+    with TemporaryDirectory() as tmpdir:
+        assert player_registry(tmpdir) is player_registry(os.path.join(tmpdir, "."))
+
+        with player_registry(tmpdir) as registry:
+            registry.add("Faker", "T1", "puuid1")
+
+        assert read_players(tmpdir) == {"puuid1": [{"name": "Faker", "tag": "T1"}]}
@@ -0,0 +1,257 @@
+"""Schedule Riot API requests using the rate limits reported in response headers."""
+
+import bisect
+import threading
+import time
+
+# Seconds added to each rate limit window. Riot API starts a window when it
+# receives the first request, so a request sent exactly one window after the
+# first one can arrive inside the old window because of network jitter
+WINDOW_MARGIN = 0.1
+
+
+def parse_rate_limits(value):
+    """
+    Parse a Riot rate limit header.
+
+    Parameters
+    ----------
+    value : str or None
+      Header value, for example "20:1,100:120" for `X-App-Rate-Limit`
+      (20 requests per 1 second and 100 requests per 120 seconds),
+      or "1:1,1:120" for `X-App-Rate-Limit-Count`.
+
+    Returns
+    -------
+    list of tuple
+      List of (count, window in seconds) pairs. Empty list when the header is missing.
+    """
+
+    if not value:
+        return []
+
+    limits = []
+
+    for item in value.split(","):
+        count, window = item.strip().split(":")
+        limits.append((int(count), int(window)))
+
+    return limits
+
+
+class Bucket:
+    """
+    Sliding window request counter for one set of rate limits, for example
+    the application limits of an API key on a routing host.
+
+    Parameters
+    ----------
+    limits : list of tuple, optional
+      (count, window in seconds) pairs, see `parse_rate_limits`.
+
+    margin : float, optional
+      Seconds added to each window, see WINDOW_MARGIN.
+    """
+
+    def __init__(self, limits=None, margin=WINDOW_MARGIN):
+        self.limits = limits or []
+        self.margin = margin
+        self.blocked_until = 0
+        self._times = []
+
+    def next_time(self, now):
+        """
+        Return the earliest time at or after `now` when a request fits into all limits.
+        """
+
+        result = max(now, self.blocked_until)
+
+        for limit, window in self.limits:
+            window += self.margin
+
+            # Include reservations made for the future, so requests scheduled
+            # ahead of time are counted as well.
+            start = bisect.bisect_right(self._times, now - window)
+            in_window = len(self._times) - start
+
+            if in_window >= limit:
+                oldest = self._times[start + in_window - limit]
+                result = max(result, oldest + window)
+
+        return result
+
+    def reserve(self, at):
+        """Record a request scheduled at time `at`."""
+        bisect.insort(self._times, at)
+
+    def sync(self, counts, now):
+        """
+        Bring local request counts up to the counts reported by the server.
+
+        Parameters
+        ----------
+        counts : list of tuple
+          (count, window) pairs from an `X-...-Rate-Limit-Count` header.
+
+        now : float
+          Current time.
+        """
+
+        for count, window in counts:
+            start = bisect.bisect_right(self._times, now - window)
+            local = bisect.bisect_right(self._times, now) - start
+            missing = count - local
+
+            for _ in range(missing):
+                bisect.insort(self._times, now)
+
+    def prune(self, now):
+        """Forget requests that are older than the longest window."""
+
+        longest = max((window for _, window in self.limits), default=0) + self.margin
+        del self._times[: bisect.bisect_right(self._times, now - longest)]
+
+
+class RateLimiter:
+    """
+    Token bucket style rate limiter for Riot API requests.
+
+    Keeps one bucket of application limits per API key and routing host,
+    and one bucket of method limits per API key, routing host and API method.
+    The limits are learned from `X-App-Rate-Limit` and `X-Method-Rate-Limit`
+    response headers and requests are scheduled so that they do not exceed them.
+
+    Parameters
+    ----------
+    margin : float, optional
+      Seconds added to each rate limit window, see WINDOW_MARGIN.
+    """
+
+    def __init__(self, margin=WINDOW_MARGIN):
+        self.margin = margin
+        self._app_buckets = {}
+        self._method_buckets = {}
+        self._lock = threading.Lock()
+
+        # Total number of seconds requests waited for the rate limits
+        self.waited = 0.0
+
+    def _buckets(self, api_key, host, method):
+        app = self._app_buckets.setdefault((api_key, host), Bucket(margin=self.margin))
+
+        method = self._method_buckets.setdefault(
+            (api_key, host, method), Bucket(margin=self.margin)
+        )
+
+        return app, method
+
+    def schedule(self, api_key, host, method):
+        """
+        Reserve the earliest time slot for a request that does not exceed the rate limits.
+
+        Parameters
+        ----------
+        api_key : str
+          Riot API key.
+
+        host : str
+          Routing hostname, for example `asia.api.riotgames.com`.
+
+        method : str
+          Riot API method name, for example `match-v5.getMatch`.
+
+        Returns
+        -------
+        float
+          Number of seconds to wait before sending the request.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            buckets = self._buckets(api_key, host, method)
+            at = max(bucket.next_time(now) for bucket in buckets)
+
+            for bucket in buckets:
+                bucket.prune(now)
+                bucket.reserve(at)
+
+        return max(at - now, 0)
+
+    def wait(self, api_key, host, method):
+        """
+        Block until the request can be sent without exceeding the rate limits.
+
+        Parameters
+        ----------
+        api_key, host, method : str
+          See `schedule`.
+
+        Returns
+        -------
+        float
+          Number of seconds spent waiting.
+        """
+
+        delay = self.schedule(api_key, host, method)
+
+        if delay > 0:
+            self.sleep(delay)
+
+        return delay
+
+    def sleep(self, seconds):
+        """Sleep for the number of seconds, counting them in `waited`."""
+
+        time.sleep(seconds)
+
+        with self._lock:
+            self.waited += seconds
+
+    def update(self, api_key, host, method, status_code, headers):
+        """
+        Learn rate limits and current counts from the response headers.
+
+        Parameters
+        ----------
+        api_key, host, method : str
+          See `schedule`.
+
+        status_code : int
+          HTTP status code of the response.
+
+        headers : dict
+          Response headers.
+
+        Returns
+        -------
+        float or None
+          Number of seconds from the `Retry-After` header of a 429 response,
+          None if the header is missing.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            app, method = self._buckets(api_key, host, method)
+
+            for bucket, prefix in ((app, "X-App"), (method, "X-Method")):
+                limits = parse_rate_limits(headers.get(f"{prefix}-Rate-Limit"))
+
+                if limits:
+                    bucket.limits = limits
+
+                counts = parse_rate_limits(headers.get(f"{prefix}-Rate-Limit-Count"))
+                bucket.sync(counts, now)
+
+            if status_code != 429 or headers.get("Retry-After") is None:
+                return None
+
+            retry_after = float(headers["Retry-After"])
+
+            if headers.get("X-Rate-Limit-Type") == "application":
+                blocked = app
+            else:
+                # Method and service limits
+                blocked = method
+
+            blocked.blocked_until = max(blocked.blocked_until, now + retry_after)
+            return retry_after
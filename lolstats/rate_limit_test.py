@@ -0,0 +1,140 @@
+import pytest
+from unittest.mock import patch, call
+
+from lolstats.rate_limit import parse_rate_limits, Bucket, RateLimiter
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits("20:1,100:120") == [(20, 1), (100, 120)]
+    assert parse_rate_limits("1:1, 2:120") == [(1, 1), (2, 120)]
+    assert parse_rate_limits(None) == []
+    assert parse_rate_limits("") == []
+
+
+def test_bucket_without_limits():
+    bucket = Bucket()
+
+    for _ in range(100):
+        bucket.reserve(10)
+
+    assert bucket.next_time(10) == 10
+
+
+def test_bucket_next_time():
+    bucket = Bucket([(2, 1), (3, 120)], margin=0)
+
+    bucket.reserve(10)
+    assert bucket.next_time(10) == 10
+
+    bucket.reserve(10)
+    # Third request waits for the 1 second window
+    assert bucket.next_time(10) == 11
+
+    bucket.reserve(11)
+    # Fourth request waits for the 120 second window
+    assert bucket.next_time(11) == 130
+
+
+def test_bucket_blocked_until():
+    bucket = Bucket()
+    bucket.blocked_until = 15
+
+    assert bucket.next_time(10) == 15
+    assert bucket.next_time(20) == 20
+
+
+def test_bucket_sync():
+    bucket = Bucket([(5, 1)], margin=0)
+    bucket.reserve(10)
+
+    bucket.sync([(4, 1)], now=10)
+    # Server saw 4 requests, one more fits into the window
+    assert bucket.next_time(10) == 10
+
+    bucket.reserve(10)
+    assert bucket.next_time(10) == 11
+
+
+def test_bucket_window_margin():
+    bucket = Bucket([(1, 1)], margin=0.1)
+    bucket.reserve(10)
+
+    # The request is not sent right at the window boundary
+    assert bucket.next_time(10) == pytest.approx(11.1)
+    assert bucket.next_time(11) == pytest.approx(11.1)
+    assert bucket.next_time(11.1) == pytest.approx(11.1)
+    assert bucket.next_time(12) == 12
+
+
+def test_bucket_prune():
+    bucket = Bucket([(1, 1)])
+    bucket.reserve(10)
+    bucket.prune(12)
+
+    assert bucket._times == []
+
+
+@patch("time.sleep", return_value=None)
+@patch("time.monotonic", return_value=100)
+def test_rate_limiter_schedules_requests(mock_monotonic, mock_sleep):
+    limiter = RateLimiter(margin=0)
+    headers = {"X-App-Rate-Limit": "2:1", "X-App-Rate-Limit-Count": "1:1"}
+
+    assert limiter.wait("key", "asia", "match-v5.getMatch") == 0
+    limiter.update("key", "asia", "match-v5.getMatch", 200, headers)
+    assert limiter.wait("key", "asia", "match-v5.getMatch") == 0
+    assert limiter.wait("key", "asia", "match-v5.getMatch") == 1
+    # Application limit is shared by all methods
+    assert limiter.wait("key", "asia", "match-v5.getMatchIdsByPUUID") == 1
+    assert limiter.wait("key", "asia", "match-v5.getMatchIdsByPUUID") == 2
+
+    # Other keys and hosts have separate buckets
+    assert limiter.wait("key", "europe", "match-v5.getMatch") == 0
+    assert limiter.wait("key2", "asia", "match-v5.getMatch") == 0
+
+    assert mock_sleep.call_args_list == [call(1), call(1), call(2)]
+
+
+@patch("time.sleep", return_value=None)
+@patch("time.monotonic", return_value=100)
+def test_rate_limiter_method_limits(mock_monotonic, mock_sleep):
+    limiter = RateLimiter(margin=0)
+
+    headers = {
+        "X-App-Rate-Limit": "100:1",
+        "X-App-Rate-Limit-Count": "1:1",
+        "X-Method-Rate-Limit": "1:10",
+        "X-Method-Rate-Limit-Count": "1:10",
+    }
+
+    limiter.wait("key", "asia", "match-v5.getMatch")
+    limiter.update("key", "asia", "match-v5.getMatch", 200, headers)
+
+    assert limiter.wait("key", "asia", "match-v5.getMatchIdsByPUUID") == 0
+    assert limiter.wait("key", "asia", "match-v5.getMatch") == 10
+
+
+@patch("time.sleep", return_value=None)
+@patch("time.monotonic", return_value=100)
+def test_rate_limiter_retry_after(mock_monotonic, mock_sleep):
+    limiter = RateLimiter()
+    limiter.wait("key", "asia", "match-v5.getMatch")
+
+    retry_after = limiter.update(
+        "key",
+        "asia",
+        "match-v5.getMatch",
+        429,
+        {"Retry-After": "7", "X-Rate-Limit-Type": "application"},
+    )
+
+    assert retry_after == 7
+    assert limiter.wait("key", "asia", "account-v1.getByRiotId") == 7
+
+
+@patch("time.monotonic", return_value=100)
+def test_rate_limiter_429_without_retry_after(mock_monotonic):
+    limiter = RateLimiter()
+
+    assert limiter.update("key", "asia", "match-v5.getMatch", 429, {}) is None
+    assert limiter.update("key", "asia", "match-v5.getMatch", 200, {}) is None
@@ -0,0 +1,55 @@
+"""Read a few fields from raw match JSON without parsing the whole match."""
+
+import json
+import re
+from lolstats.errors import MyError
+
+# Match fields read from the raw JSON: used by the SQLite index and for watermarks
+INFO_FIELDS = (
+    "gameCreation",
+    "gameEndTimestamp",
+    "gameVersion",
+    "platformId",
+    "queueId",
+)
+
+# The `metadata` object has no nested objects, so it ends at the first `}`
+_METADATA = re.compile(rb'"metadata"\s*:\s*(\{[^{}]*\})')
+
+_INFO_FIELDS = {
+    name: re.compile(rb'"%s"\s*:\s*("(?:[^"\\]|\\.)*"|-?\d+)' % name.encode())
+    for name in INFO_FIELDS
+}
+
+
+def raw_match_summary(data):
+    """
+    Read match ID, participants and index fields from the match JSON
+    returned by Riot API, without parsing the whole match.
+
+    Parameters
+    ----------
+    data : bytes
+      Match JSON (see https://developer.riotgames.com/apis#match-v5/GET_getMatch).
+
+    Returns
+    -------
+    dict
+      Match data with `metadata` and the `info` fields listed in INFO_FIELDS.
+      Fields missing in the match are not included.
+    """
+
+    metadata = _METADATA.search(data)
+
+    if metadata is None:
+        raise MyError("Match data has no metadata.")
+
+    info = {}
+
+    for name, pattern in _INFO_FIELDS.items():
+        value = pattern.search(data)
+
+        if value is not None:
+            info[name] = json.loads(value.group(1))
+
+    return {"metadata": json.loads(metadata.group(1)), "info": info}
@@ -0,0 +1,47 @@
+import json
+import os
+import pytest
+
+from lolstats.raw import raw_match_summary
+from lolstats.errors import MyError
+
+
+def test_raw_match_summary():
+    with open(os.path.join("docs", "match.json"), "rb") as file:
+        data = file.read()
+
+    match = json.loads(data)
+    summary = raw_match_summary(data)
+
+    assert summary["metadata"] == match["metadata"]
+
+    assert summary["info"] == {
+        "gameCreation": match["info"]["gameCreation"],
+        "gameEndTimestamp": match["info"]["gameEndTimestamp"],
+        "gameVersion": match["info"]["gameVersion"],
+        "platformId": match["info"]["platformId"],
+        "queueId": match["info"]["queueId"],
+    }
+
+    # Compact JSON as returned by Riot API
+    compact = json.dumps(match, separators=(",", ":")).encode("utf-8")
+    assert raw_match_summary(compact) == summary
+
+
+def test_raw_match_summary_missing_fields():
+    summary = raw_match_summary(b'{"metadata": {"matchId": "NA1_1"}, "info": {}}')
+
+    assert summary == {"metadata": {"matchId": "NA1_1"}, "info": {}}
+
+
+def test_raw_match_summary_escaped_string():
+    summary = raw_match_summary(
+        b'{"metadata":{"matchId":"NA1_1"},"info":{"gameVersion":"a\\"b"}}'
+    )
+
+    assert summary["info"]["gameVersion"] == 'a"b'
+
+
+def test_raw_match_summary_no_metadata():
+    with pytest.raises(MyError, match="no metadata"):
+        raw_match_summary(b'{"status": {}}')
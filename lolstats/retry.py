@@ -0,0 +1,244 @@
+"""Retry Riot API requests that failed with transient server or network errors."""
+
+import random
+import threading
+import time
+
+# Server errors that Riot API returns under load, the request is retried
+TRANSIENT_STATUS_CODES = (500, 502, 503, 504)
+
+
+class RetryPolicy:
+    """
+    Capped exponential back-off with full jitter for one class of errors.
+
+    Parameters
+    ----------
+    max_retries : int
+      Number of times a request is retried after the error.
+
+    base_delay : float
+      Upper bound of the delay before the first retry in seconds,
+      doubled for each subsequent retry.
+
+    max_delay : float
+      Largest upper bound of the delay in seconds.
+    """
+
+    def __init__(self, max_retries=5, base_delay=1, max_delay=30):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, retry):
+        """
+        Return a random number of seconds to wait before the retry.
+
+        Parameters
+        ----------
+        retry : int
+          Number of the retry starting from 0.
+
+        Returns
+        -------
+        float
+          Seconds between 0 and `min(max_delay, base_delay * 2**retry)`,
+          so that parallel requests that failed together are not retried together.
+        """
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**retry))
+
+
+# Retry policies for responses with TRANSIENT_STATUS_CODES ("server")
+# and for timeouts and connection errors ("network")
+DEFAULT_POLICIES = {
+    "server": RetryPolicy(max_retries=5, base_delay=1, max_delay=30),
+    "network": RetryPolicy(max_retries=5, base_delay=1, max_delay=30),
+}
+
+
+class RetryBudget:
+    """
+    Total number of seconds all requests can spend waiting before retries.
+
+    Parameters
+    ----------
+    seconds : float or None
+      The budget, None for no limit.
+    """
+
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.spent = 0.0
+        self._lock = threading.Lock()
+
+    def take(self, seconds):
+        """
+        Spend the seconds from the budget.
+
+        Returns
+        -------
+        bool
+          False, without spending anything, when the budget does not have enough seconds left.
+        """
+
+        with self._lock:
+            if self.seconds is not None and self.spent + seconds > self.seconds:
+                return False
+
+            self.spent += seconds
+            return True
+
+
+class CircuitBreaker:
+    """
+    Pauses requests to a routing host after consecutive transient errors,
+    so that a struggling server is not sent more requests that are likely to fail.
+
+    The circuit of a host opens after `threshold` transient errors in a row
+    and stays open for `cooldown` seconds. After that, requests are sent again
+    and a single error opens the circuit again, until a request succeeds.
+
+    Parameters
+    ----------
+    threshold : int
+      Number of consecutive transient errors that open the circuit.
+
+    cooldown : float
+      Seconds the circuit stays open.
+    """
+
+    def __init__(self, threshold=5, cooldown=30):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = {}
+        self._open_until = {}
+        self._lock = threading.Lock()
+
+    def wait_time(self, host):
+        """Return number of seconds until the circuit of the host closes, 0 when it is closed."""
+
+        with self._lock:
+            return max(self._open_until.get(host, 0) - time.monotonic(), 0)
+
+    def record_failure(self, host):
+        """Count a transient error of the host, opening its circuit after `threshold` errors."""
+
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+
+            if failures >= self.threshold:
+                self._open_until[host] = time.monotonic() + self.cooldown
+
+    def record_success(self, host):
+        """Close the circuit of the host after a response without a transient error."""
+
+        with self._lock:
+            self._failures.pop(host, None)
+            self._open_until.pop(host, None)
+
+
+class Retries:
+    """
+    Decides whether and when requests that failed with transient errors are retried.
+
+    Parameters
+    ----------
+    policies : dict, optional
+      Maps error class, "server" or "network", to RetryPolicy.
+      Missing classes use DEFAULT_POLICIES.
+
+    request_budget : float or None
+      Maximum number of seconds from the first attempt of a request
+      to the start of its last retry. None for no limit.
+
+    run_budget : float or None
+      Maximum number of seconds all requests can spend waiting before retries
+      and for open circuits, summed over parallel requests. None for no limit.
+
+    failure_threshold, cooldown
+      See CircuitBreaker.
+    """
+
+    def __init__(
+        self,
+        policies=None,
+        request_budget=120,
+        run_budget=None,
+        failure_threshold=5,
+        cooldown=30,
+    ):
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
+        self.request_budget = request_budget
+        self.budget = RetryBudget(run_budget)
+        self.breaker = CircuitBreaker(threshold=failure_threshold, cooldown=cooldown)
+
+    def _fits(self, elapsed, delay):
+        if self.request_budget is not None and elapsed + delay > self.request_budget:
+            return False
+
+        return self.budget.take(delay)
+
+    def pause(self, host, elapsed):
+        """
+        Return number of seconds to wait before sending a request to the host.
+
+        Parameters
+        ----------
+        host : str
+          Routing hostname.
+
+        elapsed : float
+          Seconds since the first attempt of the request.
+
+        Returns
+        -------
+        float or None
+          Seconds until the circuit of the host closes, 0 when it is closed.
+          None when the wait does not fit into the budgets and the request should fail.
+        """
+
+        wait = self.breaker.wait_time(host)
+
+        if wait <= 0:
+            return 0
+
+        return wait if self._fits(elapsed, wait) else None
+
+    def failure(self, host, error_class, retry, elapsed):
+        """
+        Record a transient error and return number of seconds to wait before retrying.
+
+        Parameters
+        ----------
+        host : str
+          Routing hostname.
+
+        error_class : str
+          "server" or "network", see `policies`.
+
+        retry : int
+          Number of retries of the request made so far.
+
+        elapsed : float
+          Seconds since the first attempt of the request.
+
+        Returns
+        -------
+        float or None
+          Seconds to wait, None when the request should not be retried.
+        """
+
+        self.breaker.record_failure(host)
+        policy = self.policies[error_class]
+
+        if retry >= policy.max_retries:
+            return None
+
+        delay = max(policy.delay(retry), self.breaker.wait_time(host))
+        return delay if self._fits(elapsed, delay) else None
+
+    def success(self, host):
+        """Record a response without a transient error."""
+        self.breaker.record_success(host)
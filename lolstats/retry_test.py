@@ -0,0 +1,93 @@
+from unittest.mock import patch
+
+from lolstats.retry import RetryPolicy, RetryBudget, CircuitBreaker, Retries
+
+
+def test_retry_policy_delay():
+    policy = RetryPolicy(max_retries=5, base_delay=1, max_delay=5)
+
+    with patch("random.uniform", side_effect=lambda low, high: high):
+        assert [policy.delay(retry) for retry in range(5)] == [1, 2, 4, 5, 5]
+
+    for retry in range(5):
+        assert 0 <= policy.delay(retry) <= 5
+
+
+def test_retry_budget():
+    budget = RetryBudget(10)
+
+    assert budget.take(6)
+    assert not budget.take(5)
+    assert budget.take(4)
+    assert budget.spent == 10
+
+    assert RetryBudget().take(1e9)
+
+
+@patch("time.monotonic", return_value=100)
+def test_circuit_breaker(mock_monotonic):
+    breaker = CircuitBreaker(threshold=2, cooldown=30)
+
+    breaker.record_failure("asia")
+    assert breaker.wait_time("asia") == 0
+
+    breaker.record_failure("asia")
+    assert breaker.wait_time("asia") == 30
+    assert breaker.wait_time("europe") == 0
+
+    # One more error after the cooldown opens the circuit again
+    mock_monotonic.return_value = 130
+    assert breaker.wait_time("asia") == 0
+    breaker.record_failure("asia")
+    assert breaker.wait_time("asia") == 30
+
+    breaker.record_success("asia")
+    assert breaker.wait_time("asia") == 0
+    breaker.record_failure("asia")
+    assert breaker.wait_time("asia") == 0
+
+
+@patch("random.uniform", side_effect=lambda low, high: high)
+def test_retries_failure(mock_uniform):
+    retries = Retries(
+        policies={"server": RetryPolicy(max_retries=2, base_delay=1, max_delay=10)},
+        request_budget=60,
+        failure_threshold=100,
+    )
+
+    assert retries.failure("asia", "server", retry=0, elapsed=0) == 1
+    assert retries.failure("asia", "server", retry=1, elapsed=1) == 2
+    assert retries.failure("asia", "server", retry=2, elapsed=3) is None
+
+    # Does not fit into the request budget
+    assert retries.failure("asia", "server", retry=1, elapsed=59) is None
+
+    # Other error classes use the default policy
+    assert retries.failure("asia", "network", retry=4, elapsed=0) == 16
+
+
+@patch("random.uniform", return_value=0.5)
+def test_retries_run_budget(mock_uniform):
+    retries = Retries(run_budget=1, failure_threshold=100)
+
+    assert retries.failure("asia", "server", retry=0, elapsed=0) == 0.5
+    assert retries.failure("europe", "server", retry=0, elapsed=0) == 0.5
+    assert retries.failure("asia", "server", retry=1, elapsed=0) is None
+
+
+@patch("time.monotonic", return_value=100)
+@patch("random.uniform", return_value=0.5)
+def test_retries_pause(mock_uniform, mock_monotonic):
+    retries = Retries(request_budget=60, failure_threshold=2, cooldown=30)
+    assert retries.pause("asia", elapsed=0) == 0
+
+    retries.failure("asia", "server", retry=0, elapsed=0)
+
+    # Waits until the circuit closes
+    assert retries.failure("asia", "server", retry=1, elapsed=0) == 30
+
+    assert retries.pause("asia", elapsed=10) == 30
+    assert retries.pause("asia", elapsed=40) is None
+
+    retries.success("asia")
+    assert retries.pause("asia", elapsed=40) == 0
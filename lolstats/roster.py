@@ -0,0 +1,254 @@
+"""Load matches of many players at once, loading each shared match once."""
+
+import os
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+from lolstats.disk import load_watermark
+from lolstats.stores import open_match_store
+from lolstats.pipeline import BackgroundWriter
+from lolstats.metrics import timed_writer
+from lolstats.matches import (
+    WRITE_BATCH_SIZE,
+    resolve_puuids,
+    list_match_pages,
+    fetch_matches,
+    update_watermark,
+    open_timeline_writer,
+)
+from lolstats.errors import MyError
+
+
+def read_roster(path):
+    """
+    Read the list of players from a roster file.
+
+    Each line of the file contains player's Riot ID (Name#Tag) or PUUID.
+    Empty lines and lines starting with `#` are skipped.
+
+    Parameters
+    ----------
+    path : str
+        Path to the roster file.
+
+    Returns
+    -------
+    list of dict
+        Players in the file order, without duplicates. Each player is
+        a dictionary with `name` and `tag` keys, or with `puuid` key.
+    """
+
+    players = []
+
+    if not os.path.exists(path):
+        raise MyError(f"Roster file '{path}' not found.")
+
+    with open(path, "r", encoding="utf-8") as file:
+        for number, line in enumerate(file, start=1):
+            line = line.strip()
+
+            if not line or line.startswith("#"):
+                continue
+
+            if "#" in line:
+                name, tag = line.rsplit("#", 1)
+
+                if not name or not tag:
+                    raise MyError(
+                        f"Line {number} of roster '{path}': expected Name#Tag or PUUID, got '{line}'."
+                    )
+
+                player = {"name": name, "tag": tag}
+            else:
+                player = {"puuid": line}
+
+            if player not in players:
+                players.append(player)
+
+    return players
+
+
+def player_label(player):
+    """Return player's Riot ID (Name#Tag), or PUUID when the Riot ID is not known."""
+
+    if "name" in player:
+        return f"{player['name']}#{player['tag']}"
+
+    return player["puuid"]
+
+
+def load_roster_matches(
+    directory,
+    players,
+    total_matches,
+    route,
+    api_key,
+    queue=None,
+    concurrency=1,
+    incremental=True,
+    stop_at_saved=True,
+    layout=None,
+    format="json",
+    storage="files",
+    raw=False,
+    timelines=False,
+    store=None,
+):
+    """
+    Load recent matches of multiple players and save them to directory.
+
+    Match IDs of all players are listed in parallel and merged, so a match
+    played by several players is checked and loaded only once. All requests
+    share the same rate limiter and connection pool.
+
+    Parameters
+    ----------
+    directory : str
+        Path to directory where the matches are saved.
+
+    players : list of dict
+        Players, see `read_roster`.
+
+    total_matches : int
+        Maximum number of matches to load for each player, starting from
+        the most recent match.
+
+    route, api_key, queue, concurrency, incremental, stop_at_saved, layout,
+    format, storage, raw, timelines
+        See `lolstats.matches.load_matches`. `concurrency` is also the maximum
+        number of players whose match IDs are listed in parallel.
+
+    store : FileMatchStore or SqliteMatchStore, optional
+        Open match store, used instead of opening one with `storage`,
+        `format` and `layout`. The store is not closed.
+
+    Returns
+    -------
+    dict
+        Dictionary with keys:
+            * `players`: maps player's Riot ID or PUUID (see `player_label`)
+              to a dictionary with `puuid`, `ids` of the listed matches, `total`
+              number of listed matches and `new` number of the player's matches
+              that were not saved before.
+            * `total`: number of unique listed matches.
+            * `new`: number of matches loaded and saved to disk.
+            * `failed`: number of matches that failed to load with HttpError,
+              for example 404 Not Found. The watermarks of their players are
+              not updated, so the next run lists and loads them again.
+    """
+
+    workers = max(1, min(concurrency, len(players)))
+
+    if store is None:
+        opened = open_match_store(
+            directory=directory, storage=storage, format=format, layout=layout
+        )
+    else:
+        # The store is closed by the caller
+        opened = nullcontext(store)
+
+    def list_player(puuid):
+        watermark = None
+
+        if incremental:
+            watermark = load_watermark(directory=directory, puuid=puuid, queue=queue)
+
+        listed = {"newest": None, "complete": watermark is None}
+        match_ids = []
+        new = 0
+
+        pages = list_match_pages(
+            route=route,
+            puuid=puuid,
+            api_key=api_key,
+            total_matches=total_matches,
+            queue=queue,
+            watermark=watermark,
+            listed=listed,
+        )
+
+        for page in pages:
+            unsaved = store.unsaved(page)
+
+            if stop_at_saved and page and not unsaved:
+                # Match IDs are listed newest first, so older pages are saved too
+                listed["complete"] = True
+                break
+
+            match_ids += page
+            new += len(unsaved)
+
+        return {"puuid": puuid, "ids": match_ids, "new": new, "listed": listed}
+
+    with opened as store:
+        puuids = resolve_puuids(
+            directory=directory,
+            players=players,
+            route=route,
+            api_key=api_key,
+            concurrency=concurrency,
+        )
+
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                listings = list(executor.map(list_player, puuids))
+        else:
+            listings = [list_player(puuid) for puuid in puuids]
+
+        # Match IDs of all players without duplicates, in the listed order
+        unique_ids = list(dict.fromkeys(id for item in listings for id in item["ids"]))
+        new_ids = store.unsaved(unique_ids)
+        newest_ids = {item["listed"]["newest"] for item in listings}
+        save = timed_writer("matches", store.save_raw if raw else store.save)
+        failed = []
+
+        with tqdm(total=len(new_ids), desc="Loading matches") as progress:
+            with BackgroundWriter(
+                save, size=WRITE_BATCH_SIZE, batch_size=WRITE_BATCH_SIZE
+            ) as writer, open_timeline_writer(directory, timelines) as timelines_writer:
+                kept = fetch_matches(
+                    route=route,
+                    ids=new_ids,
+                    api_key=api_key,
+                    writer=writer,
+                    concurrency=concurrency,
+                    raw=raw,
+                    keep=newest_ids,
+                    progress=progress,
+                    failed=failed,
+                    timeline_writer=timelines_writer,
+                )
+
+        failed_ids = set(failed)
+
+        for item in listings:
+            listed = item["listed"]
+
+            if failed_ids.intersection(item["ids"]):
+                # Keep the old watermark, so the failed matches are listed again
+                continue
+
+            if listed["complete"] and listed["newest"] is not None:
+                update_watermark(
+                    directory=directory,
+                    store=store,
+                    puuid=item["puuid"],
+                    queue=queue,
+                    match_id=listed["newest"],
+                    match=kept.get(listed["newest"]),
+                )
+
+    return {
+        "players": {
+            player_label(player): {
+                "puuid": item["puuid"],
+                "ids": item["ids"],
+                "total": len(item["ids"]),
+                "new": item["new"],
+            }
+            for player, item in zip(players, listings)
+        },
+        "total": len(unique_ids),
+        "new": len(new_ids) - len(failed),
+        "failed": len(failed),
+    }
@@ -0,0 +1,176 @@
+import os
+import json
+import pytest
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from lolstats.roster import read_roster, player_label, load_roster_matches
+from lolstats.errors import MyError, HttpError
+
+
+def test_read_roster():
+    with TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "roster.txt")
+
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(
+                "# Team\nFaker#T1\n\n  some-puuid  \nFaker#T1\nHide on bush#KR1\n"
+            )
+
+        assert read_roster(path) == [
+            {"name": "Faker", "tag": "T1"},
+            {"puuid": "some-puuid"},
+            {"name": "Hide on bush", "tag": "KR1"},
+        ]
+
+
+def test_read_roster_invalid_line():
+    with TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "roster.txt")
+
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("Faker#\n")
+
+        with pytest.raises(MyError, match="Line 1"):
+            read_roster(path)
+
+
+def test_player_label():
+    assert player_label({"name": "Faker", "tag": "T1"}) == "Faker#T1"
+    assert player_label({"puuid": "some-puuid"}) == "some-puuid"
+
+
+def fake_match(id):
+    return {"metadata": {"matchId": id}, "info": {"gameEndTimestamp": int(id) * 1000}}
+
+
+def load_fake_roster(tmpdir, player_matches, concurrency=1):
+    """Run load_roster_matches for players whose matches are `player_matches`."""
+
+    def list_ids(puuid, start, count, **kwargs):
+        return player_matches[puuid][start : start + count]
+
+    players = [{"name": "Player1", "tag": "T1"}] + [
+        {"puuid": puuid} for puuid in player_matches if puuid != "puuid1"
+    ]
+
+    with patch("lolstats.matches.get_account_puuid", return_value="puuid1"), patch(
+        "lolstats.matches.get_list_of_match_ids", side_effect=list_ids
+    ), patch(
+        "lolstats.lol_http.get_match", side_effect=lambda id, **kwargs: fake_match(id)
+    ) as mock_match:
+        result = load_roster_matches(
+            directory=tmpdir,
+            players=players,
+            total_matches=10,
+            route="asia",
+            api_key="testkey",
+            concurrency=concurrency,
+        )
+
+        return result, mock_match
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_load_roster_matches(concurrency):
+    with TemporaryDirectory() as tmpdir:
+        result, mock_match = load_fake_roster(
+            tmpdir,
+            {
+                "puuid1": ["13", "12", "11"],
+                "puuid2": ["14", "13", "12"],
+                "puuid3": ["13"],
+            },
+            concurrency=concurrency,
+        )
+
+        assert result == {
+            "players": {
+                "Player1#T1": {
+                    "puuid": "puuid1",
+                    "ids": ["13", "12", "11"],
+                    "total": 3,
+                    "new": 3,
+                },
+                "puuid2": {
+                    "puuid": "puuid2",
+                    "ids": ["14", "13", "12"],
+                    "total": 3,
+                    "new": 3,
+                },
+                "puuid3": {"puuid": "puuid3", "ids": ["13"], "total": 1, "new": 1},
+            },
+            "total": 4,
+            "new": 4,
+            "failed": 0,
+        }
+
+        # Each match is loaded once
+        assert sorted(c.kwargs["id"] for c in mock_match.call_args_list) == [
+            "11",
+            "12",
+            "13",
+            "14",
+        ]
+
+        with open(os.path.join(tmpdir, "player_names.json"), "r") as file:
+            assert json.load(file) == {"puuid1": [{"name": "Player1", "tag": "T1"}]}
+
+        with open(os.path.join(tmpdir, "watermarks.json"), "r") as file:
+            watermarks = json.load(file)
+
+        assert watermarks["puuid1"]["all"]["matchId"] == "13"
+        assert watermarks["puuid2"]["all"]["matchId"] == "14"
+        assert watermarks["puuid3"]["all"]["matchId"] == "13"
+
+        # Next run only lists new matches
+        result, mock_match = load_fake_roster(
+            tmpdir,
+            {
+                "puuid1": ["15", "13", "12", "11"],
+                "puuid2": ["15", "14", "13", "12"],
+                "puuid3": ["13"],
+            },
+        )
+
+        assert result["players"]["Player1#T1"]["ids"] == ["15"]
+        assert result["players"]["Player1#T1"]["new"] == 1
+        assert result["players"]["puuid3"]["total"] == 0
+        assert result["total"] == 1
+        assert result["new"] == 1
+        assert mock_match.call_count == 1
+
+
+def test_load_roster_matches_failed():
+    def get_match(id, **kwargs):
+        if id == "12":
+            raise HttpError("404 Not Found", 404)
+
+        return fake_match(id)
+
+    with TemporaryDirectory() as tmpdir:
+        with patch("lolstats.matches.get_account_puuid", return_value="puuid1"), patch(
+            "lolstats.matches.get_list_of_match_ids",
+            side_effect=lambda puuid, start, count, **kwargs: {
+                "puuid1": ["13", "12"],
+                "puuid2": ["14"],
+            }[puuid][start : start + count],
+        ), patch("lolstats.lol_http.get_match", side_effect=get_match):
+            result = load_roster_matches(
+                directory=tmpdir,
+                players=[{"name": "Player1", "tag": "T1"}, {"puuid": "puuid2"}],
+                total_matches=10,
+                route="asia",
+                api_key="testkey",
+            )
+
+        assert result["total"] == 3
+        assert result["new"] == 2
+        assert result["failed"] == 1
+
+        with open(os.path.join(tmpdir, "watermarks.json"), "r") as file:
+            watermarks = json.load(file)
+
+        # Failed match of the player is listed again by the next run
+        assert "puuid1" not in watermarks
+        assert watermarks["puuid2"]["all"]["matchId"] == "14"
@@ -0,0 +1,171 @@
+"""Pooled keep-alive HTTP sessions for Riot API hosts."""
+
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+class CountingAdapter(HTTPAdapter):
+    """
+    HTTP adapter that counts requests sent and new connections opened,
+    which tells how often an open keep-alive connection was reused.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.requests = 0
+        self.connections = 0
+        self._count_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        count_connection = self._count_connection
+
+        class CountingHTTPConnection(HTTPConnection):
+            def connect(self):
+                super().connect()
+                count_connection()
+
+        class CountingHTTPSConnection(HTTPSConnection):
+            def connect(self):
+                super().connect()
+                count_connection()
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = CountingHTTPConnection
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = CountingHTTPSConnection
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, *args, **kwargs):
+        with self._count_lock:
+            self.requests += 1
+
+        return super().send(request, *args, **kwargs)
+
+    def _count_connection(self):
+        with self._count_lock:
+            self.connections += 1
+
+
+class SessionPool:
+    """
+    Keeps one `requests.Session` per routing host (e.g. `asia.api.riotgames.com`),
+    so that TCP and TLS connections are reused between requests instead of
+    being opened for every match.
+
+    Parameters
+    ----------
+    pool_size : int
+      Maximum number of connections kept open to each host.
+
+    keep_alive : bool
+      When False, connections are closed after each response.
+    """
+
+    def __init__(self, pool_size=10, keep_alive=True):
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session(self, host):
+        """
+        Return the session for the host, creating it on first use.
+
+        Parameters
+        ----------
+        host : str
+          Hostname, for example `americas.api.riotgames.com`.
+
+        Returns
+        -------
+        requests.Session
+        """
+
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+
+                adapter = CountingAdapter(
+                    pool_connections=1, pool_maxsize=self.pool_size, max_retries=0
+                )
+
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+
+                if not self.keep_alive:
+                    session.headers["Connection"] = "close"
+
+                self._sessions[host] = session
+
+            return self._sessions[host]
+
+    def get(self, url, **kwargs):
+        """
+        Send a GET request using the session for the URL's host.
+
+        Parameters
+        ----------
+        url : str
+          Request URL.
+
+        **kwargs
+          Passed to `requests.Session.get`.
+
+        Returns
+        -------
+        requests.Response
+        """
+
+        host = urlsplit(url).netloc
+        return self.session(host).get(url, **kwargs)
+
+    def stats(self):
+        """
+        Return connection usage for each host.
+
+        Returns
+        -------
+        dict
+          Maps host to a dict with keys:
+            * `requests`: number of requests sent.
+            * `connections`: number of connections opened.
+            * `reused`: number of requests that reused an open connection.
+        """
+
+        with self._lock:
+            sessions = dict(self._sessions)
+
+        result = {}
+
+        for host, session in sessions.items():
+            adapter = session.get_adapter("https://")
+            requests_sent = adapter.requests
+            connections = adapter.connections
+
+            result[host] = {
+                "requests": requests_sent,
+                "connections": connections,
+                "reused": requests_sent - connections,
+            }
+
+        return result
+
+    def close(self):
+        """Close all sessions and their open connections."""
+
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions = {}
+
+        for session in sessions:
+            session.close()
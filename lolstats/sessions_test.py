@@ -0,0 +1,106 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch, Mock
+
+from lolstats.sessions import SessionPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_session_is_shared_per_host():
+    pool = SessionPool()
+
+    assert pool.session("asia.api.riotgames.com") is pool.session(
+        "asia.api.riotgames.com"
+    )
+
+    assert pool.session("asia.api.riotgames.com") is not pool.session(
+        "europe.api.riotgames.com"
+    )
+
+
+@patch("requests.Session.get", return_value=Mock(status_code=200))
+def test_get_uses_host_session(mock_get):
+    pool = SessionPool()
+
+    response = pool.get("https://asia.api.riotgames.com/path?a=1", timeout=10)
+
+    assert response.status_code == 200
+    mock_get.assert_called_with("https://asia.api.riotgames.com/path?a=1", timeout=10)
+    assert list(pool.stats().keys()) == ["asia.api.riotgames.com"]
+
+
+def test_pool_size():
+    pool = SessionPool(pool_size=3)
+    adapter = pool.session("asia.api.riotgames.com").get_adapter("https://")
+
+    assert adapter._pool_maxsize == 3
+
+
+def test_keep_alive_disabled():
+    pool = SessionPool(keep_alive=False)
+
+    assert pool.session("asia.api.riotgames.com").headers["Connection"] == "close"
+
+
+def test_stats_report_reused_connections():
+    server = run_server()
+    url = f"http://127.0.0.1:{server.server_port}/"
+
+    try:
+        pool = SessionPool()
+
+        for _ in range(3):
+            assert pool.get(url, timeout=10).status_code == 200
+
+        assert pool.stats() == {
+            f"127.0.0.1:{server.server_port}": {
+                "requests": 3,
+                "connections": 1,
+                "reused": 2,
+            }
+        }
+
+        pool.close()
+        assert pool.stats() == {}
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_stats_without_keep_alive():
+    server = run_server()
+    url = f"http://127.0.0.1:{server.server_port}/"
+
+    try:
+        pool = SessionPool(keep_alive=False)
+
+        for _ in range(3):
+            pool.get(url, timeout=10)
+
+        stats = pool.stats()[f"127.0.0.1:{server.server_port}"]
+        assert stats["requests"] == 3
+        assert stats["reused"] == 0
+        pool.close()
+    finally:
+        server.shutdown()
+        server.server_close()
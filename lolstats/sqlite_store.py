@@ -0,0 +1,285 @@
+"""Store match data in a single SQLite database."""
+
+import json
+import os
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    match_id TEXT PRIMARY KEY,
+    platform_id TEXT,
+    queue_id INTEGER,
+    game_creation INTEGER,
+    game_version TEXT,
+    data TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS matches_queue ON matches (queue_id, game_creation);
+
+CREATE TABLE IF NOT EXISTS participants (
+    puuid TEXT NOT NULL,
+    match_id TEXT NOT NULL REFERENCES matches (match_id),
+    team_id INTEGER,
+    champion_name TEXT,
+    team_position TEXT,
+    win INTEGER,
+    PRIMARY KEY (puuid, match_id)
+) WITHOUT ROWID;
+
+-- Participants of a match, see SqliteMatchStore.participants
+CREATE INDEX IF NOT EXISTS participants_match ON participants (match_id);
+"""
+
+
+class SqliteMatchStore:
+    """
+    Saves matches into an SQLite database in WAL mode.
+
+    The `matches` table keeps the JSON data of each match together with the
+    columns used for lookups: match ID, platform, queue, game creation time
+    and game version. The `participants` table maps player PUUIDs to their matches.
+
+    Parameters
+    ----------
+    path : str
+      Path to the database file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # The connection is shared by the loader threads, access is serialized by the lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def unsaved(self, ids):
+        """
+        Return the list of match IDs for matches that are not saved.
+
+        Parameters
+        ----------
+        ids : list of str
+          List of match IDs.
+
+        Returns
+        -------
+        list of str
+          Match IDs that are not saved, in the same order.
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                """
+                SELECT ids.value FROM json_each(?) AS ids
+                LEFT JOIN matches ON matches.match_id = ids.value
+                WHERE matches.match_id IS NULL
+                ORDER BY ids.key
+                """,
+                (json.dumps(list(ids)),),
+            ).fetchall()
+
+        return [row[0] for row in rows]
+
+    def save(self, matches):
+        """
+        Save matches in one transaction.
+
+        Parameters
+        ----------
+        matches : list of dict
+          List of match data.
+        """
+
+        self._save_rows(
+            [(match, json.dumps(match, separators=(",", ":"))) for match in matches]
+        )
+
+    def save_raw(self, matches):
+        """
+        Save matches as received from Riot API in one transaction,
+        without parsing the whole match.
+
+        Parameters
+        ----------
+        matches : list of tuple
+          List of (summary, data) pairs, where `summary` is match data with
+          the indexed fields (see `lolstats.raw.raw_match_summary`)
+          and `data` is match JSON.
+        """
+
+        self._save_rows([(summary, data.decode("utf-8")) for summary, data in matches])
+
+    def _save_rows(self, matches):
+        """
+        Save matches given as (match data, JSON text) pairs. The indexed columns
+        are read from the match data.
+        """
+
+        match_rows = []
+        participant_rows = []
+
+        for match, text in matches:
+            id = match["metadata"]["matchId"]
+            info = match.get("info", {})
+
+            match_rows.append(
+                (
+                    id,
+                    info.get("platformId"),
+                    info.get("queueId"),
+                    info.get("gameCreation"),
+                    info.get("gameVersion"),
+                    text,
+                )
+            )
+
+            participants = info.get("participants")
+
+            if participants is None:
+                participants = [
+                    {"puuid": puuid}
+                    for puuid in match["metadata"].get("participants", [])
+                ]
+
+            for participant in participants:
+                participant_rows.append(
+                    (
+                        participant["puuid"],
+                        id,
+                        participant.get("teamId"),
+                        participant.get("championName"),
+                        participant.get("teamPosition"),
+                        participant.get("win"),
+                    )
+                )
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?, ?, ?)",
+                match_rows,
+            )
+
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO participants VALUES (?, ?, ?, ?, ?, ?)",
+                participant_rows,
+            )
+
+    def load(self, id):
+        """
+        Load match data.
+
+        Parameters
+        ----------
+        id : str
+          Match ID.
+
+        Returns
+        -------
+        dict
+          Match data.
+
+        Raises
+        ------
+        KeyError
+          If the match is not saved.
+        """
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM matches WHERE match_id = ?", (id,)
+            ).fetchone()
+
+        if row is None:
+            raise KeyError(id)
+
+        return json.loads(row[0])
+
+    def participants(self, id):
+        """
+        Return PUUIDs of the match participants.
+
+        Parameters
+        ----------
+        id : str
+          Match ID.
+
+        Returns
+        -------
+        list of str
+
+        Raises
+        ------
+        KeyError
+          If the match is not saved.
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT puuid FROM participants WHERE match_id = ? ORDER BY puuid",
+                (id,),
+            ).fetchall()
+
+        if not rows:
+            raise KeyError(id)
+
+        return [row[0] for row in rows]
+
+    def ids(self):
+        """Return IDs of all saved matches."""
+
+        with self._lock:
+            rows = self._connection.execute("SELECT match_id FROM matches").fetchall()
+
+        return {row[0] for row in rows}
+
+    def player_match_ids(self, puuid, queue=None):
+        """
+        Return IDs of the saved matches of the player, newest first.
+
+        Parameters
+        ----------
+        puuid : str
+          Player's unique identifier.
+
+        queue : int, optional
+          Game queue type, None for all queues.
+
+        Returns
+        -------
+        list of str
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                """
+                SELECT matches.match_id FROM participants
+                JOIN matches ON matches.match_id = participants.match_id
+                WHERE participants.puuid = ? AND (? IS NULL OR matches.queue_id = ?)
+                ORDER BY matches.game_creation DESC
+                """,
+                (puuid, queue, queue),
+            ).fetchall()
+
+        return [row[0] for row in rows]
+
+    def close(self):
+        """Close the database connection."""
+
+        with self._lock:
+            self._connection.close()
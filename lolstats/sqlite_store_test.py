@@ -0,0 +1,164 @@
+import os
+import json
+import sqlite3
+import threading
+import pytest
+from tempfile import TemporaryDirectory
+
+from lolstats.sqlite_store import SqliteMatchStore
+from lolstats.raw import raw_match_summary
+
+
+def make_match(id, puuids, queue=420, creation=1000):
+    return {
+        "metadata": {"matchId": id, "participants": puuids},
+        "info": {
+            "platformId": id.split("_")[0],
+            "queueId": queue,
+            "gameCreation": creation,
+            "gameVersion": "14.4.1",
+            "participants": [
+                {
+                    "puuid": puuid,
+                    "teamId": 100,
+                    "championName": "Ahri",
+                    "teamPosition": "MIDDLE",
+                    "win": True,
+                }
+                for puuid in puuids
+            ],
+        },
+    }
+
+
+def test_save_and_load():
+    with TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "data", "matches.sqlite")
+
+        with SqliteMatchStore(path) as store:
+            match = make_match("NA1_1", ["p1", "p2"])
+            store.save([match, make_match("NA1_2", ["p1"])])
+
+            assert store.load("NA1_1") == match
+            assert store.ids() == {"NA1_1", "NA1_2"}
+
+            with pytest.raises(KeyError):
+                store.load("NA1_3")
+
+        connection = sqlite3.connect(path)
+
+        assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+        assert connection.execute(
+            "SELECT match_id, platform_id, queue_id, game_creation, game_version FROM matches WHERE match_id = 'NA1_1'"
+        ).fetchone() == ("NA1_1", "NA1", 420, 1000, "14.4.1")
+
+        assert connection.execute(
+            "SELECT * FROM participants WHERE match_id = 'NA1_1' ORDER BY puuid"
+        ).fetchall() == [
+            ("p1", "NA1_1", 100, "Ahri", "MIDDLE", 1),
+            ("p2", "NA1_1", 100, "Ahri", "MIDDLE", 1),
+        ]
+
+        connection.close()
+
+
+def test_unsaved():
+    with TemporaryDirectory() as tmpdir:
+        with SqliteMatchStore(os.path.join(tmpdir, "matches.sqlite")) as store:
+            assert store.unsaved([]) == []
+            store.save([make_match("NA1_2", ["p1"])])
+
+            assert store.unsaved(["NA1_3", "NA1_2", "NA1_1"]) == ["NA1_3", "NA1_1"]
+
+
+def test_save_replaces_match():
+    with TemporaryDirectory() as tmpdir:
+        with SqliteMatchStore(os.path.join(tmpdir, "matches.sqlite")) as store:
+            store.save([make_match("NA1_1", ["p1"], queue=420)])
+            store.save([make_match("NA1_1", ["p1"], queue=440)])
+
+            assert store.load("NA1_1")["info"]["queueId"] == 440
+            assert store.ids() == {"NA1_1"}
+
+
+def test_save_without_info():
+    with TemporaryDirectory() as tmpdir:
+        with SqliteMatchStore(os.path.join(tmpdir, "matches.sqlite")) as store:
+            store.save([{"metadata": {"matchId": "id1", "participants": ["p1"]}}])
+
+            assert store.player_match_ids("p1") == ["id1"]
+
+
+def test_player_match_ids():
+    with TemporaryDirectory() as tmpdir:
+        with SqliteMatchStore(os.path.join(tmpdir, "matches.sqlite")) as store:
+            store.save(
+                [
+                    make_match("NA1_1", ["p1", "p2"], queue=420, creation=1),
+                    make_match("NA1_2", ["p1"], queue=440, creation=2),
+                    make_match("NA1_3", ["p2"], queue=420, creation=3),
+                ]
+            )
+
+            assert store.player_match_ids("p1") == ["NA1_2", "NA1_1"]
+            assert store.player_match_ids("p1", queue=420) == ["NA1_1"]
+            assert store.player_match_ids("p2") == ["NA1_3", "NA1_1"]
+            assert store.player_match_ids("p3") == []
+
+
+def test_save_from_other_thread():
+    with TemporaryDirectory() as tmpdir:
+        with SqliteMatchStore(os.path.join(tmpdir, "matches.sqlite")) as store:
+            thread = threading.Thread(
+                target=store.save, args=([make_match("NA1_1", ["p1"])],)
+            )
+
+            thread.start()
+            thread.join()
+
+            assert store.unsaved(["NA1_1"]) == []
+
+
+def test_save_raw():
+    with TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "matches.sqlite")
+        match = make_match("NA1_1", ["p1", "p2"])
+        data = json.dumps(match).encode("utf-8")
+        summary = raw_match_summary(data)
+
+        with SqliteMatchStore(path) as store:
+            store.save_raw([(summary, data)])
+
+            assert store.load("NA1_1") == match
+            assert store.player_match_ids("p2", queue=420) == ["NA1_1"]
+
+        connection = sqlite3.connect(path)
+
+        assert connection.execute(
+            "SELECT match_id, platform_id, queue_id, game_creation, game_version FROM matches"
+        ).fetchone() == ("NA1_1", "NA1", 420, 1000, "14.4.1")
+
+
+def test_participants_uses_index():
+    with TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "matches.sqlite")
+
+        with SqliteMatchStore(path) as store:
+            store.save([make_match("NA1_1", ["a", "b"])])
+            assert store.participants("NA1_1") == ["a", "b"]
+
+        connection = sqlite3.connect(path)
+
+        try:
+            plan = connection.execute(
+                "EXPLAIN QUERY PLAN"
+                " SELECT puuid FROM participants WHERE match_id = ? ORDER BY puuid",
+                ("NA1_1",),
+            ).fetchall()
+        finally:
+            connection.close()
+
+        details = " ".join(row[-1] for row in plan)
+        assert "USING COVERING INDEX participants_match" in details
+        assert "SCAN" not in details
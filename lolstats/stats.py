@@ -0,0 +1,330 @@
+"""Compute player statistics from saved matches with NumPy."""
+
+import os
+from tempfile import TemporaryDirectory
+import numpy as np
+from lolstats.columnar import export_matches, exported_ids, load_table, concat_columns
+from lolstats.errors import MyError
+
+# Columns of the exported `participants` table used for statistics
+PARTICIPANT_COLUMNS = [
+    "matchId",
+    "puuid",
+    "teamId",
+    "championName",
+    "teamPosition",
+    "win",
+    "kills",
+    "deaths",
+    "assists",
+    "totalMinionsKilled",
+    "neutralMinionsKilled",
+    "totalDamageDealtToChampions",
+    "visionScore",
+    "timePlayed",
+]
+
+# Columns of the exported `matches` table used for statistics
+MATCH_COLUMNS = ["matchId", "gameCreation"]
+
+
+def load_stats_columns(directory, storage="files", export_format=None):
+    """
+    Load the columns needed for statistics from the export directory
+    (see `lolstats.columnar.export_matches`). Saved matches that are not
+    exported yet are exported to a temporary directory, so the data directory
+    is not changed.
+
+    Parameters
+    ----------
+    directory : str
+        Path to the data directory.
+
+    storage : str, optional
+        Storage backend of the matches, see `lolstats.stores.STORAGES`.
+
+    export_format : str, optional
+        Format of the exported tables, see `lolstats.columnar.export_matches`.
+
+    Returns
+    -------
+    dict
+        Maps column name to NumPy array with one value per participant in a match,
+        ordered by game creation time. Includes `gameCreation` column and
+        `teamDamage` column with the team's total damage to champions.
+    """
+
+    output = os.path.join(directory, "export")
+
+    with TemporaryDirectory() as new_output:
+        export_matches(
+            directory=directory,
+            output=new_output,
+            storage=storage,
+            format=export_format,
+            exclude=exported_ids(output),
+        )
+
+        def load(table, columns):
+            return concat_columns(
+                [
+                    load_table(path, table, columns=columns)
+                    for path in (output, new_output)
+                ]
+            )
+
+        participants = load("participants", PARTICIPANT_COLUMNS)
+        matches = load("matches", MATCH_COLUMNS)
+
+    if not participants:
+        return {}
+
+    missing = [name for name in PARTICIPANT_COLUMNS if name not in participants]
+
+    if missing:
+        raise MyError(f"Saved matches have no {', '.join(missing)} data.")
+
+    # Join the game creation time from the matches table
+    order = np.argsort(matches["matchId"])
+    match_ids = matches["matchId"][order]
+    position = np.searchsorted(match_ids, participants["matchId"])
+    creation = matches.get("gameCreation", np.zeros(len(order)))
+    participants["gameCreation"] = creation[order][position]
+
+    participants["teamDamage"] = team_totals(
+        participants["matchId"],
+        participants["teamId"],
+        participants["totalDamageDealtToChampions"].astype(np.float64),
+    )
+
+    order = np.argsort(participants["gameCreation"], kind="stable")
+    return {name: array[order] for name, array in participants.items()}
+
+
+def safe_divide(numerator, denominator):
+    """Divide arrays, returns 0 where the denominator is 0."""
+
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    result = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=result, where=denominator != 0)
+    return result
+
+
+def team_totals(match_ids, team_ids, values):
+    """
+    Return the sum of the values over the player's team in the game, for each row.
+
+    Parameters
+    ----------
+    match_ids, team_ids : numpy.ndarray
+        Match ID and team ID of each row.
+
+    values : numpy.ndarray
+        Values to add up, for example damage to champions.
+
+    Returns
+    -------
+    numpy.ndarray
+        Team total for each row.
+    """
+
+    _, game = np.unique(match_ids, return_inverse=True)
+    _, team = np.unique(team_ids, return_inverse=True)
+    teams = game * (team.max() + 1) + team
+    return np.bincount(teams, weights=values)[teams]
+
+
+def summarize(games):
+    """
+    Compute aggregate statistics for games.
+
+    Parameters
+    ----------
+    games : dict
+        Maps name to NumPy array with one value per game: `win`, `kills`, `deaths`,
+        `assists`, `cs`, `minutes`, `damage_share` and `visionScore`.
+
+    Returns
+    -------
+    dict
+        Statistics: number of `games`, `wins`, `win_rate`, `kda`, `cs_per_min`,
+        `damage_share` and `vision_per_min`.
+    """
+
+    minutes = games["minutes"].sum()
+    takedowns = games["kills"].sum() + games["assists"].sum()
+
+    return {
+        "games": len(games["win"]),
+        "wins": int(games["win"].sum()),
+        "win_rate": float(safe_divide(games["win"].sum(), len(games["win"]))),
+        "kda": float(takedowns / max(games["deaths"].sum(), 1)),
+        "cs_per_min": float(safe_divide(games["cs"].sum(), minutes)),
+        "damage_share": (
+            float(games["damage_share"].mean()) if len(games["win"]) else 0.0
+        ),
+        "vision_per_min": float(safe_divide(games["visionScore"].sum(), minutes)),
+    }
+
+
+def breakdown(games, keys):
+    """
+    Compute statistics for each group of games with the same key.
+
+    Parameters
+    ----------
+    games : dict
+        Values for each game, see `summarize`.
+
+    keys : numpy.ndarray
+        Group key of each game, for example champion name.
+
+    Returns
+    -------
+    dict
+        Maps key to statistics, see `summarize`, sorted by the number of games.
+    """
+
+    names, group = np.unique(keys, return_inverse=True)
+    count = np.bincount(group, minlength=len(names))
+
+    def total(values):
+        return np.bincount(group, weights=values, minlength=len(names))
+
+    minutes = total(games["minutes"])
+    wins = total(games["win"])
+    takedowns = total(games["kills"]) + total(games["assists"])
+
+    stats = {
+        "games": count,
+        "wins": wins,
+        "win_rate": safe_divide(wins, count),
+        "kda": takedowns / np.maximum(total(games["deaths"]), 1),
+        "cs_per_min": safe_divide(total(games["cs"]), minutes),
+        "damage_share": safe_divide(total(games["damage_share"]), count),
+        "vision_per_min": safe_divide(total(games["visionScore"]), minutes),
+    }
+
+    result = {}
+
+    for i in np.argsort(-count, kind="stable"):
+        result[str(names[i])] = {
+            name: int(values[i]) if name in ("games", "wins") else float(values[i])
+            for name, values in stats.items()
+        }
+
+    return result
+
+
+def rolling_win_rate(wins, window):
+    """
+    Return the win rate over the last `window` games after each game.
+
+    Parameters
+    ----------
+    wins : numpy.ndarray
+        Game results in the order they were played, True for a win.
+
+    window : int
+        Number of games.
+
+    Returns
+    -------
+    numpy.ndarray
+        Win rate after each game.
+    """
+
+    total = np.concatenate(([0], np.cumsum(wins, dtype=np.float64)))
+    end = np.arange(1, len(wins) + 1)
+    start = np.maximum(end - window, 0)
+    return (total[end] - total[start]) / (end - start)
+
+
+def player_stats(columns, puuid, last=20):
+    """
+    Compute player statistics.
+
+    Parameters
+    ----------
+    columns : dict
+        Participant columns, see `load_stats_columns`.
+
+    puuid : str
+        Player's unique identifier.
+
+    last : int, optional
+        Number of recent games used for the recent form.
+
+    Returns
+    -------
+    dict
+        Dictionary with keys:
+            * `overall`: statistics for all player's games, see `summarize`.
+            * `champions`: statistics for each champion, see `breakdown`.
+            * `roles`: statistics for each role (team position).
+            * `recent`: statistics for the last `last` games.
+            * `form`: win rate over the last `last` games after each game.
+    """
+
+    if not columns:
+        raise MyError("No saved matches found.")
+
+    rows = np.flatnonzero(columns["puuid"] == puuid)
+
+    if len(rows) == 0:
+        raise MyError(f"No saved matches found for player '{puuid}'.")
+
+    games = {
+        "win": columns["win"][rows].astype(np.float64),
+        "kills": columns["kills"][rows].astype(np.float64),
+        "deaths": columns["deaths"][rows].astype(np.float64),
+        "assists": columns["assists"][rows].astype(np.float64),
+        "cs": (
+            columns["totalMinionsKilled"][rows] + columns["neutralMinionsKilled"][rows]
+        ).astype(np.float64),
+        "minutes": columns["timePlayed"][rows] / 60,
+        "damage_share": safe_divide(
+            columns["totalDamageDealtToChampions"][rows], columns["teamDamage"][rows]
+        ),
+        "visionScore": columns["visionScore"][rows].astype(np.float64),
+    }
+
+    recent = {name: values[-last:] for name, values in games.items()}
+    roles = columns["teamPosition"][rows]
+
+    return {
+        "overall": summarize(games),
+        "champions": breakdown(games, columns["championName"][rows]),
+        "roles": breakdown(games, np.where(roles == "", "UNKNOWN", roles)),
+        "recent": summarize(recent),
+        "form": rolling_win_rate(games["win"], last),
+    }
+
+
+def get_player_stats(directory, puuid, storage="files", last=20):
+    """
+    Compute player statistics from the matches saved in the data directory.
+
+    Parameters
+    ----------
+    directory : str
+        Path to the data directory.
+
+    puuid : str
+        Player's unique identifier.
+
+    storage : str, optional
+        Storage backend of the matches, see `lolstats.stores.STORAGES`.
+
+    last : int, optional
+        Number of recent games used for the recent form.
+
+    Returns
+    -------
+    dict
+        Player statistics, see `player_stats`.
+    """
+
+    columns = load_stats_columns(directory=directory, storage=storage)
+    return player_stats(columns=columns, puuid=puuid, last=last)
@@ -0,0 +1,136 @@
+import json
+import os
+import numpy as np
+import pytest
+from tempfile import TemporaryDirectory
+
+from lolstats.stats import (
+    load_stats_columns,
+    player_stats,
+    get_player_stats,
+    rolling_win_rate,
+    team_totals,
+    breakdown,
+)
+from lolstats.stores import open_match_store
+from lolstats.columnar import export_matches, exported_ids
+from lolstats.errors import MyError
+
+
+def example_match(id, game_creation, win):
+    with open(os.path.join("docs", "match.json"), "r", encoding="utf-8") as file:
+        match = json.load(file)
+
+    match["metadata"]["matchId"] = id
+    match["info"]["gameCreation"] = game_creation
+    match["info"]["participants"][0]["win"] = win
+    return match
+
+
+def test_rolling_win_rate():
+    result = rolling_win_rate(np.array([1, 0, 1, 1]), window=2)
+
+    assert result.tolist() == [1, 0.5, 0.5, 1]
+
+
+def test_team_totals():
+    result = team_totals(
+        np.array(["A", "A", "A", "B", "B"]),
+        np.array([100, 100, 200, 100, 100]),
+        np.array([1.0, 2.0, 4.0, 8.0, 16.0]),
+    )
+
+    assert result.tolist() == [3, 3, 4, 24, 24]
+
+
+def test_breakdown():
+    games = {
+        "win": np.array([1.0, 0.0, 1.0]),
+        "kills": np.array([2.0, 0.0, 4.0]),
+        "deaths": np.array([1.0, 0.0, 1.0]),
+        "assists": np.array([0.0, 0.0, 2.0]),
+        "cs": np.array([10.0, 20.0, 30.0]),
+        "minutes": np.array([10.0, 10.0, 10.0]),
+        "damage_share": np.array([0.1, 0.2, 0.3]),
+        "visionScore": np.array([5.0, 10.0, 15.0]),
+    }
+
+    result = breakdown(games, np.array(["Ahri", "Zed", "Ahri"]))
+
+    assert list(result) == ["Ahri", "Zed"]
+    assert result["Ahri"]["games"] == 2
+    assert result["Ahri"]["win_rate"] == 1
+    assert result["Ahri"]["kda"] == 4
+    assert result["Ahri"]["cs_per_min"] == 2
+    assert result["Ahri"]["damage_share"] == pytest.approx(0.2)
+    assert result["Zed"]["kda"] == 0
+
+
+def test_player_stats():
+    with TemporaryDirectory() as tmpdir:
+        with open_match_store(tmpdir) as store:
+            store.save(
+                [
+                    example_match("OC1_1", game_creation=3, win=True),
+                    example_match("OC1_2", game_creation=1, win=False),
+                    example_match("OC1_3", game_creation=2, win=True),
+                ]
+            )
+
+        columns = load_stats_columns(tmpdir, export_format="npz")
+        assert columns["gameCreation"].tolist() == [1] * 10 + [2] * 10 + [3] * 10
+
+        puuid = columns["puuid"][0]
+        stats = player_stats(columns, puuid=puuid, last=2)
+
+        assert stats["overall"]["games"] == 3
+        assert stats["overall"]["wins"] == 2
+        assert stats["overall"]["win_rate"] == pytest.approx(2 / 3)
+        assert stats["overall"]["kda"] > 0
+        assert stats["overall"]["cs_per_min"] > 0
+        assert 0 < stats["overall"]["damage_share"] < 1
+        assert stats["overall"]["vision_per_min"] > 0
+
+        assert stats["recent"]["games"] == 2
+        assert stats["recent"]["win_rate"] == 1
+        assert stats["form"].tolist() == [0, 0.5, 1]
+        assert list(stats["champions"]) == ["Akali"]
+        assert stats["champions"]["Akali"]["games"] == 3
+        assert list(stats["roles"]) == [columns["teamPosition"][0]]
+
+        assert get_player_stats(tmpdir, puuid=puuid)["overall"]["games"] == 3
+
+
+def test_player_stats_unknown_player():
+    with TemporaryDirectory() as tmpdir:
+        with pytest.raises(MyError, match="No saved matches found"):
+            get_player_stats(tmpdir, puuid="unknown")
+
+        with open_match_store(tmpdir) as store:
+            store.save([example_match("OC1_1", game_creation=1, win=True)])
+
+        with pytest.raises(MyError, match="No saved matches found for player"):
+            get_player_stats(tmpdir, puuid="unknown")
+
+
+def test_load_stats_columns_reuses_export():
+    with TemporaryDirectory() as tmpdir:
+        with open_match_store(tmpdir) as store:
+            store.save([example_match("OC1_1", game_creation=1, win=True)])
+
+        export_matches(tmpdir, format="npz")
+        exported = sorted(os.listdir(os.path.join(tmpdir, "export", "participants")))
+
+        with open_match_store(tmpdir) as store:
+            store.save([example_match("OC1_2", game_creation=2, win=False)])
+
+        columns = load_stats_columns(tmpdir, export_format="npz")
+        assert columns["gameCreation"].tolist() == [1] * 10 + [2] * 10
+
+        # New match is not added to the export directory
+        assert exported_ids(os.path.join(tmpdir, "export")) == {"OC1_1"}
+
+        assert (
+            sorted(os.listdir(os.path.join(tmpdir, "export", "participants")))
+            == exported
+        )
@@ -0,0 +1,119 @@
+"""Storage backends for match data."""
+
+import os
+from lolstats.disk import (
+    unsaved_matches,
+    save_matches,
+    save_raw_matches,
+    load_match,
+    load_match_participants,
+    load_match_index,
+    save_match_index,
+    use_match_layout,
+)
+from lolstats.errors import MyError
+from lolstats.sqlite_store import SqliteMatchStore
+
+# Storage backends:
+#   * `files`: one file per match in `{directory}/matches`, see lolstats.disk.
+#   * `sqlite`: SQLite database `{directory}/matches.sqlite`, see lolstats.sqlite_store.
+STORAGES = ("files", "sqlite")
+
+
+class FileMatchStore:
+    """
+    Saves matches as files in a directory, one file per match.
+
+    Parameters
+    ----------
+    directory : str
+      Directory where the matches are stored.
+
+    format : str, optional
+      Storage format, see `lolstats.disk.FORMATS`.
+
+    layout : str, optional
+      Layout of the directory, see `lolstats.disk.LAYOUTS`.
+      By default, the current layout of the directory is used.
+    """
+
+    def __init__(self, directory, format="json", layout=None):
+        self.directory = directory
+        self.format = format
+
+        if layout is not None:
+            use_match_layout(directory=directory, layout=layout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def unsaved(self, ids):
+        """Return the list of match IDs for matches that are not saved."""
+        return unsaved_matches(directory=self.directory, ids=ids)
+
+    def save(self, matches):
+        """Save matches."""
+        save_matches(directory=self.directory, matches=matches, format=self.format)
+
+    def save_raw(self, matches):
+        """Save matches as received from Riot API, see `lolstats.disk.save_raw_matches`."""
+
+        save_raw_matches(directory=self.directory, matches=matches, format=self.format)
+
+    def load(self, id):
+        """Load match data, raises KeyError if the match is not saved."""
+
+        try:
+            return load_match(directory=self.directory, id=id)
+        except FileNotFoundError as e:
+            raise KeyError(id) from e
+
+    def participants(self, id):
+        """Return PUUIDs of the match participants, raises KeyError if the match is not saved."""
+
+        try:
+            return load_match_participants(directory=self.directory, id=id)
+        except FileNotFoundError as e:
+            raise KeyError(id) from e
+
+    def ids(self):
+        """Return IDs of all saved matches."""
+        return set(load_match_index(self.directory))
+
+    def close(self):
+        """Write the manifest of saved match IDs."""
+        save_match_index(directory=self.directory)
+
+
+def open_match_store(directory, storage="files", format="json", layout=None):
+    """
+    Open the storage backend for matches.
+
+    Parameters
+    ----------
+    directory : str
+        Path to the data directory.
+
+    storage : str, optional
+        Storage backend, see STORAGES.
+
+    format, layout : str, optional
+        Format and layout of match files, used by `files` storage.
+
+    Returns
+    -------
+    FileMatchStore or SqliteMatchStore
+    """
+
+    if storage == "files":
+        return FileMatchStore(
+            directory=os.path.join(directory, "matches"), format=format, layout=layout
+        )
+
+    if storage == "sqlite":
+        return SqliteMatchStore(path=os.path.join(directory, "matches.sqlite"))
+
+    raise MyError(f"Unknown storage '{storage}', use one of: {', '.join(STORAGES)}.")
@@ -0,0 +1,54 @@
+import os
+import pytest
+from tempfile import TemporaryDirectory
+
+from lolstats.stores import open_match_store, FileMatchStore
+from lolstats.sqlite_store import SqliteMatchStore
+from lolstats.disk import match_layout
+from lolstats.errors import MyError
+
+
+def test_file_match_store():
+    with TemporaryDirectory() as tmpdir:
+        with open_match_store(tmpdir, format="gzip", layout="sharded") as store:
+            assert isinstance(store, FileMatchStore)
+            store.save([{"metadata": {"matchId": "NA1_1"}}])
+
+            assert store.unsaved(["NA1_1", "NA1_2"]) == ["NA1_2"]
+            assert store.load("NA1_1") == {"metadata": {"matchId": "NA1_1"}}
+            assert store.ids() == {"NA1_1"}
+
+            with pytest.raises(KeyError):
+                store.load("NA1_2")
+
+        matches_dir = os.path.join(tmpdir, "matches")
+        assert match_layout(matches_dir) == "sharded"
+        assert os.path.exists(os.path.join(tmpdir, "matches.index"))
+
+
+def test_sqlite_match_store():
+    with TemporaryDirectory() as tmpdir:
+        with open_match_store(tmpdir, storage="sqlite") as store:
+            assert isinstance(store, SqliteMatchStore)
+            store.save([{"metadata": {"matchId": "NA1_1"}}])
+
+            assert store.unsaved(["NA1_1", "NA1_2"]) == ["NA1_2"]
+
+        assert os.path.exists(os.path.join(tmpdir, "matches.sqlite"))
+
+
+def test_unknown_storage():
+    with pytest.raises(MyError):
+        open_match_store("data", storage="csv")
+
+
+@pytest.mark.parametrize("storage", ["files", "sqlite"])
+def test_match_store_participants(storage):
+    with TemporaryDirectory() as tmpdir:
+        with open_match_store(tmpdir, storage=storage, format="gzip") as store:
+            store.save([{"metadata": {"matchId": "NA1_1", "participants": ["b", "a"]}}])
+
+            assert sorted(store.participants("NA1_1")) == ["a", "b"]
+
+            with pytest.raises(KeyError):
+                store.participants("NA1_2")
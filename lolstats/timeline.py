@@ -0,0 +1,184 @@
+"""Save match timelines with participant frames as compact typed arrays."""
+
+import json
+import os
+import numpy as np
+
+# One fixed-width record per participant per frame. Positions on the map
+# are below 16 000, so they fit in 16 bit integers.
+FRAME_DTYPE = np.dtype(
+    [
+        ("frame", "<u2"),
+        ("timestamp", "<u4"),
+        ("participantId", "u1"),
+        ("level", "u1"),
+        ("currentGold", "<i4"),
+        ("totalGold", "<i4"),
+        ("goldPerSecond", "<i2"),
+        ("xp", "<i4"),
+        ("minionsKilled", "<u2"),
+        ("jungleMinionsKilled", "<u2"),
+        ("x", "<i2"),
+        ("y", "<i2"),
+        ("totalDamageDoneToChampions", "<i4"),
+        ("totalDamageTaken", "<i4"),
+        ("timeEnemySpentControlled", "<i4"),
+    ]
+)
+
+# Fields of FRAME_DTYPE read from the nested objects of participant frames
+NESTED_FIELDS = {
+    "x": ("position", "x"),
+    "y": ("position", "y"),
+    "totalDamageDoneToChampions": ("damageStats", "totalDamageDoneToChampions"),
+    "totalDamageTaken": ("damageStats", "totalDamageTaken"),
+}
+
+
+def timeline_path(directory, id):
+    """Return path to the saved timeline of the match."""
+    return os.path.join(directory, "timelines", f"{id}.npz")
+
+
+def timeline_frames(timeline):
+    """
+    Convert participant frames of the timeline to a structured array.
+
+    Parameters
+    ----------
+    timeline : dict
+      Match timeline (see https://developer.riotgames.com/apis#match-v5/GET_getTimeline).
+
+    Returns
+    -------
+    numpy.ndarray
+      Array of FRAME_DTYPE records ordered by frame and participant ID.
+      Fields missing in the timeline are zero.
+    """
+
+    frames = timeline["info"]["frames"]
+    rows = []
+
+    for number, frame in enumerate(frames):
+        participant_frames = frame.get("participantFrames", {})
+
+        for key in sorted(participant_frames, key=int):
+            data = participant_frames[key]
+            row = [number, frame["timestamp"], int(key)]
+
+            for name in FRAME_DTYPE.names[3:]:
+                if name in NESTED_FIELDS:
+                    parent, field = NESTED_FIELDS[name]
+                    row.append(data.get(parent, {}).get(field, 0))
+                else:
+                    row.append(data.get(name, 0))
+
+            rows.append(tuple(row))
+
+    return np.array(rows, dtype=FRAME_DTYPE)
+
+
+def timeline_events(timeline):
+    """Return events of all timeline frames as one list, in time order."""
+    return [
+        event
+        for frame in timeline["info"]["frames"]
+        for event in frame.get("events", [])
+    ]
+
+
+def save_timeline(directory, id, timeline):
+    """
+    Save the match timeline to `{directory}/timelines/{id}.npz`.
+
+    Participant frames are saved as an array of FRAME_DTYPE records,
+    events as compact JSON. The file is written atomically.
+
+    Parameters
+    ----------
+    directory : str
+      Path to the data directory.
+
+    id : str
+      Match ID.
+
+    timeline : dict
+      Match timeline, see `timeline_frames`.
+    """
+
+    path = timeline_path(directory, id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path[: -len('.npz')]}.tmp.npz"
+
+    participants = [
+        participant["puuid"]
+        for participant in sorted(
+            timeline["info"].get("participants", []),
+            key=lambda participant: participant["participantId"],
+        )
+    ]
+
+    events = json.dumps(timeline_events(timeline), separators=(",", ":"))
+
+    np.savez_compressed(
+        temp_path,
+        frames=timeline_frames(timeline),
+        participants=np.array(participants, dtype=str),
+        events=np.frombuffer(events.encode("utf-8"), dtype=np.uint8),
+        frameInterval=np.array(timeline["info"].get("frameInterval", 0)),
+    )
+
+    os.replace(temp_path, path)
+
+
+def save_timelines(directory, timelines):
+    """
+    Save match timelines, see `save_timeline`.
+
+    Parameters
+    ----------
+    directory : str
+      Path to the data directory.
+
+    timelines : list of tuple
+      (match ID, timeline) pairs.
+    """
+
+    for id, timeline in timelines:
+        save_timeline(directory, id, timeline)
+
+
+def load_timeline(directory, id):
+    """
+    Load the match timeline saved by `save_timeline`.
+
+    Parameters
+    ----------
+    directory : str
+      Path to the data directory.
+
+    id : str
+      Match ID.
+
+    Returns
+    -------
+    dict
+      Dictionary with keys:
+        * `frames`: array of FRAME_DTYPE records.
+        * `participants`: list of PUUIDs, where participant ID is the index plus one.
+        * `events`: list of all match events.
+        * `frameInterval`: milliseconds between frames.
+
+    Raises
+    ------
+    FileNotFoundError
+      If the timeline is not saved.
+    """
+
+    with np.load(timeline_path(directory, id)) as data:
+        return {
+            "frames": data["frames"],
+            "participants": data["participants"].tolist(),
+            "events": json.loads(data["events"].tobytes().decode("utf-8")),
+            "frameInterval": int(data["frameInterval"]),
+        }
@@ -0,0 +1,107 @@
+import os
+import json
+import pytest
+from tempfile import TemporaryDirectory
+
+from lolstats.timeline import (
+    FRAME_DTYPE,
+    timeline_frames,
+    timeline_events,
+    save_timeline,
+    load_timeline,
+    timeline_path,
+)
+
+
+def fake_timeline(id="NA1_1", frames=3, participants=10):
+    """Return timeline in the format of Riot API."""
+
+    return {
+        "metadata": {"matchId": id},
+        "info": {
+            "frameInterval": 60000,
+            "participants": [
+                {"participantId": number, "puuid": f"puuid{number}"}
+                for number in range(participants, 0, -1)
+            ],
+            "frames": [
+                {
+                    "timestamp": frame * 60000 + frame,
+                    "participantFrames": {
+                        str(number): {
+                            "participantId": number,
+                            "level": frame + 1,
+                            "currentGold": 500 + number * frame,
+                            "totalGold": 500 + 300 * frame,
+                            "goldPerSecond": 2,
+                            "xp": 280 * frame,
+                            "minionsKilled": 8 * frame,
+                            "jungleMinionsKilled": number,
+                            "position": {"x": 14000 + number, "y": 500 * number},
+                            "damageStats": {"totalDamageDoneToChampions": 100 * frame},
+                            "championStats": {"armor": 30},
+                        }
+                        for number in range(1, participants + 1)
+                    },
+                    "events": [
+                        {"type": "ITEM_PURCHASED", "timestamp": frame * 60000 + 5}
+                    ],
+                }
+                for frame in range(frames)
+            ],
+        },
+    }
+
+
+def test_timeline_frames():
+    frames = timeline_frames(fake_timeline(frames=2, participants=10))
+
+    assert frames.dtype == FRAME_DTYPE
+    assert len(frames) == 20
+
+    # Participant 2 in the second frame
+    row = frames[11]
+    assert row["frame"] == 1
+    assert row["timestamp"] == 60001
+    assert row["participantId"] == 2
+    assert row["level"] == 2
+    assert row["currentGold"] == 502
+    assert row["x"] == 14002
+    assert row["y"] == 1000
+    assert row["totalDamageDoneToChampions"] == 100
+
+    # Missing fields
+    assert row["totalDamageTaken"] == 0
+
+
+def test_timeline_events():
+    assert [event["timestamp"] for event in timeline_events(fake_timeline())] == [
+        5,
+        60005,
+        120005,
+    ]
+
+
+def test_save_timeline():
+    timeline = fake_timeline(frames=30)
+
+    with TemporaryDirectory() as tmpdir:
+        save_timeline(tmpdir, "NA1_1", timeline)
+        loaded = load_timeline(tmpdir, "NA1_1")
+
+        assert (loaded["frames"] == timeline_frames(timeline)).all()
+        assert loaded["participants"] == [f"puuid{number}" for number in range(1, 11)]
+        assert loaded["events"] == timeline_events(timeline)
+        assert loaded["frameInterval"] == 60000
+
+        # Smaller than the compact JSON
+        path = timeline_path(tmpdir, "NA1_1")
+        size = len(json.dumps(timeline, separators=(",", ":")))
+        assert os.path.getsize(path) < size / 4
+        assert os.listdir(os.path.dirname(path)) == ["NA1_1.npz"]
+
+
+def test_load_timeline_not_saved():
+    with TemporaryDirectory() as tmpdir:
+        with pytest.raises(FileNotFoundError):
+            load_timeline(tmpdir, "NA1_1")
@@ -0,0 +1,57 @@
+"""Move saved League of Legends matches into a flat or sharded directory layout."""
+
+import argparse
+import os
+import sys
+from lolstats.disk import LAYOUTS, reshard_matches
+from lolstats.errors import MyError
+
+
+def parse_args():
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description="Move saved matches into a flat or sharded directory layout, in place."
+    )
+
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        help="Path to directory where matches are stored",
+        default="data",
+    )
+
+    parser.add_argument(
+        "-l",
+        "--layout",
+        choices=LAYOUTS,
+        help=(
+            "New layout: 'flat' stores all matches in one directory,"
+            " 'sharded' stores them in subdirectories by platform and hash bucket"
+        ),
+        required=True,
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    """Parse command line arguments and move the matches."""
+
+    try:
+        args = parse_args()
+        match_dir = os.path.join(args.output, "matches")
+        moved = reshard_matches(directory=match_dir, layout=args.layout)
+
+        print(
+            f"\n\nMoved {moved} matches in '{match_dir}' directory to {args.layout} layout."
+        )
+    except MyError as e:
+        print("\n\nError:\n")
+        print(e)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
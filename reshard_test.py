@@ -0,0 +1,27 @@
+import os
+from unittest.mock import patch, call
+from tempfile import TemporaryDirectory
+from lolstats.disk import save_match, load_match, match_layout
+from reshard import main
+
+
+def test_main():
+    with TemporaryDirectory() as tmpdir:
+        matches_dir = os.path.join(tmpdir, "matches")
+        save_match(matches_dir, "NA1_1", {"data": 1})
+        save_match(matches_dir, "NA1_2", {"data": 2})
+
+        with patch("builtins.print") as mock_print, patch(
+            "sys.argv",
+            ["prog", "--output", tmpdir, "--layout", "sharded"],
+        ):
+            main()
+
+            assert mock_print.call_args_list == [
+                call(
+                    f"\n\nMoved 2 matches in '{matches_dir}' directory to sharded layout."
+                )
+            ]
+
+        assert match_layout(matches_dir) == "sharded"
+        assert load_match(matches_dir, "NA1_2") == {"data": 2}
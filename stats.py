@@ -0,0 +1,140 @@
+"""Show League of Legends player statistics computed from saved matches."""
+
+import argparse
+import sys
+from lolstats.stats import get_player_stats
+from lolstats.disk import find_player_puuid
+from lolstats.stores import STORAGES
+from lolstats.errors import MyError
+
+# Number of recent games shown in the form line of the report
+FORM_GAMES = 10
+
+
+def parse_args():
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description="Show player's statistics computed from the saved matches."
+    )
+
+    parser.add_argument(
+        "-n", "--name", type=str, help=("Player name portion in Name#Tag")
+    )
+
+    parser.add_argument(
+        "-t", "--tag", type=str, help=("Player tag portion in Name#Tag")
+    )
+
+    parser.add_argument(
+        "-p",
+        "--puuid",
+        type=str,
+        help="Player's PUUID, used instead of --name and --tag",
+    )
+
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        help="Path to directory where matches are stored",
+        default="data",
+    )
+
+    parser.add_argument(
+        "-s",
+        "--storage",
+        choices=STORAGES,
+        help="Storage backend of the matches",
+        default="files",
+    )
+
+    parser.add_argument(
+        "-l",
+        "--last",
+        type=int,
+        help="Number of recent games used for the recent form",
+        default=20,
+    )
+
+    args = parser.parse_args()
+
+    if args.puuid is None and (args.name is None or args.tag is None):
+        parser.error("Use --name and --tag, or --puuid")
+
+    return args
+
+
+def format_stats(label, stats):
+    """Format statistics as one line of text."""
+
+    return (
+        f"{label:<16} {stats['games']:>6} {stats['win_rate']:>6.1%}"
+        f" {stats['kda']:>6.2f} {stats['cs_per_min']:>6.1f}"
+        f" {stats['damage_share']:>7.1%} {stats['vision_per_min']:>6.2f}"
+    )
+
+
+def format_report(stats, last):
+    """Format player statistics as text."""
+
+    header = f"{'':<16} {'Games':>6} {'Win':>6} {'KDA':>6} {'CS/m':>6} {'Damage':>7} {'Vis/m':>6}"
+
+    lines = [
+        header,
+        format_stats("All games", stats["overall"]),
+        format_stats(f"Last {last}", stats["recent"]),
+        "",
+        "Roles",
+    ]
+
+    lines += [
+        format_stats(role, role_stats) for role, role_stats in stats["roles"].items()
+    ]
+    lines += [
+        "",
+        f"Form (win rate of the last {last} games after each of the recent games)",
+        " ".join(f"{value:.0%}" for value in stats["form"][-FORM_GAMES:]),
+        "",
+        "Champions",
+    ]
+
+    lines += [
+        format_stats(champion, champion_stats)
+        for champion, champion_stats in stats["champions"].items()
+    ]
+
+    return "\n".join(lines)
+
+
+def main():
+    """Parse command line arguments and show player statistics."""
+
+    try:
+        args = parse_args()
+        puuid = args.puuid
+
+        if puuid is None:
+            puuid = find_player_puuid(
+                name=args.name, tag=args.tag, directory=args.output
+            )
+
+            if puuid is None:
+                raise MyError(
+                    f"Player {args.name}#{args.tag} not found in '{args.output}' directory."
+                    " Load the player's matches with load.py first."
+                )
+
+        stats = get_player_stats(
+            directory=args.output, puuid=puuid, storage=args.storage, last=args.last
+        )
+
+        print(format_report(stats, last=args.last))
+    except MyError as e:
+        print("\n\nError:\n")
+        print(e)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
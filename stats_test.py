@@ -0,0 +1,42 @@
+import json
+import os
+from unittest.mock import patch
+from tempfile import TemporaryDirectory
+from lolstats.disk import save_match, save_player
+from stats import main
+
+
+def test_main():
+    with TemporaryDirectory() as tmpdir:
+        with open(os.path.join("docs", "match.json"), "r", encoding="utf-8") as file:
+            match = json.load(file)
+
+        puuid = match["info"]["participants"][0]["puuid"]
+        save_match(os.path.join(tmpdir, "matches"), "OC1_584214853", match)
+        save_player("Player", "Tag", puuid, tmpdir)
+
+        with patch("builtins.print") as mock_print, patch(
+            "sys.argv",
+            ["prog", "--output", tmpdir, "--name", "Player", "--tag", "Tag"],
+        ):
+            main()
+
+            report = mock_print.call_args[0][0]
+            assert "All games" in report
+            assert "Akali" in report
+            assert "Form (win rate of the last 20 games" in report
+
+            # The stats command does not change the data directory
+            assert not os.path.exists(os.path.join(tmpdir, "export"))
+
+
+def test_main_unknown_player():
+    with TemporaryDirectory() as tmpdir:
+        with patch("builtins.print") as mock_print, patch(
+            "sys.argv",
+            ["prog", "--output", tmpdir, "--name", "Player", "--tag", "Tag"],
+        ), patch("sys.exit") as mock_exit:
+            main()
+
+            mock_exit.assert_called_once_with(1)
+            assert "not found" in str(mock_print.call_args[0][0])